@@ -0,0 +1,303 @@
+"""
+Targeted abstract extraction from paper landing pages.
+
+Each source has an AbstractExtractor: the CSS selectors that locate its abstract, in
+priority order. They are compiled once per process, to XPath for lxml and to tag/attribute
+predicates for the standard-library parser, plus a byte pattern per selector that finds
+the matching element in the raw HTML without parsing it. Those patterns let the fetcher
+stop reading a page shortly after the abstract (`stop_offset`), and let `extract()` parse
+only from the first candidate element onwards instead of the whole document.
+
+lxml is used when installed. Without it, a streaming html.parser matcher collects the
+text of matching elements without building a tree (like BeautifulSoup with a
+SoupStrainer, minus the soup). AbstractExtractionPool runs extraction in worker
+processes so parsing never holds the GIL on the fetch threads.
+"""
+import re
+import logging
+import functools
+import multiprocessing
+from html.parser import HTMLParser
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+SELECTOR_PATTERN = re.compile(
+    r"^(?P<tag>[a-zA-Z][\w-]*)?(?:#(?P<id>[\w-]+)|\.(?P<cls>[\w-]+)"
+    r"|\[(?P<attr>[\w-]+)=['\"]?(?P<value>[^'\"\]]*)['\"]?\])?$"
+)
+# Elements without content: a match on one of these (e.g. <meta name="abstract">) has no text
+VOID_ELEMENTS = frozenset(("area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "wbr"))
+TAG_NAME_PATTERN = re.compile(rb"<\s*([a-zA-Z][\w-]*)")
+FEED_SIZE = 8192  # characters handed to html.parser at a time, so it can stop once the abstract is found
+MARKER_OVERLAP = 256  # bytes rescanned at chunk boundaries so a marker split across chunks is still found
+
+
+class Selector(namedtuple("Selector", "tag attr value token")):
+    """One simple selector: optional tag plus an id, class (`token`) or attribute=value test"""
+
+    @classmethod
+    def parse(cls, css):
+        match = SELECTOR_PATTERN.match(css.strip())
+        if not match or not (match["tag"] or match["id"] or match["cls"] or match["attr"]):
+            raise ValueError(f"Unsupported selector: {css!r} (expected tag, #id, .class or [attr='value'])")
+        tag = match["tag"].lower() if match["tag"] else None
+        if match["id"]:
+            return cls(tag, "id", match["id"], False)
+        if match["cls"]:
+            return cls(tag, "class", match["cls"], True)
+        if match["attr"]:
+            return cls(tag, match["attr"].lower(), match["value"], False)
+        return cls(tag, None, None, False)
+
+    def matches(self, tag, attrs):
+        if self.tag and tag != self.tag:
+            return False
+        if self.attr is None:
+            return True
+        value = attrs.get(self.attr)
+        if value is None:
+            return False
+        return self.value in value.split() if self.token else value == self.value
+
+    def xpath(self):
+        tag = self.tag or "*"
+        if self.attr is None:
+            return f"//{tag}"
+        if self.token:
+            return f"//{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {self.value} ')]"
+        return f"//{tag}[@{self.attr}='{self.value}']"
+
+    def marker(self):
+        """Byte pattern for this selector's opening tag, or None for a bare tag selector"""
+        if self.attr is None:
+            return None
+        value = re.escape(self.value.encode())
+        if self.token:
+            return rb"""\bclass\s*=\s*["']?(?:[^"'>]*\s)?""" + value + rb"""(?=["'\s>])"""
+        return rb"\b" + re.escape(self.attr.encode()) + rb"""\s*=\s*["']?""" + value + rb"""(?=["'\s>/])"""
+
+
+@functools.lru_cache(maxsize=None)
+def lxml_etree():
+    """lxml.etree if installed (imported on first use), else None and the html.parser matcher is used"""
+    try:
+        from lxml import etree
+    except ImportError:
+        return None
+    return etree
+
+
+CompiledExtractor = namedtuple("CompiledExtractor", "groups xpaths markers first_marker strip_prefix")
+
+
+@functools.lru_cache(maxsize=None)
+def compile_extractor(selectors, strip_prefix):
+    """Compile selector groups once per process (cached on the selector strings)"""
+    groups = [tuple(Selector.parse(css) for css in group.split(",")) for group in selectors]
+    etree = lxml_etree()
+    # XPath union returns matches in document order, like BeautifulSoup's select_one
+    xpaths = [etree.XPath(" | ".join(selector.xpath() for selector in group)) for group in groups] if etree else None
+    patterns = [selector.marker() for group in groups for selector in group]
+    first_patterns = [selector.marker() for selector in groups[0]]
+    # Without a marker for every selector, the region can't be located and the whole page is parsed
+    markers = re.compile(b"|".join(patterns), re.IGNORECASE) if all(patterns) else None
+    first_marker = re.compile(b"|".join(first_patterns), re.IGNORECASE) if all(first_patterns) else None
+    return CompiledExtractor(groups, xpaths, markers, first_marker,
+                             re.compile(strip_prefix, re.IGNORECASE) if strip_prefix else None)
+
+
+class AbstractExtractor:
+    """
+    Where one source's landing pages keep their abstract.
+
+    `selectors` are tried in priority order; each entry is a comma-separated group whose
+    first match in document order counts, and the first group with non-empty text wins.
+    Reading can stop `region_bytes` after the first group's element starts. The extractor
+    only holds strings, so it can be sent to worker processes.
+    """
+
+    def __init__(self, name, url_pattern, selectors, strip_prefix=None, region_bytes=65536):
+        self.name = name
+        self.url_pattern = url_pattern
+        self.selectors = tuple(selectors)
+        self.strip_prefix = strip_prefix
+        self.region_bytes = region_bytes
+        # Reject unsupported selectors up front; compiling waits for first use (it may import lxml)
+        for group in self.selectors:
+            for css in group.split(","):
+                Selector.parse(css)
+
+    def __repr__(self):
+        return f"AbstractExtractor({self.name!r})"
+
+    @property
+    def compiled(self):
+        return compile_extractor(self.selectors, self.strip_prefix)
+
+    def handles(self, url):
+        return re.search(self.url_pattern, url) is not None
+
+    def stop_offset(self, data, start=0):
+        """Offset after which the rest of the page can be skipped, once the first group's element has begun"""
+        marker = self.compiled.first_marker
+        match = marker.search(data, start) if marker else None
+        return match.start() + self.region_bytes if match else None
+
+    def region(self, data):
+        """The part of `data` from the first candidate element's opening tag onwards"""
+        marker = self.compiled.markers
+        if marker is None:
+            return data
+        for match in marker.finditer(data):
+            start = data.rfind(b"<", 0, match.start())
+            tag = TAG_NAME_PATTERN.match(data, max(start, 0))
+            # <meta name="abstract"> and the like can't hold the abstract's text
+            if start >= 0 and not (tag and tag.group(1).lower().decode() in VOID_ELEMENTS):
+                return data[start:]
+        return None
+
+    def extract(self, data, encoding=None):
+        """Return the abstract in `data` (raw HTML bytes, possibly truncated) or None"""
+        region = self.region(data)
+        if not region:
+            return None
+        compiled = self.compiled
+        encoding = encoding or "utf-8"
+        texts = _lxml_texts(compiled, region, encoding) if compiled.xpaths else _parser_texts(compiled, region, encoding)
+        for text in texts:
+            text = text.strip() if text else ""
+            if compiled.strip_prefix:
+                text = compiled.strip_prefix.sub("", text)
+            if text:
+                return text
+        return None
+
+
+def _lxml_texts(compiled, region, encoding):
+    etree = lxml_etree()
+    root = etree.fromstring(region, etree.HTMLParser(encoding=encoding))
+    if root is None:
+        return
+    for xpath in compiled.xpaths:
+        found = [element for element in xpath(root) if element.tag not in VOID_ELEMENTS]
+        if found:
+            yield etree.tostring(found[0], method="text", encoding="unicode", with_tail=False)
+
+
+class _RegionParser(HTMLParser):
+    """Collects the text of the first element matching each selector group, without building a tree"""
+
+    def __init__(self, groups):
+        super().__init__(convert_charrefs=True)
+        self.groups = groups
+        self.texts = [None] * len(groups)
+        self.open = []  # [group index, tag, nesting depth of that tag, text parts] per capture in progress
+
+    def handle_starttag(self, tag, attrs):
+        for capture in self.open:
+            if capture[1] == tag:
+                capture[2] += 1
+        if tag in VOID_ELEMENTS:
+            return
+        attr_map = None
+        for index, group in enumerate(self.groups):
+            if self.texts[index] is not None or any(capture[0] == index for capture in self.open):
+                continue
+            if attr_map is None:
+                attr_map = {name: value or "" for name, value in attrs}
+            if any(selector.matches(tag, attr_map) for selector in group):
+                self.open.append([index, tag, 1, []])
+
+    def handle_startendtag(self, tag, attrs):
+        pass  # self-closing elements carry no text
+
+    def handle_endtag(self, tag):
+        for capture in list(self.open):
+            if capture[1] == tag:
+                capture[2] -= 1
+                if capture[2] == 0:
+                    self.texts[capture[0]] = "".join(capture[3])
+                    self.open.remove(capture)
+
+    def handle_data(self, data):
+        for capture in self.open:
+            capture[3].append(data)
+
+    def finish(self):
+        """Texts per group; elements cut off by a truncated region keep what was read"""
+        self.close()
+        for index, tag, depth, parts in self.open:
+            self.texts[index] = "".join(parts)
+        return self.texts
+
+
+def _parser_texts(compiled, region, encoding):
+    parser = _RegionParser(compiled.groups)
+    text = region.decode(encoding, errors="replace")
+    for start in range(0, len(text), FEED_SIZE):
+        parser.feed(text[start:start + FEED_SIZE])
+        if parser.texts[0] and parser.texts[0].strip():
+            break  # the top-priority selector matched; nothing later can beat it
+    return parser.finish()
+
+
+PUBMED_SELECTORS = ("#abstract", ".abstract-content", ".abstract-text", "[data-ga-label='abstract']")
+GENERIC_SELECTORS = (".abstract, #abstract, [name='abstract'], .paper-abstract",)
+
+# Checked in order; the generic extractor matches any URL
+EXTRACTORS = [
+    AbstractExtractor("pubmed", r"pubmed", PUBMED_SELECTORS + GENERIC_SELECTORS),
+    AbstractExtractor("arxiv", r"arxiv", (".abstract, .abstract-full",) + GENERIC_SELECTORS, strip_prefix=r"^Abstract:\s*"),
+    AbstractExtractor("generic", r"", GENERIC_SELECTORS),
+]
+
+
+def register_extractor(extractor):
+    """Add an extractor, taking precedence over the built-in ones for the URLs it handles"""
+    EXTRACTORS.insert(0, extractor)
+
+
+def extractor_for(url):
+    return next(extractor for extractor in EXTRACTORS if extractor.handles(url))
+
+
+def read_region(chunks, extractor, max_bytes=16 * 1024 * 1024):
+    """
+    Read HTML `chunks` until the extractor's abstract region has arrived.
+
+    Returns (data, stopped_early); `stopped_early` means the rest of the body was left unread.
+    """
+    buffer = bytearray()
+    stop = None
+    for chunk in chunks:
+        scanned = max(0, len(buffer) - MARKER_OVERLAP)
+        buffer += chunk
+        if stop is None:
+            stop = extractor.stop_offset(buffer, scanned)
+        if stop is not None and len(buffer) >= stop:
+            return bytes(buffer[:stop]), True
+        if len(buffer) >= max_bytes:
+            return bytes(buffer), True
+    return bytes(buffer), False
+
+
+def extract_abstract(extractor, data, encoding=None):
+    """Module-level entry point for worker processes"""
+    return extractor.extract(data, encoding)
+
+
+class AbstractExtractionPool:
+    """Runs `extract_abstract` in worker processes; `extract()` blocks only the calling thread"""
+
+    def __init__(self, max_workers=None):
+        # Spawned workers: the pool is started from pipeline threads, and forking a threaded process is unsafe
+        context = multiprocessing.get_context("spawn")
+        self.pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=context)
+
+    def extract(self, extractor, data, encoding=None):
+        return self.pool.submit(extract_abstract, extractor, data, encoding).result()
+
+    def close(self):
+        self.pool.shutdown()
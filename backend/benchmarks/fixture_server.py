@@ -0,0 +1,293 @@
+import json
+import random
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from xml.sax.saxutils import escape
+
+# Vocabulary for generated titles/abstracts; random draws keep papers from looking like near-duplicates
+VOCABULARY = (
+    "acute adaptive adipose adolescent adult aerobic age airway allergic analysis anxiety arterial "
+    "asthma athlete autoimmune baseline blood body burn cardiac cardiovascular cell chronic circadian "
+    "clinical cohort cold collagen colitis control cortical cross-sectional cutaneous daily dermal "
+    "diabetes diet disease dynamics early elderly endocrine endurance epidermal exercise exposure "
+    "fatigue female fibroblast fitness gene glucose gut healthy heat hormonal hospital hypoxia "
+    "immune infection injury insulin intensive intervention kidney lesion liver longitudinal male "
+    "marathon marker mechanism metabolic microbiome monitoring muscle neonatal network obesity "
+    "oxidative pain pathway pediatric plasma population pregnancy psoriasis randomized recovery "
+    "renal respiratory response risk saliva sepsis serum shift skin sleep smoking stress surgery "
+    "sweat systemic tissue training trauma treatment trial urine vascular wearable wound young"
+).split()
+
+BIOMARKER_PHRASES = {
+    "cortisol": [("cortisol", "ug/dl", 5, 25), ("salivary cortisol", "nmol/l", 2, 30)],
+    "lactate": [("lactate", "mmol/l", 0.5, 15)],
+    "uric acid": [("uric acid", "mg/dl", 2.5, 9)],
+    "crp": [("CRP", "mg/l", 0.3, 80), ("C-reactive protein (CRP)", "mg/l", 0.3, 80)],
+    "il-6": [("IL-6", "pg/ml", 0.5, 60), ("interleukin-6", "pg/ml", 0.5, 60)],
+}
+
+# Share of papers in each abstract category; the remainder are relevant papers with numbers
+ABSTRACT_MIX = {"none": 0.05, "irrelevant": 0.15, "no_numbers": 0.10}
+
+
+class FixtureCorpus:
+    """
+    A deterministic synthetic corpus served in the shapes of the PubMed E-utilities and arXiv APIs.
+
+    Paper `i` is generated on demand from `seed` and `i`, so corpora of 100k papers cost
+    no memory up front. The first `pubmed_share` of the corpus are PubMed records, the
+    rest arXiv entries; `duplicate_share` of the arXiv entries carry the DOI of a PubMed
+    record so cross-source deduplication is exercised.
+    """
+
+    def __init__(self, size, seed=42, pubmed_share=0.5, duplicate_share=0.05):
+        self.size = size
+        self.seed = seed
+        self.pubmed_count = int(size * pubmed_share)
+        self.arxiv_count = size - self.pubmed_count
+        self.duplicate_share = duplicate_share
+
+    def pmid(self, index):
+        return str(30000000 + index)
+
+    def arxiv_id(self, index):
+        return f"{2001 + index // 90000:04d}.{index % 90000:05d}"
+
+    def paper(self, index):
+        """Title, abstract and DOI of paper `index` (the abstract may be empty)"""
+        rng = random.Random(self.seed * 1000003 + index)
+        biomarker = rng.choice(list(BIOMARKER_PHRASES))
+        name, unit, low, high = rng.choice(BIOMARKER_PHRASES[biomarker])
+        words = rng.sample(VOCABULARY, 7)
+        title = f"{words[0].capitalize()} {words[1]} {name} levels in {words[2]} {words[3]} {words[4]} {words[5]} {words[6]}"
+
+        roll = rng.random()
+        if roll < ABSTRACT_MIX["none"] and index < self.pubmed_count:
+            # Only PubMed summaries lack abstracts; arXiv entries always carry one
+            kind = "none"
+        elif roll < ABSTRACT_MIX["none"] + ABSTRACT_MIX["irrelevant"]:
+            kind = "irrelevant"
+        elif roll < ABSTRACT_MIX["none"] + ABSTRACT_MIX["irrelevant"] + ABSTRACT_MIX["no_numbers"]:
+            kind = "no_numbers"
+        else:
+            kind = "relevant"
+
+        filler = " ".join(rng.sample(VOCABULARY, 24))
+        if kind == "none":
+            abstract = ""
+        elif kind == "irrelevant":
+            abstract = f"We describe {filler}. The design is discussed with respect to {' '.join(rng.sample(VOCABULARY, 10))}."
+        elif kind == "no_numbers":
+            abstract = (f"We examined {name} and inflammation in {words[2]} {words[3]}. "
+                        f"Context: {filler}. Implications for monitoring are discussed.")
+        else:
+            value = round(rng.uniform(low, high), 1)
+            sd = round(value * rng.uniform(0.05, 0.3), 1)
+            abstract = (f"Background: {filler}. Methods: {rng.randint(20, 400)} participants were followed. "
+                        f"Results: mean {name} was {value} ± {sd} {unit} and was associated with inflammatory "
+                        f"markers (p < 0.0{rng.randint(1, 5)}). Conclusions: {' '.join(rng.sample(VOCABULARY, 12))}.")
+
+        if index < self.pubmed_count:
+            doi = f"10.{1000 + index % 9000}/fixture.{index}"
+        elif rng.random() < self.duplicate_share and self.pubmed_count:
+            # Same paper as a PubMed record (shared DOI and text)
+            original = self.paper(rng.randrange(self.pubmed_count))
+            if original["abstract"]:
+                return original
+            doi = None
+        else:
+            doi = f"10.48550/arXiv.{self.arxiv_id(index - self.pubmed_count)}" if rng.random() < 0.5 else None
+        return {"title": title, "abstract": abstract, "doi": doi}
+
+    # Response bodies -----------------------------------------------------------------
+
+    def esearch(self, params):
+        total = self.pubmed_count
+        body = {"count": str(total), "retstart": params.get("retstart", "0")}
+        if params.get("usehistory") == "y":
+            body.update({"webenv": "FIXTURE_WEBENV", "querykey": "1"})
+        start = int(params.get("retstart", 0))
+        retmax = int(params.get("retmax", 20))
+        body["idlist"] = [self.pmid(i) for i in range(start, min(total, start + retmax))]
+        return json.dumps({"esearchresult": body})
+
+    def _pubmed_indexes(self, params):
+        if params.get("id"):
+            indexes = (int(pmid) - 30000000 for pmid in params["id"].split(","))
+            return [i for i in indexes if 0 <= i < self.pubmed_count]
+        start = int(params.get("retstart", 0))
+        return list(range(start, min(self.pubmed_count, start + int(params.get("retmax", 20)))))
+
+    def esummary(self, params):
+        result = {"uids": []}
+        for index in self._pubmed_indexes(params):
+            paper = self.paper(index)
+            pmid = self.pmid(index)
+            result["uids"].append(pmid)
+            result[pmid] = {
+                "uid": pmid,
+                "title": paper["title"],
+                "pubdate": "2024 Jan",
+                "source": "J Fixture Med",
+                "articleids": [{"idtype": "pubmed", "value": pmid}, {"idtype": "doi", "value": paper["doi"]}],
+            }
+        return json.dumps({"result": result})
+
+    def efetch(self, params):
+        articles = []
+        for index in self._pubmed_indexes(params):
+            paper = self.paper(index)
+            articles.append(
+                f"<PubmedArticle><MedlineCitation><PMID>{self.pmid(index)}</PMID><Article>"
+                f"<ArticleTitle>{escape(paper['title'])}</ArticleTitle>"
+                f"<Abstract><AbstractText>{escape(paper['abstract'])}</AbstractText></Abstract>"
+                f"</Article></MedlineCitation></PubmedArticle>"
+            )
+        return f'<?xml version="1.0"?><PubmedArticleSet>{"".join(articles)}</PubmedArticleSet>'
+
+    def arxiv_query(self, params):
+        start = int(params.get("start", 0))
+        stop = min(self.arxiv_count, start + int(params.get("max_results", 10)))
+        entries = []
+        for offset in range(start, stop):
+            paper = self.paper(self.pubmed_count + offset)
+            doi = f"<arxiv:doi>{escape(paper['doi'])}</arxiv:doi>" if paper["doi"] else ""
+            entries.append(
+                f"<entry><id>http://arxiv.org/abs/{self.arxiv_id(offset)}v1</id>"
+                f"<published>2024-01-01T00:00:00Z</published>"
+                f"<title>{escape(paper['title'])}</title>"
+                f"<summary>{escape(paper['abstract'])}</summary>"
+                f"<author><name>Fixture Author</name></author>{doi}</entry>"
+            )
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<feed xmlns="http://www.w3.org/2005/Atom" xmlns:arxiv="http://arxiv.org/schemas/atom" '
+            'xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/">'
+            f"<title>arXiv Query</title><opensearch:totalResults>{self.arxiv_count}</opensearch:totalResults>"
+            f"<opensearch:startIndex>{start}</opensearch:startIndex>{''.join(entries)}</feed>"
+        )
+
+    def landing_page(self, pmid):
+        index = int(pmid) - 30000000
+        if not 0 <= index < self.pubmed_count:
+            return None
+        paper = self.paper(index)
+        abstract = f'<div id="abstract" class="abstract"><p>{escape(paper["abstract"])}</p></div>' if paper["abstract"] else ""
+        nav = "".join(f'<li><a href="/related/{n}">{word}</a></li>' for n, word in enumerate(VOCABULARY[:40]))
+        return (
+            f"<!DOCTYPE html><html><head><title>{escape(paper['title'])}</title></head><body>"
+            f"<header><nav><ul>{nav}</ul></nav></header><main><h1 class=\"heading-title\">{escape(paper['title'])}</h1>"
+            f"{abstract}<section class=\"references\"><ol>{'<li>Reference</li>' * 30}</ol></section></main></body></html>"
+        )
+
+
+def configure_scraper(scraper, base_url):
+    """Point a BiomarkerScraper's base URLs at a fixture server running at `base_url`"""
+    scraper.pubmed_base_url = f"{base_url}/eutils/"
+    scraper.arxiv_base_url = f"{base_url}/arxiv/query"
+    scraper.pubmed_article_url = f"{base_url}/pubmed/"
+
+
+class FixtureServer:
+    """
+    Local HTTP stand-in for PubMed and arXiv serving a FixtureCorpus.
+
+    Routes: `/eutils/esearch.fcgi`, `/eutils/esummary.fcgi`, `/eutils/efetch.fcgi`,
+    `/arxiv/query` and `/pubmed/<pmid>/` landing pages. Every response is delayed by
+    `latency` seconds (plus up to `jitter`), and `error_rate` of requests fail with a 503
+    so retry and error paths are exercised. Endpoints named in `fail_endpoints` (e.g.
+    "esummary" or "landing") always answer 503.
+    """
+
+    def __init__(self, corpus, host="127.0.0.1", port=0, latency=0.0, jitter=0.0, error_rate=0.0, seed=0,
+                 fail_endpoints=()):
+        self.corpus = corpus
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.fail_endpoints = set(fail_endpoints)
+        self.requests = {}
+        self.errors = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def configure_scraper(self, scraper):
+        """Point a BiomarkerScraper's base URLs at this server"""
+        configure_scraper(scraper, self.url)
+
+    def _route(self, path, params):
+        corpus = self.corpus
+        if path.endswith("/esearch.fcgi"):
+            return "esearch", "application/json", corpus.esearch(params)
+        if path.endswith("/esummary.fcgi"):
+            return "esummary", "application/json", corpus.esummary(params)
+        if path.endswith("/efetch.fcgi"):
+            return "efetch", "text/xml", corpus.efetch(params)
+        if path.endswith("/arxiv/query"):
+            return "arxiv", "application/atom+xml", corpus.arxiv_query(params)
+        if path.startswith("/pubmed/"):
+            return "landing", "text/html", corpus.landing_page(path.strip("/").split("/")[-1])
+        return "unknown", "text/plain", None
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                params = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+                endpoint, content_type, body = server._route(parsed.path, params)
+
+                with server._lock:
+                    server.requests[endpoint] = server.requests.get(endpoint, 0) + 1
+                    delay = server.latency + (server._rng.uniform(0, server.jitter) if server.jitter else 0)
+                    failed = endpoint in server.fail_endpoints or (server.error_rate and server._rng.random() < server.error_rate)
+                    if failed:
+                        server.errors += 1
+                if delay:
+                    time.sleep(delay)
+
+                if failed:
+                    status, body = 503, "Service temporarily unavailable"
+                elif body is None:
+                    status, body = 404, "Not found"
+                else:
+                    status = 200
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type if status == 200 else "text/plain")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fixture-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,348 @@
+"""
+Throughput benchmark for the synthetic data generator (synthesize-data.py).
+
+Each case runs in a fresh process so peak memory is measured per case:
+
+  single   generate_single_reading() per-call cost
+  batch    generate_biomarker_data_batch() at increasing durations and sample rates
+  model    generate_scenario_batch() (physiology model, random scenario) at the same sizes
+  sink     writing the same readings as CSV (csv module), CSV (pandas) and packed binary
+  stream   stream_biomarker_data() end to end against a local stub /readings server
+
+Reports samples/sec, peak RSS and the number of gen-0 garbage collections during the
+timed run (a proxy for allocation churn), plus the peak traced Python heap from a separate
+tracemalloc pass so tracing doesn't skew the timings. Results go to a JSON file, and two
+result files can be compared to flag regressions.
+
+Usage (from backend/):
+    python benchmarks/generator_bench.py
+    python benchmarks/generator_bench.py --cases single sink --json gen.json
+    python benchmarks/generator_bench.py --baseline gen.json        # run, then compare against gen.json
+    python benchmarks/generator_bench.py --compare old.json new.json  # compare two saved runs
+"""
+import io
+import gc
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import resource
+import tempfile
+import threading
+import contextlib
+import tracemalloc
+import importlib.util
+import multiprocessing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+CASES = ("single", "batch", "model", "sink", "stream")
+DEFAULT_BATCH_SIZES = ["60x50", "600x50", "3600x50", "600x500"]  # duration seconds x sample rate Hz
+SINKS = ("csv", "pandas", "binary")
+
+
+_generator = None
+
+
+def load_generator():
+    """Import synthesize-data.py once (its file name isn't a valid module name)"""
+    global _generator
+    if _generator is None:
+        spec = importlib.util.spec_from_file_location("synthesize_data", os.path.join(BACKEND_DIR, "synthesize-data.py"))
+        _generator = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(_generator)
+    return _generator
+
+
+class StubReadingsServer:
+    """Threaded HTTP server accepting POST /readings like the Node backend, counting what it receives"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.received = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if stub.latency:
+                    time.sleep(stub.latency)
+                with stub._lock:
+                    stub.received += 1
+                self.send_response(201)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"{}")
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/readings"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def write_sink(sink, readings, path):
+    """Write reading dicts to `path` with one of SINKS"""
+    if sink == "csv":
+        load_generator().append_readings_csv(path, readings)
+    elif sink == "pandas":
+        import pandas as pd
+        pd.DataFrame(readings).to_csv(path, index=False, mode='a', header=not os.path.isfile(path))
+    else:
+        import numpy as np
+        columns = list(readings[0])
+        # Timestamps as int64 microseconds plus one float64 per biomarker, 72 bytes per reading
+        dtype = np.dtype([("timestamp", "<i8")] + [(name, "<f8") for name in columns[1:]])
+        rows = np.empty(len(readings), dtype=dtype)
+        rows["timestamp"] = np.array([reading["timestamp"] for reading in readings], dtype="datetime64[us]").astype("<i8")
+        for name in columns[1:]:
+            rows[name] = [reading[name] for reading in readings]
+        with open(path, 'ab') as f:
+            rows.tofile(f)
+
+
+def make_workload(case, options, workdir):
+    """Return (name, workload, samples) where workload() performs the measured work once"""
+    generator = load_generator()
+    if case["kind"] == "single":
+        calls = options["single_calls"]
+
+        def workload():
+            for i in range(calls):
+                generator.generate_single_reading(time_offset=i * 0.02)
+        return f"single-{calls}", workload, calls
+
+    if case["kind"] == "batch":
+        duration, rate = case["duration"], case["rate"]
+        path = os.path.join(workdir, "batch.csv")
+
+        def workload():
+            if os.path.exists(path):
+                os.remove(path)
+            with contextlib.redirect_stdout(io.StringIO()):
+                generator.generate_biomarker_data_batch(duration_seconds=duration, sample_rate=rate, output_file=path)
+        return f"batch-{duration}sx{rate}Hz", workload, duration * rate
+
+    if case["kind"] == "model":
+        duration, rate = case["duration"], case["rate"]
+        path = os.path.join(workdir, "model.csv")
+
+        def workload():
+            if os.path.exists(path):
+                os.remove(path)
+            with contextlib.redirect_stdout(io.StringIO()):
+                generator.generate_scenario_batch(duration_seconds=duration, sample_rate=rate, output_file=path, seed=0)
+        return f"model-{duration}sx{rate}Hz", workload, duration * rate
+
+    if case["kind"] == "sink":
+        count = options["sink_readings"]
+        readings = [generator.generate_single_reading(time_offset=i * 0.02) for i in range(count)]
+        path = os.path.join(workdir, f"sink.{case['sink']}")
+
+        def workload():
+            if os.path.exists(path):
+                os.remove(path)
+            # Flush in chunks of csv_update_interval, as the stream loop does
+            for start in range(0, count, 100):
+                write_sink(case["sink"], readings[start:start + 100], path)
+        return f"sink-{case['sink']}-{count}", workload, count
+
+    raise ValueError(f"Unknown case: {case['kind']}")
+
+
+def run_stream(options, workdir):
+    """Stream flat out (no sleep) to a stub server for `stream_seconds` and count what arrives"""
+    generator = load_generator()
+    with StubReadingsServer(latency=options["latency"]) as server:
+        cwd = os.getcwd()
+        os.chdir(workdir)  # the stream always writes biomarker_data.csv to the working directory
+        try:
+            started = time.perf_counter()
+            generator.stream_biomarker_data(
+                server_url=server.url, stream_interval=0.0, duration_hours=options["stream_seconds"] / 3600,
+                verbose=False, output_file="biomarker_data.csv",
+            )
+            wall = time.perf_counter() - started
+        finally:
+            os.chdir(cwd)
+        return server.received, wall
+
+
+def run_case(case, options):
+    """Measure one case (runs in a child process) and return its result"""
+    workdir = tempfile.mkdtemp(prefix="generator_bench_")
+    try:
+        gc_before = gc.get_stats()[0]["collections"]
+        if case["kind"] == "stream":
+            name = f"stream-{options['stream_seconds']}s"
+            samples, wall = run_stream(options, workdir)
+            workload = None
+        else:
+            name, workload, samples = make_workload(case, options, workdir)
+            workload()  # warm-up: imports, caches, first file creation
+            gc_before = gc.get_stats()[0]["collections"]
+            # Best of `repeat` runs: the fastest run is the one least disturbed by other load
+            walls = []
+            for _ in range(options["repeat"]):
+                started = time.perf_counter()
+                workload()
+                walls.append(time.perf_counter() - started)
+            wall = min(walls)
+        gc_collections = (gc.get_stats()[0]["collections"] - gc_before) // (1 if workload is None else options["repeat"])
+
+        result = {
+            "case": name,
+            "samples": samples,
+            "wall_seconds": round(wall, 4),
+            "samples_per_second": round(samples / wall, 1) if wall else None,
+            "us_per_sample": round(wall / samples * 1e6, 3) if samples else None,
+            "gc_gen0_collections": gc_collections,
+            # ru_maxrss is in kilobytes on Linux and bytes on macOS
+            "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                                 / (1024 * 1024 if sys.platform == "darwin" else 1024), 1),
+        }
+        if workload is not None and options["tracemalloc"]:
+            tracemalloc.start()
+            workload()
+            result["traced_peak_kb"] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+            tracemalloc.stop()
+        return result
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _child(case, options, results):
+    try:
+        results.put(run_case(case, options))
+    except Exception as e:
+        results.put({"case": case["kind"], "error": repr(e)})
+
+
+def build_cases(kinds, batch_sizes):
+    cases = []
+    for kind in kinds:
+        if kind in ("batch", "model"):
+            for size in batch_sizes:
+                duration, rate = (int(part) for part in size.lower().split("x"))
+                cases.append({"kind": kind, "duration": duration, "rate": rate})
+        elif kind == "sink":
+            cases.extend({"kind": "sink", "sink": sink} for sink in SINKS)
+        else:
+            cases.append({"kind": kind})
+    return cases
+
+
+def benchmark(cases, **options):
+    """Run each case in its own process and return the results"""
+    options = {
+        "single_calls": 20000,
+        "sink_readings": 50000,
+        "stream_seconds": 5.0,
+        "latency": 0.0,
+        "tracemalloc": True,
+        "repeat": 3,
+        **options,
+    }
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for case in cases:
+        queue = context.Queue()
+        process = context.Process(target=_child, args=(case, options, queue))
+        process.start()
+        result = queue.get()
+        process.join()
+        results.append(result)
+        print(format_row(result), flush=True)
+    return results
+
+
+HEADER = f"{'case':<24} {'samples':>8} {'samples/s':>11} {'µs/sample':>10} {'gen0 gc':>8} {'heap KB':>9} {'peak MB':>8}"
+
+
+def format_row(result):
+    if "error" in result:
+        return f"{result['case']:<24} failed: {result['error']}"
+    return (f"{result['case']:<24} {result['samples']:>8} {result['samples_per_second']:>11} {result['us_per_sample']:>10} "
+            f"{result['gc_gen0_collections']:>8} {result.get('traced_peak_kb', '-'):>9} {result['peak_rss_mb']:>8}")
+
+
+def compare(results, baseline_runs, tolerance):
+    """Print per-case changes against a baseline and return the cases that regressed beyond `tolerance`"""
+    baseline = {run["case"]: run for run in baseline_runs if "error" not in run}
+    regressions = []
+    for result in results:
+        previous = baseline.get(result["case"])
+        if not previous or "error" in result:
+            continue
+        speed = result["samples_per_second"] / previous["samples_per_second"]
+        memory = result["peak_rss_mb"] / previous["peak_rss_mb"]
+        print(f"{result['case']}: {previous['samples_per_second']} -> {result['samples_per_second']} samples/s ({speed:.2f}x), "
+              f"peak {previous['peak_rss_mb']} -> {result['peak_rss_mb']} MB ({memory:.2f}x)")
+        if speed < 1 - tolerance or memory > 1 + tolerance:
+            regressions.append(result["case"])
+    return regressions
+
+
+def load_runs(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)["runs"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark synthetic biomarker data generation")
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=list(CASES))
+    parser.add_argument("--batch-sizes", nargs="+", default=DEFAULT_BATCH_SIZES,
+                        help="Batch cases as DURATIONxRATE, e.g. 3600x50 (seconds x Hz)")
+    parser.add_argument("--single-calls", type=int, default=20000, help="generate_single_reading calls to time")
+    parser.add_argument("--sink-readings", type=int, default=50000, help="Readings written per sink case")
+    parser.add_argument("--stream-seconds", type=float, default=5.0, help="How long the stream case runs")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per case; the fastest is reported")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds the stub server waits before answering")
+    parser.add_argument("--no-tracemalloc", action="store_false", dest="tracemalloc",
+                        help="Skip the extra tracemalloc pass for the heap figures")
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--baseline", help="Compare this run against a previous --json file")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="Only compare two saved --json files")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed samples/sec drop (and peak RSS growth) before a case counts as a regression")
+    args = parser.parse_args()
+
+    if args.compare:
+        regressions = compare(load_runs(args.compare[1]), load_runs(args.compare[0]), args.tolerance)
+    else:
+        print(HEADER)
+        results = benchmark(
+            build_cases(args.cases, args.batch_sizes), single_calls=args.single_calls, sink_readings=args.sink_readings,
+            stream_seconds=args.stream_seconds, latency=args.latency, tracemalloc=args.tracemalloc, repeat=args.repeat,
+        )
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump({"settings": vars(args), "runs": results}, f, indent=2)
+            print(f"Results saved to {args.json}")
+        regressions = compare(results, load_runs(args.baseline), args.tolerance) if args.baseline else []
+
+    if regressions:
+        print(f"Regressions: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
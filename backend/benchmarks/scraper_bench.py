@@ -0,0 +1,211 @@
+"""
+Offline throughput benchmark for BiomarkerScraper.
+
+Starts a local FixtureServer that stands in for PubMed and arXiv, points the scraper at
+it and harvests corpora of increasing size, each in a fresh process so peak memory is
+measured per run. Reports papers/sec, requests/paper, CPU time spent parsing and
+scoring, and peak RSS.
+
+Usage (from backend/):
+    python benchmarks/scraper_bench.py --sizes 50 1000 10000
+    python benchmarks/scraper_bench.py --sizes 100000 --latency 0.005 --error-rate 0.01 --json bench.json
+    python benchmarks/scraper_bench.py --sizes 1000 --baseline bench.json   # fails on a throughput regression
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import resource
+import tempfile
+import tracemalloc
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fixture_server import FixtureCorpus, FixtureServer, configure_scraper
+
+DEFAULT_SIZES = [50, 500, 5000]
+
+
+def run_harvest(base_url, size, options):
+    """Harvest the whole fixture corpus once (runs in a child process) and return its measurements"""
+    from webScraper import BiomarkerScraper
+    from scraper_pipeline import RateLimiter
+
+    logging.basicConfig(level=options["log_level"])
+    if options["tracemalloc"]:
+        tracemalloc.start()
+
+    output_dir = tempfile.mkdtemp(prefix="scraper_bench_")
+    try:
+        scraper = BiomarkerScraper(output_dir=output_dir)
+        configure_scraper(scraper, base_url)
+        # The fixture server has no rate limits; the random politeness delay would only measure sleep
+        scraper.rate_limiters = {source: RateLimiter(options["min_interval"]) for source in scraper.rate_limiters}
+        scraper.request_delay = (0, 0)
+        scraper.retry_backoff = options["retry_backoff"]
+        if options["save_interval"]:
+            scraper.save_interval = options["save_interval"]
+        if options["fetch_workers"]:
+            scraper.stage_workers["fetch"] = options["fetch_workers"]
+
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        # Same as scraper.run(), but reading each source's whole result set
+        query = "fixture inflammation biomarkers"
+        scraper.ensure_consolidated_file(query)
+        accepted = scraper.run_pipeline([scraper.iter_pubmed(query, None), scraper.iter_arxiv(query, None)])
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+
+        report = scraper.metrics.report()
+        stages = report["stages"]
+        stage_cpu = {name: entry["cpu_seconds"] for name, entry in stages.items()}
+        papers = stages.get("dedup", {}).get("calls", 0)
+        requests_total = sum(entry["requests"] for entry in report["sources"].values())
+
+        result = {
+            "size": size,
+            "papers": papers,
+            "accepted": accepted,
+            "wall_seconds": round(wall, 3),
+            "cpu_seconds": round(cpu, 3),
+            "papers_per_second": round(papers / wall, 2) if wall else None,
+            "requests": requests_total,
+            "requests_per_paper": round(requests_total / papers, 3) if papers else None,
+            # Producers parse API responses (JSON/Atom) and fetch workers parse landing-page HTML
+            "parse_cpu_seconds": round(stage_cpu.get("search", 0.0) + stage_cpu.get("fetch", 0.0), 3),
+            "score_cpu_seconds": round(stage_cpu.get("score", 0.0), 3),
+            "stage_cpu_seconds": stage_cpu,
+            "request_errors": sum(entry["errors"] for entry in report["sources"].values()),
+            "http_retries": report["counters"].get("http_retries", 0),
+            # Search/summary requests that still failed after retries; each one cut a source's harvest short
+            "harvest_failures": report["counters"].get("harvest_failures", 0),
+            "rejections": report["rejections"],
+            # ru_maxrss is in kilobytes on Linux and bytes on macOS
+            "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                                 / (1024 * 1024 if sys.platform == "darwin" else 1024), 1),
+        }
+        if options["tracemalloc"]:
+            result["peak_python_heap_mb"] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+        return result
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+
+def _child(base_url, size, options, results):
+    try:
+        results.put(run_harvest(base_url, size, options))
+    except Exception as e:
+        results.put({"size": size, "error": repr(e)})
+
+
+def benchmark(sizes, latency=0.0, jitter=0.0, error_rate=0.0, seed=42, pubmed_share=0.5,
+              duplicate_share=0.05, **options):
+    """Run one isolated harvest per corpus size against a fresh fixture server"""
+    options = {
+        "log_level": "WARNING",
+        "tracemalloc": False,
+        "min_interval": 0.0,
+        "save_interval": None,
+        "fetch_workers": None,
+        "retry_backoff": 0.05,
+        **options,
+    }
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for size in sizes:
+        corpus = FixtureCorpus(size, seed=seed, pubmed_share=pubmed_share, duplicate_share=duplicate_share)
+        with FixtureServer(corpus, latency=latency, jitter=jitter, error_rate=error_rate, seed=seed) as server:
+            queue = context.Queue()
+            process = context.Process(target=_child, args=(server.url, size, options, queue))
+            process.start()
+            result = queue.get()
+            process.join()
+            result["server_requests"] = dict(server.requests)
+            result["injected_errors"] = server.errors
+        results.append(result)
+        print(format_row(result), flush=True)
+    return results
+
+
+HEADER = f"{'papers':>8} {'accepted':>8} {'papers/s':>9} {'req/paper':>9} {'parse cpu':>9} {'score cpu':>9} {'peak MB':>8} {'wall s':>8}"
+
+
+def format_row(result):
+    if "error" in result:
+        return f"{result['size']:>8} failed: {result['error']}"
+    row = (f"{result['papers']:>8} {result['accepted']:>8} {result['papers_per_second']:>9} "
+           f"{result['requests_per_paper']:>9} {result['parse_cpu_seconds']:>9} {result['score_cpu_seconds']:>9} "
+           f"{result['peak_rss_mb']:>8} {result['wall_seconds']:>8}")
+    if result["harvest_failures"]:
+        row += f"  incomplete: {result['harvest_failures']} search requests failed after retries"
+    return row
+
+
+def compare(results, baseline_file, tolerance):
+    """Return the sizes whose papers/sec dropped more than `tolerance` below the baseline"""
+    with open(baseline_file, 'r', encoding='utf-8') as f:
+        baseline = {run["size"]: run for run in json.load(f)["runs"] if "error" not in run}
+    regressions = []
+    for result in results:
+        previous = baseline.get(result["size"])
+        if not previous or "error" in result:
+            continue
+        ratio = result["papers_per_second"] / previous["papers_per_second"]
+        print(f"size {result['size']}: {previous['papers_per_second']} -> {result['papers_per_second']} papers/s ({ratio:.2f}x)")
+        if ratio < 1 - tolerance:
+            regressions.append(result["size"])
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scraper against a local PubMed/arXiv fixture server")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Corpus sizes to harvest (50 to 100000)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every fixture response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Extra random latency, up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 503")
+    parser.add_argument("--pubmed-share", type=float, default=0.5, help="Fraction of the corpus served by PubMed")
+    parser.add_argument("--duplicate-share", type=float, default=0.05, help="Fraction of arXiv entries duplicating a PubMed record")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--fetch-workers", type=int, help="Override the fetch stage's worker count")
+    parser.add_argument("--save-interval", type=int, help="Override how many accepted papers trigger a save")
+    parser.add_argument("--min-interval", type=float, default=0.0, help="Rate limiter spacing per source in seconds")
+    parser.add_argument("--retry-backoff", type=float, default=0.05, help="Seconds before the first retry of a failed request")
+    parser.add_argument("--tracemalloc", action="store_true", help="Also report the peak Python heap (slows the run)")
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--baseline", help="Compare papers/sec against a previous --json file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed papers/sec drop against the baseline")
+    args = parser.parse_args()
+
+    print(HEADER)
+    results = benchmark(
+        args.sizes, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, seed=args.seed,
+        pubmed_share=args.pubmed_share, duplicate_share=args.duplicate_share, tracemalloc=args.tracemalloc,
+        min_interval=args.min_interval, save_interval=args.save_interval, fetch_workers=args.fetch_workers,
+        retry_backoff=args.retry_backoff,
+    )
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({"settings": vars(args), "runs": results}, f, indent=2)
+        print(f"Results saved to {args.json}")
+
+    # A harvest cut short reads fewer papers, so its throughput isn't comparable
+    incomplete = [str(result["size"]) for result in results if "error" in result or result["harvest_failures"]]
+    if incomplete:
+        print(f"Failed or incomplete harvests for sizes: {', '.join(incomplete)}")
+        sys.exit(1)
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        if regressions:
+            print(f"Throughput regression for sizes: {', '.join(map(str, regressions))}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
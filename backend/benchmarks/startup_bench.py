@@ -0,0 +1,163 @@
+"""
+Cold-start benchmark for the backend's Python entry points.
+
+Runs each entry point in a fresh interpreter under `python -X importtime` and reports the
+total import time, wall time, peak RSS and the slowest top-level imports. Each scenario
+has a budget and a list of heavy modules it must not load (e.g. pandas on the streaming
+path); the script exits non-zero when any budget is exceeded, so it can guard startup
+regressions in CI.
+
+Usage (from backend/):
+    python benchmarks/startup_bench.py
+    python benchmarks/startup_bench.py --repeat 5 --json startup.json
+    python benchmarks/startup_bench.py --max-import-ms 300 --max-rss-mb 80   # override every budget
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Budgets are roughly twice the figures measured on a 1-CPU dev box, so noise doesn't fail
+# the check but an accidental top-level import of pandas (~300 ms, ~40 MB) does
+SCENARIOS = {
+    "stream-test": {
+        "args": [os.path.join(BACKEND_DIR, "synthesize-data.py"), "stream", "--test", "--quiet", "--duration", "0.000001"],
+        "max_import_ms": 120,
+        "max_rss_mb": 30,
+        "forbidden": ["numpy", "pandas", "requests"],
+    },
+    "scraper-help": {
+        "args": [os.path.join(BACKEND_DIR, "webScraper.py"), "--help"],
+        "max_import_ms": 350,
+        "max_rss_mb": 60,
+        "forbidden": ["numpy", "pandas", "requests", "bs4", "lxml", "pypdf"],
+    },
+    "scraper-import": {
+        "args": ["-c", "import webScraper"],
+        "max_import_ms": 350,
+        "max_rss_mb": 60,
+        "forbidden": ["numpy", "pandas", "requests", "bs4", "lxml", "pypdf"],
+    },
+}
+
+
+def parse_importtime(stderr):
+    """Return {module: (self µs, cumulative µs, nesting depth)} from -X importtime output"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return modules
+
+
+def run_once(args, cwd):
+    """Run one fresh interpreter and return (exit code, wall seconds, peak RSS in MB, stderr)"""
+    with tempfile.TemporaryFile(mode='w+', encoding='utf-8') as stderr:
+        started = time.perf_counter()
+        process = subprocess.Popen([sys.executable, "-X", "importtime"] + args, cwd=cwd,
+                                   stdout=subprocess.DEVNULL, stderr=stderr)
+        # wait4 reports this child's own peak RSS; RUSAGE_CHILDREN would be the max over every run
+        _, status, usage = os.wait4(process.pid, 0)
+        wall = time.perf_counter() - started
+        stderr.seek(0)
+        return os.waitstatus_to_exitcode(status), wall, usage.ru_maxrss / 1024, stderr.read()
+
+
+def measure(name, scenario, repeat):
+    """Run a scenario `repeat` times and return its median figures plus the modules it loaded"""
+    # Scripts that write output files (biomarker_data.csv) run in a scratch directory
+    workdir = tempfile.mkdtemp(prefix="startup_bench_")
+    env_path = os.environ.get("PYTHONPATH")
+    os.environ["PYTHONPATH"] = BACKEND_DIR + (os.pathsep + env_path if env_path else "")
+    runs = []
+    try:
+        for _ in range(repeat):
+            code, wall, rss_mb, stderr = run_once(scenario["args"], workdir)
+            if code != 0:
+                return {"scenario": name, "error": f"exit code {code}: {stderr.strip().splitlines()[-1:]}"}
+            modules = parse_importtime(stderr)
+            runs.append((sum(entry[0] for entry in modules.values()) / 1000, wall * 1000, rss_mb, modules))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+        if env_path is None:
+            del os.environ["PYTHONPATH"]
+        else:
+            os.environ["PYTHONPATH"] = env_path
+
+    modules = runs[-1][3]
+    top_level = sorted(((cumulative, module) for module, (_, cumulative, depth) in modules.items() if depth == 0),
+                       reverse=True)
+    return {
+        "scenario": name,
+        "import_ms": round(statistics.median(run[0] for run in runs), 1),
+        "wall_ms": round(statistics.median(run[1] for run in runs), 1),
+        "rss_mb": round(statistics.median(run[2] for run in runs), 1),
+        "modules": len(modules),
+        "slowest_imports": [(module, round(cumulative / 1000, 1)) for cumulative, module in top_level[:5]],
+        "forbidden_loaded": [module for module in scenario["forbidden"] if module in modules],
+    }
+
+
+def check_budget(result, scenario, max_import_ms=None, max_rss_mb=None):
+    """Return a list of human-readable budget violations for one result"""
+    if "error" in result:
+        return [result["error"]]
+    violations = []
+    import_budget = max_import_ms or scenario["max_import_ms"]
+    rss_budget = max_rss_mb or scenario["max_rss_mb"]
+    if result["import_ms"] > import_budget:
+        violations.append(f"imports took {result['import_ms']} ms (budget {import_budget} ms)")
+    if result["rss_mb"] > rss_budget:
+        violations.append(f"peak RSS {result['rss_mb']} MB (budget {rss_budget} MB)")
+    if result["forbidden_loaded"]:
+        violations.append(f"loaded {', '.join(result['forbidden_loaded'])}")
+    return violations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check cold-start import time and memory of the backend entry points")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per scenario; the median is reported")
+    parser.add_argument("--max-import-ms", type=float, help="Override every scenario's import-time budget")
+    parser.add_argument("--max-rss-mb", type=float, help="Override every scenario's peak RSS budget")
+    parser.add_argument("--json", help="Write the results to this file")
+    args = parser.parse_args()
+
+    print(f"{'scenario':<16} {'import ms':>9} {'wall ms':>8} {'RSS MB':>7} {'modules':>7}  slowest imports")
+    results = []
+    failures = {}
+    for name in args.scenarios:
+        result = measure(name, SCENARIOS[name], args.repeat)
+        results.append(result)
+        violations = check_budget(result, SCENARIOS[name], args.max_import_ms, args.max_rss_mb)
+        if violations:
+            failures[name] = violations
+        if "error" in result:
+            print(f"{name:<16} {result['error']}")
+            continue
+        slowest = ", ".join(f"{module} {ms}" for module, ms in result["slowest_imports"][:3])
+        print(f"{name:<16} {result['import_ms']:>9} {result['wall_ms']:>8} {result['rss_mb']:>7} {result['modules']:>7}  {slowest}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({"settings": vars(args), "runs": results}, f, indent=2)
+        print(f"Results saved to {args.json}")
+
+    for name, violations in failures.items():
+        print(f"{name}: over budget: {'; '.join(violations)}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,480 @@
+import os
+import io
+import sys
+import json
+import mmap
+import gzip
+import struct
+import hashlib
+import logging
+import argparse
+import threading
+from collections import OrderedDict
+
+try:
+    import zstandard
+except ImportError:  # optional: only needed for codec="zstd"
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+CODECS = (None, "gzip", "zstd")
+
+# corpus.ord: one fixed-width entry per record, in insertion order
+#   key (md5 of the paper ID), block offset in corpus.dat, offset inside the block, record length
+ORDER_ENTRY = struct.Struct("<16sQII")
+# corpus.idx: open-addressing hash table of key -> ordinal + 1 (0 marks an empty slot)
+INDEX_HEADER = struct.Struct("<8sII")
+INDEX_SLOT = struct.Struct("<16sI")
+INDEX_MAGIC = b"BMCIDX1\0"
+# corpus.dat: uncompressed records are length-prefixed; compressed blocks carry both lengths
+RECORD_PREFIX = struct.Struct("<I")
+BLOCK_HEADER = struct.Struct("<II")
+
+CONSOLIDATED_SEPARATOR = "=" * 80
+
+
+def record_key(paper_id):
+    """Fixed-width hash key for a paper ID"""
+    return hashlib.md5(str(paper_id).encode('utf-8')).digest()
+
+
+def _compress(codec, data):
+    if codec == "gzip":
+        return gzip.compress(data, compresslevel=6)
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return data
+
+
+def _decompress(codec, data):
+    if codec == "gzip":
+        return gzip.decompress(data)
+    if codec == "zstd":
+        return zstandard.ZstdDecompressor().decompress(data)
+    return data
+
+
+def _paths(directory):
+    return {name: os.path.join(directory, f"corpus.{name}") for name in ("dat", "ord", "idx", "json")}
+
+
+def _slot_for(key, capacity):
+    return int.from_bytes(key[:8], 'little') & (capacity - 1)
+
+
+class CorpusWriter:
+    """
+    Append-only writer for an indexed paper corpus.
+
+    Records are JSON documents stored in `corpus.dat`, either length-prefixed or, with a
+    codec, packed into compressed blocks of about `block_size` bytes. `corpus.ord` gives
+    the location of the i-th record (fixed-width, so pagination is a seek) and `corpus.idx`
+    is an on-disk hash table from paper ID to record number, so a reader can find any paper
+    with a couple of probes and no scan. Hash slots are only written on flush, after the
+    records they point to, and every hit is checked against the key in `corpus.ord`.
+    `corpus.json` is written last; after a crash the files are truncated back to the last
+    flushed state.
+    """
+
+    def __init__(self, directory, codec=None, block_size=64 * 1024):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec {codec!r}; expected one of {CODECS}")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.paths = _paths(directory)
+        self._lock = threading.Lock()
+
+        meta = self._read_meta()
+        if meta:
+            if codec != meta["codec"] and codec is not None:
+                logger.warning(f"Corpus in {directory} uses codec {meta['codec']!r}; ignoring {codec!r}")
+            self.meta = meta
+        else:
+            self.meta = {"version": FORMAT_VERSION, "codec": codec, "block_size": block_size,
+                         "count": 0, "data_size": 0, "extra": {}}
+        if self.meta["codec"] == "zstd" and zstandard is None:
+            raise RuntimeError("The zstd codec needs the zstandard package (pip install zstandard)")
+
+        self.codec = self.meta["codec"]
+        self.block_size = self.meta["block_size"]
+        self.count = self.meta["count"]
+
+        # Drop anything written after the last flush
+        self._data = open(self.paths["dat"], 'a+b')
+        self._data.truncate(self.meta["data_size"])
+        self._order = open(self.paths["ord"], 'a+b')
+        self._order.truncate(self.count * ORDER_ENTRY.size)
+
+        self._pending = []  # (key, raw bytes) waiting for the current block to fill
+        self._pending_keys = set()
+        self._pending_size = 0
+        self._unindexed = {}  # key -> ordinal of records written since the last flush
+        self._open_index()
+
+    def _read_meta(self):
+        if not os.path.exists(self.paths["json"]):
+            return None
+        with open(self.paths["json"], 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported corpus format version {meta.get('version')}")
+        return meta
+
+    # Hash index ------------------------------------------------------------------------
+
+    def _open_index(self):
+        path = self.paths["idx"]
+        valid = False
+        if os.path.exists(path) and os.path.getsize(path) >= INDEX_HEADER.size:
+            with open(path, 'rb') as f:
+                magic, capacity, count = INDEX_HEADER.unpack(f.read(INDEX_HEADER.size))
+            valid = (magic == INDEX_MAGIC and count == self.count
+                     and os.path.getsize(path) == INDEX_HEADER.size + capacity * INDEX_SLOT.size)
+        if not valid:
+            self._rebuild_index(max(1024, self.count * 2))
+        self._index_file = open(path, 'r+b')
+        self._index = mmap.mmap(self._index_file.fileno(), 0)
+        self._capacity = INDEX_HEADER.unpack_from(self._index, 0)[1]
+
+    def _rebuild_index(self, capacity):
+        """Write a fresh hash table of at least `capacity` slots from corpus.ord"""
+        capacity = 1 << max(10, (capacity - 1).bit_length())
+        table = bytearray(INDEX_HEADER.size + capacity * INDEX_SLOT.size)
+        INDEX_HEADER.pack_into(table, 0, INDEX_MAGIC, capacity, self.count)
+        self._order.flush()
+        with open(self.paths["ord"], 'rb') as f:
+            for ordinal in range(self.count):
+                key = ORDER_ENTRY.unpack(f.read(ORDER_ENTRY.size))[0]
+                self._insert(table, capacity, key, ordinal)
+        tmp_file = f"{self.paths['idx']}.tmp"
+        with open(tmp_file, 'wb') as f:
+            f.write(table)
+        os.replace(tmp_file, self.paths["idx"])
+
+    @staticmethod
+    def _insert(table, capacity, key, ordinal):
+        slot = _slot_for(key, capacity)
+        while True:
+            position = INDEX_HEADER.size + slot * INDEX_SLOT.size
+            existing, value = INDEX_SLOT.unpack_from(table, position)
+            if value == 0 or existing == key:
+                INDEX_SLOT.pack_into(table, position, key, ordinal + 1)
+                return
+            slot = (slot + 1) & (capacity - 1)
+
+    def _lookup(self, key):
+        if key in self._unindexed:
+            return self._unindexed[key]
+        slot = _slot_for(key, self._capacity)
+        while True:
+            existing, value = INDEX_SLOT.unpack_from(self._index, INDEX_HEADER.size + slot * INDEX_SLOT.size)
+            if value == 0:
+                return None
+            if existing == key and value <= self.count:
+                stored = os.pread(self._order.fileno(), 16, (value - 1) * ORDER_ENTRY.size)
+                if stored == key:
+                    return value - 1
+            slot = (slot + 1) & (self._capacity - 1)
+
+    def _update_index(self):
+        """Add the records written since the last flush to the hash table (corpus.ord must be flushed)"""
+        if self.count * 2 > self._capacity:
+            # Keep the load factor at or below 1/2; the rebuild covers every record
+            self._index.close()
+            self._index_file.close()
+            self._rebuild_index(self.count * 2)
+            self._open_index()
+        else:
+            for key, ordinal in self._unindexed.items():
+                self._insert(self._index, self._capacity, key, ordinal)
+        self._unindexed = {}
+
+    # Writing ---------------------------------------------------------------------------
+
+    def __contains__(self, paper_id):
+        key = record_key(paper_id)
+        with self._lock:
+            return key in self._pending_keys or self._lookup(key) is not None
+
+    def __len__(self):
+        return self.count + len(self._pending)
+
+    def append(self, paper_id, record):
+        """Add a record under `paper_id`; returns False (and writes nothing) if the ID is already stored"""
+        key = record_key(paper_id)
+        raw = json.dumps(dict(record, id=paper_id), ensure_ascii=False).encode('utf-8')
+        with self._lock:
+            if key in self._pending_keys or self._lookup(key) is not None:
+                return False
+            self._pending.append((key, raw))
+            self._pending_keys.add(key)
+            self._pending_size += len(raw)
+            if self.codec is None or self._pending_size >= self.block_size:
+                self._write_pending()
+        return True
+
+    def _write_pending(self):
+        if not self._pending:
+            return
+        self._data.seek(0, io.SEEK_END)
+        offset = self._data.tell()
+        entries = []
+        if self.codec is None:
+            for key, raw in self._pending:
+                self._data.write(RECORD_PREFIX.pack(len(raw)))
+                self._data.write(raw)
+                entries.append((key, offset + RECORD_PREFIX.size, 0, len(raw)))
+                offset += RECORD_PREFIX.size + len(raw)
+        else:
+            block = b"".join(raw for _, raw in self._pending)
+            compressed = _compress(self.codec, block)
+            self._data.write(BLOCK_HEADER.pack(len(compressed), len(block)))
+            self._data.write(compressed)
+            inner = 0
+            for key, raw in self._pending:
+                entries.append((key, offset, inner, len(raw)))
+                inner += len(raw)
+
+        for key, block_offset, inner, length in entries:
+            self._order.write(ORDER_ENTRY.pack(key, block_offset, inner, length))
+            self._unindexed[key] = self.count
+            self.count += 1
+        self._pending = []
+        self._pending_keys = set()
+        self._pending_size = 0
+
+    def set_extra(self, name, value):
+        """Store a small piece of bookkeeping (e.g. export progress) with the corpus metadata"""
+        self.meta["extra"][name] = value
+
+    def get_extra(self, name, default=None):
+        return self.meta["extra"].get(name, default)
+
+    def flush(self, close_block=True):
+        """Make everything appended so far durable and visible to new readers"""
+        with self._lock:
+            if close_block:
+                self._write_pending()
+            self._data.flush()
+            self._order.flush()
+            self._update_index()
+            INDEX_HEADER.pack_into(self._index, 0, INDEX_MAGIC, self._capacity, self.count)
+            self._index.flush()
+            self._data.seek(0, io.SEEK_END)
+            self.meta["count"] = self.count
+            self.meta["data_size"] = self._data.tell()
+            tmp_file = f"{self.paths['json']}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self.meta, f, indent=2)
+            os.replace(tmp_file, self.paths["json"])
+
+    def close(self):
+        self.flush()
+        self._index.close()
+        self._index_file.close()
+        self._data.close()
+        self._order.close()
+
+
+class CorpusReader:
+    """
+    Memory-mapped, read-only view of a corpus written by CorpusWriter.
+
+    `get(paper_id)` probes the hash index and reads one record (decompressing at most one
+    block, with a small block cache); `page(offset, limit)` reads a range of records in
+    insertion order. The view is a snapshot; call `refresh()` to pick up newer records.
+    """
+
+    def __init__(self, directory, block_cache=8):
+        self.directory = directory
+        self.paths = _paths(directory)
+        self._block_cache = OrderedDict()
+        self._block_cache_size = block_cache
+        self._maps = []
+        self.refresh()
+
+    def _map(self, path):
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return b""
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(mapped)
+        return mapped
+
+    def refresh(self):
+        """Re-read the metadata and remap the files"""
+        self.close()
+        with open(self.paths["json"], 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.codec = self.meta["codec"]
+        self.count = self.meta["count"]
+        self._data = self._map(self.paths["dat"])
+        self._order = self._map(self.paths["ord"])
+        self._index = self._map(self.paths["idx"])
+        self._capacity = INDEX_HEADER.unpack_from(self._index, 0)[1] if self._index else 0
+        self._block_cache.clear()
+
+    def close(self):
+        for mapped in self._maps:
+            mapped.close()
+        self._maps = []
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, paper_id):
+        return self._ordinal(record_key(paper_id)) is not None
+
+    def _ordinal(self, key):
+        if not self._capacity:
+            return None
+        slot = _slot_for(key, self._capacity)
+        while True:
+            existing, value = INDEX_SLOT.unpack_from(self._index, INDEX_HEADER.size + slot * INDEX_SLOT.size)
+            if value == 0:
+                return None
+            if existing == key and value <= self.count:
+                position = (value - 1) * ORDER_ENTRY.size
+                if self._order[position:position + 16] == key:
+                    return value - 1
+            slot = (slot + 1) & (self._capacity - 1)
+
+    def _block(self, offset):
+        block = self._block_cache.get(offset)
+        if block is None:
+            compressed_size, _ = BLOCK_HEADER.unpack_from(self._data, offset)
+            start = offset + BLOCK_HEADER.size
+            block = _decompress(self.codec, self._data[start:start + compressed_size])
+            self._block_cache[offset] = block
+            if len(self._block_cache) > self._block_cache_size:
+                self._block_cache.popitem(last=False)
+        else:
+            self._block_cache.move_to_end(offset)
+        return block
+
+    def _read(self, ordinal):
+        _, offset, inner, length = ORDER_ENTRY.unpack_from(self._order, ordinal * ORDER_ENTRY.size)
+        if self.codec is None:
+            raw = self._data[offset:offset + length]
+        else:
+            raw = self._block(offset)[inner:inner + length]
+        return json.loads(raw)
+
+    def get(self, paper_id):
+        """Return the record stored under `paper_id`, or None"""
+        ordinal = self._ordinal(record_key(paper_id))
+        return self._read(ordinal) if ordinal is not None else None
+
+    def page(self, offset=0, limit=50):
+        """Records `offset` to `offset + limit` in insertion order"""
+        stop = min(self.count, max(0, offset) + max(0, limit))
+        return [self._read(ordinal) for ordinal in range(max(0, offset), stop)]
+
+    def __iter__(self, start=0):
+        for ordinal in range(start, self.count):
+            yield self._read(ordinal)
+
+    def iter_from(self, start):
+        """Iterate over the records from number `start` on"""
+        return self.__iter__(start)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def format_consolidated_record(record):
+    """Render one record in the legacy consolidated_papers.txt layout"""
+    lines = [
+        "",
+        CONSOLIDATED_SEPARATOR,
+        f"Paper Title: {record.get('title', '')}",
+        f"URL: {record.get('url', '')}",
+        f"Source: {record.get('source', '')}",
+        f"Biomarkers: {record.get('biomarkers', '')}",
+        f"Has Numerical Data: {record.get('has_numerical', '')}",
+        f"Date Retrieved: {record.get('date_retrieved', '')}",
+    ]
+    if record.get('queries'):
+        lines.append(f"Queries: {'; '.join(record['queries'])}")
+    lines.append("-" * 40 + " ABSTRACT " + "-" * 40)
+    lines.append(f"{record.get('abstract') or ''}")
+    return "\n".join(lines) + "\n"
+
+
+def export_consolidated(reader, output_file, start=0, header=None):
+    """
+    Write records from number `start` on to the legacy consolidated text file.
+
+    With `header` the file is rewritten from scratch; otherwise records are appended.
+    Returns the number of records the file now reflects.
+    """
+    with open(output_file, 'w' if header is not None else 'a', encoding='utf-8') as f:
+        if header is not None:
+            f.write(header)
+        for record in reader.iter_from(start):
+            f.write(format_consolidated_record(record))
+    return len(reader)
+
+
+def parse_consolidated(path):
+    """Yield records from a legacy consolidated_papers.txt (used to seed a new corpus)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    fields = {"Paper Title": "title", "URL": "url", "Source": "source", "Biomarkers": "biomarkers",
+              "Has Numerical Data": "has_numerical", "Date Retrieved": "date_retrieved", "Queries": "queries"}
+    for chunk in text.split("\n" + CONSOLIDATED_SEPARATOR + "\n")[1:]:
+        head, _, abstract = chunk.partition(" ABSTRACT " + "-" * 40 + "\n")
+        record = {}
+        for line in head.splitlines():
+            name, _, value = line.partition(": ")
+            if name in fields:
+                record[fields[name]] = value
+        if "title" not in record:
+            continue
+        record["has_numerical"] = record.get("has_numerical") == "True"
+        if "queries" in record:
+            record["queries"] = record["queries"].split("; ")
+        record["abstract"] = abstract.rstrip("\n")
+        yield record
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or export an indexed paper corpus")
+    parser.add_argument("directory", help="Corpus directory (e.g. biomarker_research/corpus)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    get_parser = commands.add_parser("get", help="Print one paper by ID")
+    get_parser.add_argument("paper_id")
+    page_parser = commands.add_parser("page", help="Print a page of papers as JSON lines")
+    page_parser.add_argument("--offset", type=int, default=0)
+    page_parser.add_argument("--limit", type=int, default=20)
+    export_parser = commands.add_parser("export", help="Write the legacy consolidated text file")
+    export_parser.add_argument("output_file")
+    commands.add_parser("stats", help="Print record count and format details")
+    args = parser.parse_args()
+
+    with CorpusReader(args.directory) as reader:
+        if args.command == "get":
+            record = reader.get(args.paper_id)
+            if record is None:
+                print(f"No paper with ID {args.paper_id}", file=sys.stderr)
+                sys.exit(1)
+            print(json.dumps(record, indent=2, ensure_ascii=False))
+        elif args.command == "page":
+            for record in reader.page(args.offset, args.limit):
+                print(json.dumps(record, ensure_ascii=False))
+        elif args.command == "export":
+            header = f"CONSOLIDATED BIOMARKER RESEARCH PAPERS\nExported from: {args.directory}\n{CONSOLIDATED_SEPARATOR}\n"
+            count = export_consolidated(reader, args.output_file, header=header)
+            print(f"Exported {count} papers to {args.output_file}")
+        else:
+            print(json.dumps({"records": len(reader), "codec": reader.codec,
+                              "data_bytes": reader.meta["data_size"]}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
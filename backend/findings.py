@@ -0,0 +1,422 @@
+import os
+import re
+import json
+import mmap
+import logging
+import argparse
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+# Canonical biomarker -> (synthesize-data.py column, unit of that column)
+SYNTHETIC_UNITS = {
+    "cortisol": ("cortisol_ug_dL", "μg/dL"),
+    "lactate": ("lactate_mmol_L", "mmol/L"),
+    "uric acid": ("uric_acid_mg_dL", "mg/dL"),
+    "crp": ("crp_mg_L", "mg/L"),
+    "il-6": ("il6_pg_mL", "pg/mL"),
+}
+# g/mol, for converting molar concentrations of the small-molecule biomarkers
+MOLAR_MASS = {"cortisol": 362.46, "lactate": 90.08, "uric acid": 168.11}
+
+BIOMARKER_PATTERN = re.compile(
+    r"\b(?P<cortisol>cortisol)\b|\b(?P<lactate>lactate|lactic acid)\b|\b(?P<uric>uric acid|urate)\b"
+    r"|\b(?P<crp>(?:hs-?)?crp|c-reactive protein)\b|\b(?P<il6>il-?6|interleukin[- ]6)\b",
+    re.IGNORECASE
+)
+BIOMARKER_GROUPS = {"cortisol": "cortisol", "lactate": "lactate", "uric": "uric acid", "crp": "crp", "il6": "il-6"}
+
+NUMBER = r"\d+(?:\.\d+)?"
+# Mass or molar concentrations (mg/dL, μmol/L, ng/ml ...) and molar shorthand (mM, μM, nM; case-sensitive)
+UNIT = r"(?:(?i:(?:[pnuμµm]|mc)?(?:g|mol))\s*/\s*(?i:[dmuμµ]?l)\b|[pnuμµm]M\b)"
+MEAN_SD_PATTERN = re.compile(rf"(?P<value>{NUMBER})\s*(?:±|\+/-|\+-)\s*(?P<spread>{NUMBER})\s*(?P<unit>{UNIT})?")
+RANGE_PATTERN = re.compile(rf"(?P<value>{NUMBER})\s*(?:-|–|to)\s*(?P<upper>{NUMBER})\s*(?P<unit>{UNIT})")
+VALUE_PATTERN = re.compile(rf"(?P<value>{NUMBER})\s*(?P<unit>{UNIT})")
+P_VALUE_PATTERN = re.compile(r"\bp\s*(?:[<>=≤≥]|&lt;)\s*(?P<value>0?\.\d+)", re.IGNORECASE)
+CORRELATION_PATTERN = re.compile(r"\b(?:r|rho|ρ|correlation(?: coefficient)?)\s*[=:]\s*(?P<value>[-−+]?0?\.\d+)", re.IGNORECASE)
+SAMPLE_SIZE_PATTERN = re.compile(
+    r"\bn\s*=\s*(?P<value>\d+)|\b(?P<count>\d+)\s+(?:healthy\s+)?(?:patients|subjects|participants|volunteers|individuals|adults|children|athletes)\b",
+    re.IGNORECASE
+)
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Za-z(])")
+ABBREVIATIONS = ("vs.", "e.g.", "i.e.", "al.", "approx.", "ca.", "fig.", "no.", "resp.")
+CONTEXT_CHARS = 60
+
+MASS_SCALE = {"g": 1.0, "mg": 1e-3, "μg": 1e-6, "ng": 1e-9, "pg": 1e-12}
+VOLUME_SCALE = {"L": 1.0, "dL": 0.1, "mL": 1e-3, "μL": 1e-6}
+
+# Column name -> storage; "category" columns hold int16 codes into a dictionary kept in the metadata
+COLUMNS = {
+    "paper_id": "S32",
+    "biomarker": "category",
+    "statistic": "category",
+    "value": "<f8",
+    "upper": "<f8",
+    "spread": "<f8",
+    "unit": "category",
+    "norm_value": "<f8",
+    "norm_upper": "<f8",
+    "norm_spread": "<f8",
+    "norm_unit": "category",
+    "span_start": "<i4",
+    "span_end": "<i4",
+}
+
+
+def canonical_unit(unit):
+    """Spell a unit consistently (μg/dL, mmol/L, pg/mL, mM ...)"""
+    if not unit:
+        return ""
+    unit = re.sub(r"\s+", "", unit).replace("µ", "μ")
+    if "/" not in unit:
+        return unit[:-1].replace("u", "μ") + "M"
+    amount, volume = unit.split("/")
+    amount = amount.lower()
+    amount = "μ" + amount[2:] if amount.startswith("mc") else amount.replace("u", "μ")
+    volume = volume.lower().replace("u", "μ")
+    volume = volume[:-1] + "L" if len(volume) > 1 else "L"
+    return f"{amount}/{volume}"
+
+
+def unit_factor(unit, biomarker):
+    """Multiplier converting `unit` to the biomarker's synthesize-data.py unit, or None if it can't be converted"""
+    target = SYNTHETIC_UNITS.get(biomarker)
+    if not unit or target is None:
+        return None
+    unit = canonical_unit(unit)
+    if "/" not in unit:
+        unit = unit[:-1] + "mol/L"
+
+    def parse(spelled):
+        amount, volume = spelled.split("/")
+        molar = amount.endswith("mol")
+        prefix = amount[:-3] if molar else amount[:-1]
+        scale = MASS_SCALE.get(prefix + "g")
+        if scale is None or volume not in VOLUME_SCALE:
+            return None
+        return molar, scale / VOLUME_SCALE[volume]
+
+    source, wanted = parse(unit), parse(target[1])
+    if source is None or wanted is None:
+        return None
+    factor = source[1] / wanted[1]
+    if source[0] != wanted[0]:
+        mass = MOLAR_MASS.get(biomarker)
+        if mass is None:
+            return None  # proteins (CRP, IL-6) are only reported by mass here
+        factor *= mass if source[0] else 1 / mass
+    return factor
+
+
+def _number(text):
+    return float(text.replace("−", "-"))
+
+
+def extract_findings(paper_id, text):
+    """
+    Typed numeric findings in one abstract.
+
+    Concentrations (single values, mean ± SD, ranges) are attributed to the nearest
+    biomarker mentioned before them in the same sentence (else the next one after), and
+    converted to the synthesize-data.py unit where possible. P-values and correlations
+    are attributed the same way; sample sizes are not tied to a biomarker.
+    """
+    rows = []
+    if not text:
+        return rows
+    mentions = [(m.start(), BIOMARKER_GROUPS[m.lastgroup]) for m in BIOMARKER_PATTERN.finditer(text)]
+    sentence_starts = [0] + [m.end() for m in SENTENCE_END.finditer(text)
+                             if not text[max(0, m.start() - 8):m.start()].lower().endswith(ABBREVIATIONS)]
+
+    def sentence_start(position):
+        return sentence_starts[np.searchsorted(sentence_starts, position, side='right') - 1]
+
+    def biomarker_at(position):
+        sentence = sentence_start(position)
+        before = [name for start, name in mentions if sentence <= start < position]
+        if before:
+            return before[-1]
+        following = [(start, name) for start, name in mentions if start > position]
+        if following and all(s > following[0][0] for s in sentence_starts if s > position):
+            return following[0][1]
+        return ""
+
+    def statistic_for(match, default):
+        lead = text[max(sentence_start(match.start()), match.start() - 40):match.start()].lower()
+        if "median" in lead:
+            return "median"
+        if "mean" in lead or "average" in lead:
+            return "mean"
+        return default
+
+    claimed = []
+
+    def add(match, statistic, biomarker, value, upper=None, spread=None, unit=""):
+        span = (match.start(), match.end())
+        if any(start < span[1] and span[0] < end for start, end in claimed):
+            return
+        claimed.append(span)
+        unit = canonical_unit(unit)
+        factor = unit_factor(unit, biomarker) if unit else None
+        scaled = [v * factor if factor is not None and v is not None else None for v in (value, upper, spread)]
+        rows.append({
+            "paper_id": paper_id,
+            "biomarker": biomarker,
+            "statistic": statistic,
+            "value": value,
+            "upper": upper,
+            "spread": spread,
+            "unit": unit,
+            "norm_value": scaled[0],
+            "norm_upper": scaled[1],
+            "norm_spread": scaled[2],
+            "norm_unit": SYNTHETIC_UNITS[biomarker][1] if factor is not None else "",
+            "span_start": span[0],
+            "span_end": span[1],
+            "context": " ".join(text[max(0, span[0] - CONTEXT_CHARS):span[1] + CONTEXT_CHARS].split()),
+        })
+
+    for m in MEAN_SD_PATTERN.finditer(text):
+        add(m, statistic_for(m, "mean"), biomarker_at(m.start()), _number(m["value"]),
+            spread=_number(m["spread"]), unit=m["unit"])
+    for m in RANGE_PATTERN.finditer(text):
+        add(m, "range", biomarker_at(m.start()), _number(m["value"]), upper=_number(m["upper"]), unit=m["unit"])
+    for m in VALUE_PATTERN.finditer(text):
+        add(m, statistic_for(m, "value"), biomarker_at(m.start()), _number(m["value"]), unit=m["unit"])
+    for m in P_VALUE_PATTERN.finditer(text):
+        add(m, "p_value", biomarker_at(m.start()), _number(m["value"]))
+    for m in CORRELATION_PATTERN.finditer(text):
+        add(m, "correlation", biomarker_at(m.start()), _number(m["value"]))
+    for m in SAMPLE_SIZE_PATTERN.finditer(text):
+        add(m, "sample_size", "", float(m["value"] or m["count"]))
+    rows.sort(key=lambda row: row["span_start"])
+    return rows
+
+
+def extract_batch(papers):
+    """Findings for a batch of (paper_id, text) pairs (runs in a worker process)"""
+    rows = []
+    for paper_id, text in papers:
+        rows.extend(extract_findings(paper_id, text))
+    return rows
+
+
+def extract_parallel(papers, batch_size=500, max_workers=None, min_parallel=1000):
+    """Extract findings for many papers, in batches across a process pool when there are enough of them"""
+    papers = list(papers)
+    if len(papers) < min_parallel:
+        return extract_batch(papers)
+    batches = [papers[i:i + batch_size] for i in range(0, len(papers), batch_size)]
+    rows = []
+    # Spawned workers: extraction may be started from a pipeline thread
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as pool:
+        for batch_rows in pool.map(extract_batch, batches):
+            rows.extend(batch_rows)
+    return rows
+
+
+class FindingsTable:
+    """
+    Append-only columnar table of extracted findings (`<output_dir>/findings/`).
+
+    Each column is a flat file of fixed-width values (string columns are int16 codes into
+    dictionaries kept in `findings.json`; the context snippets are a UTF-8 blob with an
+    offsets column), memory-mapped on read so filtering on biomarker or statistic touches
+    only the columns involved. `findings.json` records the committed row count, so a
+    partially written append is truncated away on the next one. It also records how many
+    corpus records have been processed, making extraction incremental.
+    """
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self._lock = threading.RLock()
+        self.meta_file = os.path.join(directory, "findings.json")
+        self.meta = self._load_meta()
+
+    def _load_meta(self):
+        if os.path.exists(self.meta_file):
+            with open(self.meta_file, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get("version") == FORMAT_VERSION:
+                return meta
+            logger.warning("Findings table format changed; findings will be re-extracted")
+        return {"version": FORMAT_VERSION, "rows": 0, "context_bytes": 0, "corpus_position": 0,
+                "categories": {name: [""] for name, kind in COLUMNS.items() if kind == "category"}}
+
+    def _save_meta(self):
+        tmp_file = f"{self.meta_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_file, self.meta_file)
+
+    def _path(self, name):
+        return os.path.join(self.directory, f"{name}.bin")
+
+    def __len__(self):
+        return self.meta["rows"]
+
+    def append(self, rows, corpus_position=None):
+        """Append finding rows (dicts as returned by `extract_findings`)"""
+        with self._lock:
+            count = self.meta["rows"]
+            if rows:
+                contexts = [row["context"].encode('utf-8') for row in rows]
+                offsets = self.meta["context_bytes"] + np.cumsum([len(c) for c in contexts], dtype=np.int64)
+                columns = {}
+                for name, kind in COLUMNS.items():
+                    values = [row[name] for row in rows]
+                    if kind == "category":
+                        dictionary = self.meta["categories"][name]
+                        codes = {label: code for code, label in enumerate(dictionary)}
+                        for label in values:
+                            if label not in codes:
+                                codes[label] = len(dictionary)
+                                dictionary.append(label)
+                        columns[name] = np.array([codes[label] for label in values], dtype="<i2")
+                    elif kind == "<f8":
+                        columns[name] = np.array([np.nan if v is None else v for v in values], dtype=kind)
+                    else:
+                        columns[name] = np.array([v.encode('ascii') if isinstance(v, str) else v for v in values], dtype=kind)
+                columns["context_end"] = offsets
+                for name, array in columns.items():
+                    self._write(name, array, count * array.dtype.itemsize)
+                self._write_blob(b"".join(contexts))
+                self.meta["rows"] = count + len(rows)
+                self.meta["context_bytes"] = int(offsets[-1])
+            if corpus_position is not None:
+                self.meta["corpus_position"] = corpus_position
+            self._save_meta()
+
+    def _write(self, name, array, committed_bytes):
+        with open(self._path(name), 'ab') as f:
+            f.truncate(committed_bytes)  # drop the tail of an interrupted append
+            f.seek(committed_bytes)
+            f.write(array.tobytes())
+
+    def _write_blob(self, data):
+        with open(self._path("context"), 'ab') as f:
+            f.truncate(self.meta["context_bytes"])
+            f.seek(self.meta["context_bytes"])
+            f.write(data)
+
+    def column(self, name):
+        """Memory-mapped raw column (category columns as codes)"""
+        kind = COLUMNS.get(name, "<i8")
+        dtype = np.dtype("<i2" if kind == "category" else kind)
+        if not self.meta["rows"]:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(self._path(name), dtype=dtype, mode='r', shape=(self.meta["rows"],))
+
+    def _code(self, name, label):
+        dictionary = self.meta["categories"][name]
+        return dictionary.index(label) if label in dictionary else -1
+
+    def frame(self, biomarker=None, statistic=None, with_context=False):
+        """The table (optionally filtered) as a pandas DataFrame with categorical string columns"""
+        import pandas as pd  # only frame() needs pandas; the scraper appends without it
+        with self._lock:
+            mask = np.ones(self.meta["rows"], dtype=bool)
+            if biomarker is not None:
+                mask &= self.column("biomarker") == self._code("biomarker", biomarker)
+            if statistic is not None:
+                statistics = [statistic] if isinstance(statistic, str) else statistic
+                mask &= np.isin(self.column("statistic"), [self._code("statistic", s) for s in statistics])
+            selected = np.flatnonzero(mask)
+            data = {}
+            for name, kind in COLUMNS.items():
+                values = np.asarray(self.column(name)[selected])
+                if kind == "category":
+                    data[name] = pd.Categorical.from_codes(values, categories=self.meta["categories"][name])
+                elif kind == "S32":
+                    data[name] = values.astype(str)
+                else:
+                    data[name] = values
+            if with_context:
+                data["context"] = self._contexts(selected)
+            return pd.DataFrame(data)
+
+    def _contexts(self, rows):
+        ends = self.column("context_end")
+        if not len(rows):
+            return []
+        with open(self._path("context"), 'rb') as f:
+            blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        contexts = []
+        for row in rows:
+            start = int(ends[row - 1]) if row else 0
+            contexts.append(blob[start:int(ends[row])].decode('utf-8'))
+        blob.close()
+        return contexts
+
+    def reference_range(self, biomarker, statistics=("mean", "median", "value")):
+        """Summary of the normalized values reported for a biomarker across papers"""
+        df = self.frame(biomarker=biomarker, statistic=list(statistics))
+        values = df["norm_value"].dropna()
+        ranges = self.frame(biomarker=biomarker, statistic="range")[["norm_value", "norm_upper"]].dropna()
+        summary = {
+            "biomarker": biomarker,
+            "unit": SYNTHETIC_UNITS.get(biomarker, (None, None))[1],
+            "findings": int(len(values)),
+            "papers": int(df.loc[df["norm_value"].notna(), "paper_id"].nunique()),
+        }
+        if len(values):
+            summary.update({f"p{q}": float(np.percentile(values, q)) for q in (5, 25, 50, 75, 95)})
+        if len(ranges):
+            summary["reported_range"] = [float(ranges["norm_value"].median()), float(ranges["norm_upper"].median())]
+        return summary
+
+
+def extract_corpus(table, corpus_dir, max_workers=None, min_parallel=1000):
+    """Extract findings from the corpus records added since the last extraction; returns the new row count"""
+    from corpus_store import CorpusReader
+
+    with CorpusReader(corpus_dir) as reader:
+        start = table.meta["corpus_position"]
+        if start >= len(reader):
+            return 0
+        papers = [(record["id"], record.get("abstract") or "") for record in reader.iter_from(start)]
+        end = len(reader)
+    rows = extract_parallel(papers, max_workers=max_workers, min_parallel=min_parallel)
+    table.append(rows, corpus_position=end)
+    return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract or query numeric findings from harvested abstracts")
+    parser.add_argument("directory", help="Findings directory (e.g. biomarker_research/findings)")
+    parser.add_argument("--corpus", help="Corpus store to extract from (default: ../corpus)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    extract_parser = commands.add_parser("extract", help="Extract findings from new corpus papers")
+    extract_parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    query_parser = commands.add_parser("query", help="Print findings")
+    query_parser.add_argument("--biomarker", choices=sorted(SYNTHETIC_UNITS))
+    query_parser.add_argument("--statistic")
+    query_parser.add_argument("--limit", type=int, default=20)
+    commands.add_parser("ranges", help="Reference ranges per biomarker in synthesize-data.py units")
+    args = parser.parse_args()
+    corpus_dir = args.corpus or os.path.join(os.path.dirname(os.path.abspath(args.directory)), "corpus")
+
+    table = FindingsTable(args.directory)
+    if args.command == "extract":
+        added = extract_corpus(table, corpus_dir, max_workers=args.workers)
+        print(f"Added {added} findings ({len(table)} total)")
+    elif args.command == "query":
+        import pandas as pd
+        df = table.frame(biomarker=args.biomarker, statistic=args.statistic, with_context=True)
+        with pd.option_context("display.max_colwidth", 80, "display.width", 200):
+            print(df.head(args.limit).to_string(index=False))
+        print(f"{len(df)} findings")
+    else:
+        print(json.dumps([table.reference_range(biomarker) for biomarker in SYNTHETIC_UNITS], indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
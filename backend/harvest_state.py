@@ -0,0 +1,99 @@
+import os
+import json
+import logging
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class HarvestState:
+    """
+    Per-source, per-query harvest cursors persisted as JSON.
+
+    Each (source, query) pair works through one date window at a time: the window runs
+    from the previous harvest date to the moment it was opened. The cursor is the offset
+    of the next record inside that window, so an interrupted run resumes where it
+    stopped. Once a window is exhausted its end becomes `last_harvest` and the next run
+    only asks the source for records newer than that.
+    """
+
+    def __init__(self, state_file=None):
+        self.state_file = state_file
+        self.entries = {}
+        self.lock = threading.RLock()  # queries for different sources run concurrently
+
+    @staticmethod
+    def key(source, query):
+        return f"{source}:{query.strip().lower()}"
+
+    def get(self, source, query):
+        """Return the state entry for a source/query pair, creating an empty one if needed"""
+        return self.entries.setdefault(self.key(source, query), {
+            "source": source,
+            "query": query,
+            "cursor": 0,
+            "total": None,
+            "window_start": None,
+            "window_end": None,
+            "last_harvest": None,
+        })
+
+    def open_window(self, source, query):
+        """
+        Return (entry, window_start, window_end) for the current harvest window.
+
+        An unfinished window is resumed as-is; otherwise a new one is opened from the
+        last harvest date (None on the first run) up to now.
+        """
+        with self.lock:
+            entry = self.get(source, query)
+            if entry["window_end"] is None:
+                entry["window_start"] = entry["last_harvest"]
+                entry["window_end"] = datetime.now().strftime('%Y-%m-%d %H:%M')
+                entry["cursor"] = 0
+                entry["total"] = None
+            return entry, entry["window_start"], entry["window_end"]
+
+    def advance(self, source, query, cursor, total=None):
+        """Record how far into the current window we have read"""
+        with self.lock:
+            entry = self.get(source, query)
+            entry["cursor"] = cursor
+            if total is not None:
+                entry["total"] = total
+            self.save()
+
+    def complete(self, source, query):
+        """Close the current window; later runs only ask for records newer than its end"""
+        with self.lock:
+            entry = self.get(source, query)
+            entry["last_harvest"] = entry["window_end"]
+            entry["window_start"] = None
+            entry["window_end"] = None
+            entry["cursor"] = 0
+            entry["total"] = None
+            self.save()
+
+    def save(self):
+        if not self.state_file:
+            return
+        with self.lock:
+            try:
+                tmp_file = f"{self.state_file}.tmp"
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    json.dump(self.entries, f, indent=2)
+                os.replace(tmp_file, self.state_file)
+            except OSError as e:
+                logger.error(f"Error saving harvest state: {e}")
+
+    @classmethod
+    def load(cls, state_file):
+        state = cls(state_file)
+        if state_file and os.path.exists(state_file):
+            try:
+                with open(state_file, 'r', encoding='utf-8') as f:
+                    state.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.error(f"Error loading harvest state: {e}")
+        return state
@@ -0,0 +1,318 @@
+import os
+import re
+import json
+import zlib
+import logging
+import base64
+import random
+import struct
+
+# Mersenne prime used for the universal hash family (a*x + b) mod p
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+logger = logging.getLogger(__name__)
+
+DOI_PATTERN = re.compile(r'(10\.\d{4,9}/[^\s"<>]+)', re.IGNORECASE)
+PMID_URL_PATTERN = re.compile(r'(?:pubmed\.ncbi\.nlm\.nih\.gov|ncbi\.nlm\.nih\.gov/pubmed)/(\d+)')
+ARXIV_NEW_PATTERN = re.compile(r'(\d{4}\.\d{4,5})(?:v\d+)?')
+ARXIV_OLD_PATTERN = re.compile(r'([a-z\-]+(?:\.[A-Z]{2})?/\d{7})(?:v\d+)?')
+
+
+def normalize_doi(value):
+    """Return a canonical lowercase DOI or None if the value does not contain one"""
+    if not value:
+        return None
+    match = DOI_PATTERN.search(value)
+    if not match:
+        return None
+    # Trailing punctuation is almost always sentence punctuation, not part of the DOI
+    return match.group(1).rstrip('.,;)').lower()
+
+
+def normalize_pmid(value):
+    """Return a bare PMID from either a number or a PubMed URL"""
+    if not value:
+        return None
+    value = str(value).strip()
+    if value.isdigit():
+        return value
+    match = PMID_URL_PATTERN.search(value)
+    return match.group(1) if match else None
+
+
+def normalize_arxiv_id(value):
+    """Return an arXiv identifier without its version suffix"""
+    if not value:
+        return None
+    value = str(value).strip()
+    if "arxiv" not in value.lower() and not ARXIV_NEW_PATTERN.fullmatch(value):
+        return None
+    match = ARXIV_NEW_PATTERN.search(value) or ARXIV_OLD_PATTERN.search(value)
+    return match.group(1) if match else None
+
+
+def paper_identifiers(paper):
+    """Collect the normalized external identifiers (DOI, PMID, arXiv ID) for a paper dict"""
+    keys = set()
+    url = paper.get('url', '')
+
+    doi = normalize_doi(paper.get('doi')) or normalize_doi(url)
+    if doi:
+        keys.add(f"doi:{doi}")
+
+    pmid = normalize_pmid(paper.get('pmid')) or normalize_pmid(url)
+    if pmid:
+        keys.add(f"pmid:{pmid}")
+
+    arxiv_id = normalize_arxiv_id(paper.get('arxiv_id')) or normalize_arxiv_id(url)
+    if arxiv_id:
+        keys.add(f"arxiv:{arxiv_id}")
+
+    return keys
+
+
+def normalize_text(text):
+    """Lowercase and collapse everything that isn't a letter or digit into single spaces"""
+    return " ".join(re.findall(r'[a-z0-9]+', (text or "").lower()))
+
+
+def char_shingles(text, size=4):
+    """Character n-grams, which tolerate small wording and punctuation differences in titles"""
+    text = normalize_text(text)
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def word_shingles(text, size=3):
+    """Word n-grams, used for abstracts where character shingles would be too numerous"""
+    words = normalize_text(text).split()
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class MinHasher:
+    """MinHash signatures using a seeded universal hash family so signatures are stable across runs"""
+
+    def __init__(self, num_perm=64, seed=1):
+        self.num_perm = num_perm
+        rng = random.Random(seed)
+        self.permutations = [
+            (rng.randint(1, _MERSENNE_PRIME - 1), rng.randint(0, _MERSENNE_PRIME - 1))
+            for _ in range(num_perm)
+        ]
+
+    def signature(self, shingles):
+        """Compute the MinHash signature of a set of shingles (empty tuple for empty input)"""
+        if not shingles:
+            return ()
+        hashes = [zlib.crc32(s.encode('utf-8')) for s in shingles]
+        return tuple(
+            min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+            for a, b in self.permutations
+        )
+
+    @staticmethod
+    def similarity(sig_a, sig_b):
+        """Estimate Jaccard similarity from two signatures of equal length"""
+        if not sig_a or not sig_b:
+            return 0.0
+        return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+
+class PaperDedupIndex:
+    """
+    Near-duplicate index for harvested papers.
+
+    Exact matches are found through normalized DOI/PMID/arXiv identifiers; near matches
+    through MinHash-LSH over the title (character shingles) and abstract (word shingles).
+    Both lookups are a handful of dictionary probes, so checking a paper costs constant
+    expected time regardless of how many papers are indexed.
+
+    Papers still being processed are indexed with `claim()`, which catches concurrent
+    copies but is never saved; `add()` makes the entry permanent and `release()` drops it.
+    """
+
+    VERSION = 1
+
+    def __init__(self, index_file=None, num_perm=64, bands=16, threshold=0.8, title_threshold=0.9):
+        if num_perm % bands != 0:
+            raise ValueError("num_perm must be divisible by bands")
+        self.index_file = index_file
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.title_threshold = title_threshold
+        self.hasher = MinHasher(num_perm)
+
+        self.identifiers = {}  # normalized identifier -> paper_id
+        self.signatures = {}   # paper_id -> {"title": sig, "abstract": sig}
+        self.buckets = {}      # (field, band, band_hash) -> [paper_id, ...]
+        self.claims = {}       # claimed paper_id -> identifiers recorded for it, until add() or release()
+        self.dirty = False
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def _band_keys(self, field, signature):
+        for band in range(self.bands):
+            start = band * self.rows
+            yield (field, band, hash(signature[start:start + self.rows]))
+
+    def _signatures_for(self, paper):
+        sigs = {"title": self.hasher.signature(char_shingles(paper.get('title')))}
+        abstract = paper.get('abstract')
+        if abstract:
+            sigs["abstract"] = self.hasher.signature(word_shingles(abstract))
+        return sigs
+
+    def _index_signatures(self, paper_id, sigs):
+        self.signatures[paper_id] = sigs
+        for field, sig in sigs.items():
+            if not sig:
+                continue
+            for key in self._band_keys(field, sig):
+                bucket = self.buckets.setdefault(key, [])
+                if paper_id not in bucket:
+                    bucket.append(paper_id)
+
+    def find_duplicate(self, paper):
+        """
+        Return the paper ID of an indexed duplicate of `paper`, or None.
+
+        Identifier matches win outright. Otherwise LSH candidates are verified on the
+        abstract signature when both papers have one, and on the title signature (with a
+        stricter threshold, since related papers often share most of a title) when not.
+        """
+        for key in paper_identifiers(paper):
+            match = self.identifiers.get(key)
+            if match is not None:
+                return match
+
+        paper_id = paper.get('id')
+        if paper_id in self.signatures:
+            return paper_id
+
+        sigs = self._signatures_for(paper)
+        candidates = set()
+        for field, sig in sigs.items():
+            if sig:
+                for key in self._band_keys(field, sig):
+                    candidates.update(self.buckets.get(key, ()))
+
+        for candidate in candidates:
+            other = self.signatures.get(candidate, {})
+            if sigs.get("abstract") and other.get("abstract"):
+                if MinHasher.similarity(sigs["abstract"], other["abstract"]) >= self.threshold:
+                    return candidate
+            elif MinHasher.similarity(sigs["title"], other.get("title")) >= self.title_threshold:
+                return candidate
+        return None
+
+    def claim(self, paper_id, paper):
+        """Index an in-flight paper so copies of it are caught until it is added or released"""
+        if paper_id in self.signatures:
+            return
+        self.claims[paper_id] = [key for key in paper_identifiers(paper) if key not in self.identifiers]
+        for key in self.claims[paper_id]:
+            self.identifiers[key] = paper_id
+        self._index_signatures(paper_id, self._signatures_for(paper))
+
+    def release(self, paper_id=None):
+        """Forget a claimed paper (every claim when `paper_id` is None) so a later copy is processed again"""
+        for claimed_id in ([paper_id] if paper_id is not None else list(self.claims)):
+            keys = self.claims.pop(claimed_id, None)
+            if keys is None:
+                continue
+            for key in keys:
+                if self.identifiers.get(key) == claimed_id:
+                    del self.identifiers[key]
+            for field, sig in self.signatures.pop(claimed_id, {}).items():
+                for key in self._band_keys(field, sig) if sig else ():
+                    bucket = self.buckets.get(key)
+                    if bucket and claimed_id in bucket:
+                        bucket.remove(claimed_id)
+                        if not bucket:
+                            del self.buckets[key]
+
+    def add(self, paper_id, paper):
+        """Index a paper under `paper_id` so later copies of it are recognized"""
+        self.claims.pop(paper_id, None)
+        for key in paper_identifiers(paper):
+            self.identifiers.setdefault(key, paper_id)
+        if paper_id not in self.signatures:
+            self._index_signatures(paper_id, self._signatures_for(paper))
+        elif paper.get('abstract') and "abstract" not in self.signatures[paper_id]:
+            # Title-only entry (e.g. backfilled from the registry) now has an abstract
+            sigs = dict(self.signatures[paper_id])
+            sigs["abstract"] = self.hasher.signature(word_shingles(paper['abstract']))
+            self._index_signatures(paper_id, sigs)
+        self.dirty = True
+
+    def add_alias(self, paper_id, paper):
+        """Map a duplicate's identifiers onto the canonical paper so the next hit is exact"""
+        for key in paper_identifiers(paper):
+            if key not in self.identifiers:
+                self.identifiers[key] = paper_id
+                if paper_id in self.claims:
+                    self.claims[paper_id].append(key)
+                self.dirty = True
+
+    @staticmethod
+    def _pack(sig):
+        return base64.b64encode(struct.pack(f"<{len(sig)}I", *sig)).decode('ascii')
+
+    @staticmethod
+    def _unpack(data):
+        raw = base64.b64decode(data)
+        return struct.unpack(f"<{len(raw) // 4}I", raw)
+
+    def save(self, index_file=None):
+        """Persist identifiers and signatures of added papers; LSH buckets are rebuilt on load"""
+        index_file = index_file or self.index_file
+        if not index_file:
+            return
+        payload = {
+            "version": self.VERSION,
+            "num_perm": self.num_perm,
+            "bands": self.bands,
+            "threshold": self.threshold,
+            "identifiers": {key: paper_id for key, paper_id in self.identifiers.items() if paper_id not in self.claims},
+            "signatures": {
+                paper_id: {field: self._pack(sig) for field, sig in sigs.items() if sig}
+                for paper_id, sigs in self.signatures.items() if paper_id not in self.claims
+            },
+        }
+        tmp_file = f"{index_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(payload, f)
+        os.replace(tmp_file, index_file)
+        self.dirty = False
+
+    @classmethod
+    def load(cls, index_file, **kwargs):
+        """Load an index from disk, returning an empty one if the file is missing or stale"""
+        index = cls(index_file=index_file, **kwargs)
+        if not index_file or not os.path.exists(index_file):
+            return index
+        try:
+            with open(index_file, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Error loading dedup index, rebuilding: {e}")
+            return index
+
+        if (payload.get("version") != cls.VERSION or payload.get("num_perm") != index.num_perm
+                or payload.get("bands") != index.bands):
+            logger.warning("Dedup index parameters changed, rebuilding")
+            return index
+
+        index.identifiers = payload.get("identifiers", {})
+        for paper_id, sigs in payload.get("signatures", {}).items():
+            index._index_signatures(
+                paper_id, {field: cls._unpack(data) for field, data in sigs.items()}
+            )
+        return index
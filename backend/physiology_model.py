@@ -0,0 +1,302 @@
+"""
+Vectorized physiology model with correlated noise and scheduled scenario events.
+
+Each biomarker is the sum of:
+
+  baseline    per-subject level (population mean plus a fixed individual offset)
+  rhythms     circadian components keyed to the time of day
+  events      scheduled scenarios (exercise, inflammation, stress, meals, sleep), each
+              moving several biomarkers together through onset and decay kernels
+  noise       AR(1) noise per biomarker with its own time constant, whose innovations
+              are correlated across biomarkers through a Cholesky factor
+
+Everything is evaluated with whole-array operations. The only Python loops run over
+events and over AR blocks of a few thousand samples, so multi-day fleets at 1-50 Hz
+generate at roughly the speed of the plain sinusoids in synthesize-data.py. Long runs can
+be produced in chunks; the noise state carries over and events are evaluated per chunk,
+so chunked output equals a single pass.
+"""
+import json
+import math
+from collections import namedtuple
+
+import numpy as np
+
+try:
+    from scipy.signal import lfilter
+except ImportError:  # optional: a blocked NumPy recurrence is used instead
+    lfilter = None
+
+# Column order matches the readings written by synthesize-data.py
+BIOMARKERS = ("cortisol_ug_dL", "lactate_mmol_L", "uric_acid_mg_dL", "crp_mg_L",
+              "il6_pg_mL", "body_temp_C", "heart_rate_BPM", "blood_oxygen_pct")
+
+# Population means (as in synthesize-data.py) and the SD of individual baselines
+BASELINE = np.array([15.0, 1.3, 5.3, 1.0, 1.5, 37.0, 75.0, 97.0])
+BASELINE_SPREAD = np.array([2.0, 0.2, 0.8, 0.5, 0.4, 0.15, 6.0, 0.6])
+
+# Hard physiological limits. They are wider than the resting ranges because events such as
+# inflammation push CRP and IL-6 far above normal.
+LIMITS = np.array([
+    (1.0, 60.0), (0.3, 25.0), (2.0, 12.0), (0.05, 300.0),
+    (0.0, 500.0), (35.0, 41.5), (35.0, 200.0), (80.0, 100.0),
+])
+
+# Stationary noise SD and AR(1) time constant (seconds) per biomarker
+NOISE_SD = np.array([0.8, 0.08, 0.12, 0.1, 0.2, 0.04, 2.5, 0.3])
+NOISE_TAU = np.array([600.0, 60.0, 1800.0, 3600.0, 900.0, 300.0, 20.0, 30.0])
+
+# Correlation of the noise innovations (order of BIOMARKERS)
+NOISE_CORRELATION = np.eye(len(BIOMARKERS))
+for (a, b), rho in {
+    ("cortisol_ug_dL", "heart_rate_BPM"): 0.30,
+    ("lactate_mmol_L", "heart_rate_BPM"): 0.50,
+    ("lactate_mmol_L", "blood_oxygen_pct"): -0.20,
+    ("crp_mg_L", "il6_pg_mL"): 0.60,
+    ("il6_pg_mL", "body_temp_C"): 0.30,
+    ("body_temp_C", "heart_rate_BPM"): 0.25,
+    ("cortisol_ug_dL", "il6_pg_mL"): -0.15,
+}.items():
+    i, j = BIOMARKERS.index(a), BIOMARKERS.index(b)
+    NOISE_CORRELATION[i, j] = NOISE_CORRELATION[j, i] = rho
+
+# Circadian components: (amplitude, hour of the peak)
+RHYTHMS = {
+    "cortisol_ug_dL": (5.0, 8.0),
+    "body_temp_C": (0.3, 17.0),
+    "heart_rate_BPM": (4.0, 15.0),
+    "uric_acid_mg_dL": (0.2, 6.0),
+    "il6_pg_mL": (0.4, 4.0),
+}
+
+# Per event kind: biomarker -> (peak change at intensity 1, onset time constant s, decay time constant s)
+EVENT_EFFECTS = {
+    "exercise": {
+        "lactate_mmol_L": (4.5, 90, 600),
+        "heart_rate_BPM": (55.0, 45, 240),
+        "body_temp_C": (0.6, 600, 1200),
+        "cortisol_ug_dL": (4.0, 900, 2700),
+        "blood_oxygen_pct": (-1.5, 60, 180),
+        "il6_pg_mL": (2.5, 1800, 7200),
+    },
+    "inflammation": {
+        "crp_mg_L": (25.0, 6 * 3600, 24 * 3600),
+        "il6_pg_mL": (18.0, 2 * 3600, 6 * 3600),
+        "body_temp_C": (1.0, 2 * 3600, 4 * 3600),
+        "heart_rate_BPM": (10.0, 2 * 3600, 4 * 3600),
+        "cortisol_ug_dL": (3.0, 3600, 3 * 3600),
+    },
+    "stress": {
+        "cortisol_ug_dL": (8.0, 900, 3600),
+        "heart_rate_BPM": (15.0, 60, 600),
+        "lactate_mmol_L": (0.3, 300, 900),
+    },
+    "meal": {
+        "uric_acid_mg_dL": (0.8, 3600, 3 * 3600),
+        "lactate_mmol_L": (0.4, 900, 1800),
+        "heart_rate_BPM": (6.0, 600, 1800),
+    },
+    "sleep": {
+        "heart_rate_BPM": (-12.0, 1200, 1200),
+        "body_temp_C": (-0.3, 1800, 1800),
+        "cortisol_ug_dL": (-4.0, 1800, 3600),
+        "blood_oxygen_pct": (-0.5, 600, 600),
+    },
+}
+
+# Random timelines: kind -> (events per day, mean duration s, intensity range)
+DEFAULT_EVENT_RATES = {
+    "exercise": (0.8, 2700, (0.4, 1.0)),
+    "inflammation": (0.05, 2 * 86400, (0.3, 1.0)),
+    "stress": (1.5, 1800, (0.3, 1.0)),
+    "meal": (3.0, 1800, (0.5, 1.0)),
+    "sleep": (1.0, 7.5 * 3600, (0.8, 1.0)),
+}
+
+ScenarioEvent = namedtuple("ScenarioEvent", "kind start duration intensity")
+ScenarioEvent.__doc__ = "A scheduled scenario: `start` and `duration` in seconds from the start of the run"
+
+# Events keep affecting the signals for this many decay time constants after they end
+DECAY_HORIZON = 6.0
+
+
+def random_timeline(duration_seconds, rates=None, rng=None):
+    """Draw a Poisson timeline of events over `duration_seconds`, sorted by start time"""
+    rng = rng if rng is not None else np.random.default_rng()
+    events = []
+    for kind, (per_day, mean_duration, (low, high)) in (rates or DEFAULT_EVENT_RATES).items():
+        count = rng.poisson(per_day * duration_seconds / 86400)
+        starts = rng.uniform(0, duration_seconds, count)
+        durations = rng.gamma(4.0, mean_duration / 4.0, count)
+        intensities = rng.uniform(low, high, count)
+        events.extend(ScenarioEvent(kind, float(s), float(d), float(i)) for s, d, i in zip(starts, durations, intensities))
+    return sorted(events, key=lambda event: event.start)
+
+
+def load_timeline(path):
+    """Read a JSON list of {"kind", "start", "duration", "intensity"} events (times in seconds)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        entries = json.load(f)
+    events = []
+    for entry in entries:
+        if entry["kind"] not in EVENT_EFFECTS:
+            raise ValueError(f"Unknown event kind {entry['kind']!r} (expected one of {', '.join(EVENT_EFFECTS)})")
+        events.append(ScenarioEvent(entry["kind"], float(entry["start"]), float(entry["duration"]),
+                                    float(entry.get("intensity", 1.0))))
+    return sorted(events, key=lambda event: event.start)
+
+
+def event_kernel(t, duration, rise, decay):
+    """
+    Response (0..1) to an event at times `t` relative to its start.
+
+    While the event lasts the response rises towards 1 with time constant `rise`. After
+    it ends, the value reached decays towards 0 with time constant `decay`.
+    """
+    response = np.zeros_like(t)
+    active = (t >= 0) & (t < duration)
+    response[active] = -np.expm1(-t[active] / rise)
+    after = t >= duration
+    if after.any():
+        peak = -math.expm1(-duration / rise)
+        response[after] = peak * np.exp(-(t[after] - duration) / decay)
+    return response
+
+
+def ar1_filter(innovations, phi, state):
+    """
+    Run x[t] = phi * x[t-1] + innovations[t] down axis 0 for every column.
+
+    `phi` has one coefficient per column and `state` holds x[-1]. Returns the filtered
+    array. `state` is updated in place to the last row, so the next chunk continues
+    from it.
+    """
+    n = len(innovations)
+    if n == 0:
+        return innovations
+    if lfilter is not None:
+        out = np.empty_like(innovations)
+        for value in np.unique(phi):
+            columns = phi == value
+            out[:, columns], _ = lfilter([1.0], [1.0, -value], innovations[:, columns], axis=0,
+                                         zi=(value * state[columns])[None, :])
+        state[:] = out[-1]
+        return out
+
+    # Blocked closed form: within a block, y[k] = phi^k * cumsum(phi^-j * e[j]) + phi^(k+1) * state.
+    # The block length keeps phi^-k below 1e6, so the rescaling costs no meaningful precision.
+    smallest = float(phi.min())
+    block = 4096 if smallest >= 1.0 else int(min(4096, max(1, math.log(1e6) / -math.log(max(smallest, 1e-300)))))
+    k = np.arange(block, dtype=np.float64)[:, None]
+    grow = phi ** -k
+    shrink = phi ** k
+    carry = shrink * phi
+    out = np.empty_like(innovations)
+    for begin in range(0, n, block):
+        chunk = innovations[begin:begin + block]
+        size = len(chunk)
+        filtered = np.cumsum(chunk * grow[:size], axis=0)
+        filtered *= shrink[:size]
+        filtered += carry[:size] * state
+        out[begin:begin + size] = filtered
+        state[:] = filtered[-1]
+    return out
+
+
+class PhysiologyModel:
+    """
+    Correlated multi-biomarker signal generator for one or more subjects.
+
+    `simulate()` yields the signals chunk by chunk and `generate()` returns a whole run.
+    Each subject gets its own baseline offset, noise stream and (with `events="random"`)
+    its own random timeline; a fixed `seed` makes the output reproducible.
+    """
+
+    def __init__(self, sample_rate=50, seed=None, add_noise=True, add_rhythms=True,
+                 correlation=NOISE_CORRELATION, noise_sd=NOISE_SD, noise_tau=NOISE_TAU):
+        self.sample_rate = sample_rate
+        self.add_noise = add_noise
+        self.add_rhythms = add_rhythms
+        self.rng = np.random.default_rng(seed)
+        self.cholesky = np.linalg.cholesky(np.asarray(correlation, dtype=np.float64))
+        self.noise_sd = np.asarray(noise_sd, dtype=np.float64)
+        self.phi = np.exp(-1.0 / (np.asarray(noise_tau, dtype=np.float64) * sample_rate))
+        # Innovation scale that gives each AR(1) process a stationary SD of noise_sd
+        self.innovation_sd = self.noise_sd * np.sqrt(1.0 - self.phi ** 2)
+
+    def _timelines(self, events, subjects, duration_seconds):
+        if events is None:
+            return [[] for _ in range(subjects)]
+        if isinstance(events, str):
+            if events != "random":
+                raise ValueError(f"events must be a list, a callable or 'random', not {events!r}")
+            return [random_timeline(duration_seconds, rng=self.rng) for _ in range(subjects)]
+        if callable(events):
+            return [list(events(subject)) for subject in range(subjects)]
+        return [list(events)] * subjects
+
+    def simulate(self, duration_seconds, start_time=None, events=None, subjects=1, chunk_seconds=3600):
+        """
+        Yield (seconds since start, {biomarker: array shaped (subjects, samples)}) chunk by chunk.
+
+        `events` is None, a list of ScenarioEvent shared by all subjects, a callable
+        returning one subject's list, or "random" for a fresh random timeline per subject.
+        `start_time` (a datetime) places the circadian rhythms; it defaults to midnight.
+        """
+        total = int(round(duration_seconds * self.sample_rate))
+        chunk = max(1, int(chunk_seconds * self.sample_rate))
+        n_markers = len(BIOMARKERS)
+        day_offset = 0.0
+        if start_time is not None:
+            day_offset = start_time.hour * 3600 + start_time.minute * 60 + start_time.second + start_time.microsecond / 1e6
+
+        baseline = BASELINE + self.rng.standard_normal((subjects, n_markers)) * BASELINE_SPREAD
+        # One entry per (subject, event, affected biomarker), so each chunk only visits the ones overlapping it
+        impacts = [(subject, BIOMARKERS.index(name), amplitude * event.intensity, event.start, event.duration, rise, decay)
+                   for subject, timeline in enumerate(self._timelines(events, subjects, duration_seconds))
+                   for event in timeline
+                   for name, (amplitude, rise, decay) in EVENT_EFFECTS[event.kind].items()]
+        impact_starts = np.array([impact[3] for impact in impacts])
+        impact_stops = np.array([start + duration + DECAY_HORIZON * decay
+                                 for _, _, _, start, duration, _, decay in impacts])
+        # Noise starts from its stationary distribution so there is no warm-up transient
+        phi = np.tile(self.phi, subjects)
+        state = (self.rng.standard_normal((subjects, n_markers)) @ self.cholesky.T * self.noise_sd).ravel()
+
+        for begin in range(0, total, chunk):
+            size = min(chunk, total - begin)
+            t = (begin + np.arange(size)) / self.sample_rate
+            signals = np.broadcast_to(baseline[:, :, None], (subjects, n_markers, size)).copy()
+
+            if self.add_rhythms:
+                hours = (t + day_offset) / 3600.0
+                for name, (amplitude, peak_hour) in RHYTHMS.items():
+                    signals[:, BIOMARKERS.index(name)] += amplitude * np.cos(2 * np.pi * (hours - peak_hour) / 24.0)
+
+            overlapping = np.flatnonzero((impact_starts <= t[-1]) & (impact_stops >= t[0]))
+            for k in overlapping:
+                subject, index, amplitude, start, duration, rise, decay = impacts[k]
+                first = max(0, int(math.ceil((start - t[0]) * self.sample_rate)))
+                last = min(size, int(impact_stops[k] * self.sample_rate) - begin + 1)
+                window = t[first:last] - start
+                signals[subject, index, first:last] += amplitude * event_kernel(window, duration, rise, decay)
+
+            if self.add_noise:
+                innovations = self.rng.standard_normal((size, subjects, n_markers)) @ self.cholesky.T
+                innovations *= self.innovation_sd
+                noise = ar1_filter(innovations.reshape(size, subjects * n_markers), phi, state)
+                signals += noise.reshape(size, subjects, n_markers).transpose(1, 2, 0)
+
+            np.clip(signals, LIMITS[:, 0][None, :, None], LIMITS[:, 1][None, :, None], out=signals)
+            yield t, {name: signals[:, i] for i, name in enumerate(BIOMARKERS)}
+
+    def generate(self, duration_seconds, start_time=None, events=None, subjects=1, chunk_seconds=3600):
+        """Whole run as (seconds since start, {biomarker: array shaped (subjects, samples)})"""
+        times, columns = [], {name: [] for name in BIOMARKERS}
+        for t, signals in self.simulate(duration_seconds, start_time, events, subjects, chunk_seconds):
+            times.append(t)
+            for name in BIOMARKERS:
+                columns[name].append(signals[name])
+        if not times:
+            return np.zeros(0), {name: np.zeros((subjects, 0)) for name in BIOMARKERS}
+        return np.concatenate(times), {name: np.concatenate(parts, axis=1) for name, parts in columns.items()}
@@ -0,0 +1,160 @@
+import bisect
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+logger = logging.getLogger(__name__)
+
+
+class QueryPlanner:
+    """
+    Runs a list of search queries as one harvest.
+
+    PubMed searches run concurrently (each source's RateLimiter still spaces out its
+    requests) and their ID sets are merged before anything else is fetched, so a paper
+    returned by several queries is summarized, fetched and scored once, and tagged with
+    every query that matched it. arXiv results arrive with their abstracts, so each
+    query's pages are streamed straight into the pipeline; a paper another query
+    already streamed only gains the query tag. Papers already known to the duplicate
+    index are dropped before their summaries are requested or they enter the pipeline.
+
+    Searching doesn't move the harvest cursors: each (source, query) position is only
+    committed after the pipeline has persisted the papers, so an interrupted or failed
+    run reads the same records again next time.
+    """
+
+    def __init__(self, scraper, max_workers=8):
+        self.scraper = scraper
+        self.max_workers = max_workers
+        self.report = {}
+        self.positions = {}  # (source, query) -> (cursor, total) after this run's results
+        self._arxiv_queries = {}  # arXiv paper ID -> query tags of the paper already streamed
+        self._lock = threading.Lock()
+
+    def collect(self, queries, max_results_per_query=50):
+        """
+        Run every query against PubMed and merge the results.
+
+        Returns PMID -> matching queries. The window position reached by each search is
+        kept in `positions` for `commit_positions()`.
+        """
+        scraper = self.scraper
+        per_source = max_results_per_query // 2 if max_results_per_query is not None else None
+        pubmed_hits = {}
+        hit_count = 0
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(scraper.search_pubmed_ids, query, per_source): query for query in queries}
+            for future in as_completed(futures):
+                query = futures[future]
+                try:
+                    found, cursor, total = future.result()
+                except Exception as e:
+                    logger.error(f"Error searching pubmed for '{query}': {e}")
+                    continue
+                if cursor is not None:
+                    self.positions[("pubmed", query)] = (cursor, total)
+                hit_count += len(found)
+                logger.info(f"pubmed: {len(found)} results for '{query}'")
+                for pmid in found:
+                    pubmed_hits.setdefault(pmid, []).append(query)
+
+        self.report["hits"] += hit_count
+        self.report["unique"] += len(pubmed_hits)
+        return pubmed_hits
+
+    def arxiv_papers(self, query, max_results=50):
+        """
+        Stream one query's arXiv results, skipping papers the duplicate index knows.
+
+        A paper another query already streamed isn't yielded again; the query is added to
+        its tags instead (papers persisted before the tag arrives keep the earlier ones).
+        The window position is kept in `positions` once the search has been read to its end.
+        """
+        scraper = self.scraper
+        position = {}
+        for paper in scraper.iter_arxiv(query, max_results, position=position):
+            with self._lock:
+                self.report["hits"] += 1
+                tags = self._arxiv_queries.get(paper["id"])
+                if tags is None:
+                    self.report["unique"] += 1
+                    self._arxiv_queries[paper["id"]] = paper["queries"] = [query]
+                elif query not in tags:
+                    bisect.insort(tags, query)
+            if tags is not None:
+                continue
+            if not scraper.is_new_paper(paper):
+                with self._lock:
+                    self.report["already_known"] += 1
+                continue
+            yield paper
+        if position:
+            self.positions[("arxiv", query)] = (position["cursor"], position["total"])
+
+    def commit_positions(self, pubmed_hits, failed_pmids=()):
+        """
+        Advance the harvest cursors of the last `collect()` once its papers are persisted.
+
+        Nothing moves if the pipeline aborted or dropped papers on errors, and PubMed
+        queries whose summaries couldn't all be fetched keep their position. Returns the
+        number of cursors advanced.
+        """
+        scraper = self.scraper
+        if scraper.last_run_errors != 0:
+            logger.warning("Harvest cursors not advanced: the pipeline reported errors, so this window is read again next run")
+            return 0
+        # Queries that returned a PMID whose summary batch failed
+        retry = {("pubmed", query) for pmid in failed_pmids for query in pubmed_hits.get(pmid, [])}
+        if retry:
+            logger.warning(f"{len(retry)} PubMed harvest cursors not advanced: summaries couldn't be fetched")
+        advanced = 0
+        for (source, query), (cursor, total) in self.positions.items():
+            if (source, query) not in retry:
+                scraper.commit_harvest_position(source, query, cursor, total)
+                advanced += 1
+        return advanced
+
+    def run(self, queries, max_results_per_query=50):
+        """Harvest every query, process each unique paper once and return the run report"""
+        scraper = self.scraper
+        self.report = {"queries": len(queries), "hits": 0, "unique": 0, "already_known": 0}
+        self.positions = {}
+        self._arxiv_queries = {}
+        scraper.ensure_consolidated_file("; ".join(queries))
+
+        logger.info(f"Searching {len(queries)} queries on PubMed concurrently...")
+        per_source = max_results_per_query // 2 if max_results_per_query is not None else None
+        pubmed_hits = self.collect(queries, max_results_per_query)
+
+        # Drop PMIDs the duplicate index already knows before asking for their summaries;
+        # papers that failed in an earlier run were never recorded, so they are asked for again
+        with scraper.state_lock:
+            new_pmids = [pmid for pmid in pubmed_hits
+                         if f"pmid:{pmid}" not in scraper.dedup_index.identifiers]
+        self.report["already_known"] += len(pubmed_hits) - len(new_pmids)
+
+        failed_pmids = []
+
+        def pubmed_papers():
+            for paper in scraper.iter_pubmed_summaries(new_pmids, failed=failed_pmids):
+                paper["queries"] = sorted(pubmed_hits.get(paper["pmid"], []))
+                yield paper
+
+        logger.info(f"Processing {len(new_pmids)} unique new PubMed papers and streaming arXiv results...")
+        producers = [pubmed_papers()] + [self.arxiv_papers(query, per_source) for query in queries]
+        self.report["accepted"] = scraper.run_pipeline(producers)
+        if self.report["already_known"]:
+            scraper.metrics.record_cache_hit("known_identifier", self.report["already_known"])
+        self.report["cursors_advanced"] = self.commit_positions(pubmed_hits, failed_pmids)
+
+        # Work a per-query run would have repeated: cross-query repeats plus known papers
+        self.report["cross_query_duplicates"] = self.report["hits"] - self.report["unique"]
+        self.report["fetches_saved"] = self.report["cross_query_duplicates"] + self.report["already_known"]
+
+        logger.info("Query plan summary:")
+        logger.info(f"- {self.report['hits']} results across {self.report['queries']} queries, {self.report['unique']} unique")
+        logger.info(f"- {self.report['cross_query_duplicates']} cross-query duplicates and "
+                    f"{self.report['already_known']} already known papers skipped before fetching")
+        logger.info(f"- {self.report['accepted']} papers accepted")
+        return self.report
@@ -0,0 +1,533 @@
+"""
+Relevance rules for harvested papers, and a store of every scored abstract for re-scoring.
+
+RelevanceRules holds the vocabulary and patterns that decide whether a paper is accepted
+(biomarker terms, inflammation terms, numeric-data patterns and table/figure indicators).
+The defaults are the scraper's original rules; `<output_dir>/relevance_rules.json` can
+override any of the lists.
+
+AbstractStore (`<output_dir>/abstracts/`) keeps every paper the scraper scored, accepted or
+not, so a rule change can be applied without fetching anything again:
+
+  records/            raw records (title, URL, original abstract...) in a corpus_store directory
+  text.bin            lowercased scoring text of every row, each terminated by a NUL byte
+  text_end.bin        end offset of each row in text.bin (int64)
+  status.bin          current decision per row (uint8 index into STATUSES)
+  features/<key>.bin  per-rule hit column (uint8), one for every term or pattern scored so far
+  abstracts.json      committed row count and the rows each feature column covers
+
+The features of the tracked rules are computed as rows are flushed, so rescoring under
+them scans nothing. `rescore()` only scans the text for rules without an up-to-date
+column, in shards across worker processes: terms with one pass over a shard's UTF-8
+bytes, patterns only on the rows containing a substring every match needs. The decisions
+are then a few vectorized boolean operations over the feature columns.
+"""
+import os
+import re
+import json
+import bisect
+import hashlib
+import logging
+import argparse
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+try:
+    from re import _parser as sre_parse, _constants as sre_constants
+except ImportError:  # Python < 3.11
+    import sre_parse
+    import sre_constants
+
+from corpus_store import CorpusWriter, CorpusReader
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+ID_DTYPE = np.dtype("S32")
+STATUSES = ("accepted", "not_relevant", "no_numeric_data")
+ACCEPTED, NOT_RELEVANT, NO_NUMERIC_DATA = range(len(STATUSES))
+
+DEFAULT_RULES = {
+    "biomarkers": ["cortisol", "lactate", "uric acid", "crp", "il-6", "interleukin-6"],
+    "inflammation_terms": ["inflammation", "inflammatory", "inflamed", "immune response", "cytokine"],
+    # Regular expressions matched against the lowercased text
+    "numerical_patterns": [
+        r'\d+\s*(?:pg/ml|ng/ml|mg/l|μmol/l|mmol/l|μg/dl|mg/dl|pmol/l)',  # Units
+        r'p\s*[<>=]\s*0\.\d+',  # p-values
+        r'[+-]?\s*\d+(?:\.\d+)?%',  # Percentage values
+        r'mean\s*[±:]\s*\d+(?:\.\d+)?',  # Mean values
+        r'\d+(?:\.\d+)?\s*±\s*\d+(?:\.\d+)?',  # Values with standard deviations
+        r'correlation\s*(?:coefficient)?\s*[=:]\s*[+-]?\d+\.\d+',  # Correlation values
+        r'(?:concentration|level)s?\s*(?:of|were|was)\s*\d+(?:\.\d+)?',  # Concentration statements
+        r'\d+\s*(?:patients|subjects|participants)',  # Sample sizes
+        r'(?:significantly|considerably)\s*(?:higher|lower|increased|decreased)',  # Statistical significance terms
+        r'fold[- ]?change',  # Fold change
+        r'hazard ratio',  # Statistical measures
+        r'confidence interval',  # Statistical measures
+        r'odds ratio',  # Statistical measures
+    ],
+    # Plain substrings that suggest tables or figures
+    "table_indicators": ['table', 'fig.', 'figure', 'chart', 'graph', 'plot', 'diagram', 'data shown'],
+}
+TERM_LISTS = ("biomarkers", "inflammation_terms", "table_indicators")
+
+
+def scoring_text(text):
+    """The form every rule is matched against (NUL terminates rows in the text blob)"""
+    return (text or "").lower().replace("\x00", " ")
+
+
+class RelevanceRules:
+    """
+    Acceptance rules: a paper is relevant if it mentions inflammation or any biomarker, and
+    accepted if it is relevant and has numeric data (a numerical pattern or table indicator).
+    """
+
+    def __init__(self, biomarkers=None, inflammation_terms=None, numerical_patterns=None, table_indicators=None):
+        self.biomarkers = list(DEFAULT_RULES["biomarkers"] if biomarkers is None else biomarkers)
+        self.inflammation_terms = list(DEFAULT_RULES["inflammation_terms"] if inflammation_terms is None else inflammation_terms)
+        self.numerical_patterns = list(DEFAULT_RULES["numerical_patterns"] if numerical_patterns is None else numerical_patterns)
+        self.table_indicators = list(DEFAULT_RULES["table_indicators"] if table_indicators is None else table_indicators)
+        self._compiled = [re.compile(pattern) for pattern in self.numerical_patterns]
+
+    @classmethod
+    def load(cls, path):
+        """Rules from a JSON file with any of the DEFAULT_RULES keys; defaults when it doesn't exist"""
+        if not path or not os.path.exists(path):
+            return cls()
+        with open(path, 'r', encoding='utf-8') as f:
+            overrides = json.load(f)
+        unknown = set(overrides) - set(DEFAULT_RULES)
+        if unknown:
+            raise ValueError(f"Unknown relevance rule lists in {path}: {', '.join(sorted(unknown))}")
+        return cls(**overrides)
+
+    def save(self, path):
+        tmp_file = f"{path}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+        os.replace(tmp_file, path)
+
+    def to_dict(self):
+        return {"biomarkers": self.biomarkers, "inflammation_terms": self.inflammation_terms,
+                "numerical_patterns": self.numerical_patterns, "table_indicators": self.table_indicators}
+
+    @property
+    def version(self):
+        return hashlib.sha1(json.dumps(self.to_dict(), sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+    def check_relevance(self, text):
+        """(is_relevant, biomarkers found) for one text"""
+        text_lower = scoring_text(text)
+        has_inflammation = any(term in text_lower for term in self.inflammation_terms)
+        found_biomarkers = [biomarker for biomarker in self.biomarkers if biomarker in text_lower]
+        return has_inflammation or len(found_biomarkers) > 0, found_biomarkers
+
+    def has_numerical_data(self, text):
+        text_lower = scoring_text(text)
+        return (any(pattern.search(text_lower) for pattern in self._compiled)
+                or any(indicator in text_lower for indicator in self.table_indicators))
+
+    def features(self):
+        """Every (kind, value) rule input; each gets one cached hit column in the AbstractStore"""
+        features = []
+        for name in ("biomarkers", "inflammation_terms"):
+            features.extend(("term", term) for term in getattr(self, name))
+        features.extend(("pattern", pattern) for pattern in self.numerical_patterns)
+        features.extend(("term", term) for term in self.table_indicators)
+        return list(dict.fromkeys(features))
+
+
+def feature_key(kind, value):
+    return hashlib.sha1(f"{kind}\x00{value}".encode('utf-8')).hexdigest()[:16]
+
+
+# Vectorized scanning ----------------------------------------------------------------------
+
+def _row_bytes(directory, start, stop):
+    """UTF-8 text of rows `start`..`stop` and the offset of each row's NUL terminator in it"""
+    ends = np.memmap(os.path.join(directory, "text_end.bin"), dtype="<i8", mode='r')
+    first = int(ends[start - 1]) if start else 0
+    with open(os.path.join(directory, "text.bin"), 'rb') as f:
+        f.seek(first)
+        data = f.read(int(ends[stop - 1]) - first)
+    return data, np.asarray(ends[start:stop]) - first - 1
+
+
+def required_literals(pattern):
+    """
+    Substrings of which every match of `pattern` contains at least one, or None if unknown.
+
+    Rows containing none of them can't match, so the expression only runs on the rest.
+    """
+    try:
+        parsed = sre_parse.parse(pattern)
+    except Exception:
+        return None
+    if parsed.state.flags & re.IGNORECASE:
+        return None
+    return _best_literals(parsed)
+
+
+def _best_literals(items):
+    # The requirement whose shortest substring is longest filters best
+    return max(_literal_requirements(items), key=lambda option: min(map(len, option)), default=None)
+
+
+def _literal_requirements(items):
+    """Sets of substrings of which a match of the parsed sequence `items` contains one each"""
+    requirements = []
+    run = []
+    for op, av in list(items) + [(None, None)]:
+        if op is sre_constants.LITERAL:
+            run.append(chr(av))
+            continue
+        if run:
+            requirements.append({"".join(run)})
+            run = []
+        if op is sre_constants.SUBPATTERN and not (av[1] & re.IGNORECASE):
+            requirements.extend(_literal_requirements(av[-1]))
+        elif op is sre_constants.BRANCH:
+            options = [_best_literals(branch) for branch in av[1]]
+            if all(options):
+                requirements.append(set().union(*options))
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT) and av[0] >= 1:
+            requirements.extend(_literal_requirements(av[2]))
+    return requirements
+
+
+def rows_containing(data, ends, terms):
+    """Rows of `data` (NUL-terminated UTF-8, ending at `ends`) containing any of `terms`"""
+    hits = np.zeros(len(ends), dtype=bool)
+    end_list = ends.tolist()
+    rows = []
+    for term in terms:
+        if not term:
+            hits[:] = True
+            return hits
+        if "\x00" in term:
+            continue  # rows never contain NUL; in the blob it only matches across rows
+        # Search the whole shard, skipping to the next row after each hit; UTF-8 byte
+        # matches are exactly the text matches, so nothing is decoded
+        term = term.encode('utf-8')
+        position = data.find(term)
+        while position >= 0:
+            row = bisect.bisect_left(end_list, position)
+            rows.append(row)
+            position = data.find(term, end_list[row] + 1)
+    hits[rows] = True
+    return hits
+
+
+def scan_feature(data, ends, kind, value):
+    """Rows of `data` containing the term or matching the pattern"""
+    if kind == "term":
+        return rows_containing(data, ends, [value])
+    pattern = re.compile(value)
+    literals = required_literals(value)
+    candidates = np.flatnonzero(rows_containing(data, ends, literals)) if literals else range(len(ends))
+    starts = np.concatenate(([0], ends[:-1] + 1)).tolist()
+    end_list = ends.tolist()
+    hits = np.zeros(len(ends), dtype=bool)
+    for row in candidates:
+        # Matched on the row's own text, so anchors and lookarounds behave as on a single abstract
+        hits[row] = pattern.search(data[starts[row]:end_list[row]].decode('utf-8')) is not None
+    return hits
+
+
+def scan_rows(directory, start, stop, features):
+    """Hit columns for `features` over rows `start`..`stop` (runs in a worker process)"""
+    data, ends = _row_bytes(directory, start, stop)
+    return start, stop, [scan_feature(data, ends, kind, value) for kind, value in features]
+
+
+def decide(rules, columns):
+    """Vectorized decisions from hit columns: (status array, biomarker hit matrix, has-numeric array)"""
+    def any_of(kind, values):
+        arrays = [columns[feature_key(kind, value)] for value in values]
+        return np.logical_or.reduce(arrays) if arrays else None
+
+    rows = len(next(iter(columns.values()))) if columns else 0
+    biomarker_hits = (np.column_stack([columns[feature_key("term", term)] for term in rules.biomarkers])
+                      if rules.biomarkers else np.zeros((rows, 0), dtype=bool))
+    inflammation = any_of("term", rules.inflammation_terms)
+    relevant = biomarker_hits.any(axis=1)
+    if inflammation is not None:
+        relevant |= inflammation
+    numeric = np.zeros(rows, dtype=bool)
+    for part in (any_of("pattern", rules.numerical_patterns), any_of("term", rules.table_indicators)):
+        if part is not None:
+            numeric |= part
+    status = np.full(rows, ACCEPTED, dtype=np.uint8)
+    status[~numeric] = NO_NUMERIC_DATA
+    status[~relevant] = NOT_RELEVANT
+    return status, biomarker_hits, numeric
+
+
+class AbstractStore:
+    """
+    Every scored paper with its scoring text, decision and cached rule features.
+
+    Rows are appended by the scraper's persist stage and written on `flush()`; the records
+    directory is flushed first and `abstracts.json` last, so an interrupted flush is
+    rebuilt from the records on the next open.
+    """
+
+    def __init__(self, directory, rules=None):
+        os.makedirs(os.path.join(directory, "features"), exist_ok=True)
+        self.directory = directory
+        self._lock = threading.RLock()
+        self.meta_file = os.path.join(directory, "abstracts.json")
+        self.meta = self._load_meta()
+        self.record_writer = CorpusWriter(os.path.join(directory, "records"))
+        self._pending = []  # (paper_id, scoring text, status) not yet in the columns
+        self._rows = {paper_id.decode('ascii'): row for row, paper_id in enumerate(self.column("id"))}
+        if rules is not None:
+            self.track(rules)
+        if len(self.record_writer) > self.meta["rows"]:
+            self._recover()
+
+    def track(self, rules):
+        """
+        Compute the features of `rules` for rows as they are flushed.
+
+        Features new to a non-empty store are filled in by the next `update_features()`;
+        from then on every up-to-date feature column grows with the store.
+        """
+        with self._lock:
+            for kind, value in rules.features():
+                self.meta["features"].setdefault(feature_key(kind, value), {"kind": kind, "value": value, "rows": 0})
+
+    def _load_meta(self):
+        if os.path.exists(self.meta_file):
+            with open(self.meta_file, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get("version") == FORMAT_VERSION:
+                return meta
+            logger.warning("Abstract store format changed; columns will be rebuilt from the records")
+        return {"version": FORMAT_VERSION, "rows": 0, "text_bytes": 0, "features": {}, "rules_version": None}
+
+    def _save_meta(self):
+        tmp_file = f"{self.meta_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_file, self.meta_file)
+
+    def _path(self, name):
+        return os.path.join(self.directory, f"{name}.bin")
+
+    def _recover(self):
+        """Rebuild column rows for records written by a flush that didn't finish"""
+        committed = self.meta["rows"]
+        with CorpusReader(self.record_writer.directory) as reader:
+            for record in reader.iter_from(committed):
+                self._rows[record["id"]] = committed + len(self._pending)
+                self._pending.append((record["id"], scoring_text(record.get("full_text") or record.get("abstract")),
+                                      STATUSES.index(record.get("status", "accepted"))))
+        logger.info(f"Recovering {len(self._pending)} abstract store rows from the records")
+        self.flush()
+
+    def __len__(self):
+        return self.meta["rows"] + len(self._pending)
+
+    def __contains__(self, paper_id):
+        return paper_id in self._rows
+
+    def column(self, name, dtype=None):
+        """Memory-mapped column (`id`, `text_end` or `status`)"""
+        dtype = np.dtype(dtype or {"id": ID_DTYPE, "text_end": "<i8", "status": np.uint8}[name])
+        if not self.meta["rows"]:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(self._path(name), dtype=dtype, mode='r', shape=(self.meta["rows"],))
+
+    def add(self, paper_id, record, text, status):
+        """Store a scored paper (no-op if it is already stored); `status` is one of STATUSES"""
+        with self._lock:
+            if paper_id in self._rows:
+                return False
+            self.record_writer.append(paper_id, dict(record, status=status))
+            self._rows[paper_id] = len(self)
+            self._pending.append((paper_id, scoring_text(text), STATUSES.index(status)))
+            return True
+
+    def status(self, paper_id):
+        """Current decision for a stored paper, or None"""
+        with self._lock:
+            row = self._rows.get(paper_id)
+            if row is None:
+                return None
+            if row >= self.meta["rows"]:
+                return STATUSES[self._pending[row - self.meta["rows"]][2]]
+            return STATUSES[int(self.column("status")[row])]
+
+    def flush(self):
+        with self._lock:
+            self.record_writer.flush()
+            if not self._pending:
+                return
+            count = self.meta["rows"]
+            texts = [text.encode('utf-8') + b"\x00" for _, text, _ in self._pending]
+            ends = self.meta["text_bytes"] + np.cumsum([len(text) for text in texts], dtype=np.int64)
+            self._write("id", np.array([paper_id.encode('ascii') for paper_id, _, _ in self._pending], dtype=ID_DTYPE),
+                        count * ID_DTYPE.itemsize)
+            self._write("text_end", ends, count * 8)
+            self._write("status", np.array([status for _, _, status in self._pending], dtype=np.uint8), count)
+            data = b"".join(texts)
+            self._write("text", np.frombuffer(data, dtype=np.uint8), self.meta["text_bytes"])
+            # Precompute the up-to-date features for the new rows, so rescoring needn't scan them
+            local_ends = ends - self.meta["text_bytes"] - 1
+            for key, entry in self.meta["features"].items():
+                if entry["rows"] == count:
+                    hits = scan_feature(data, local_ends, entry["kind"], entry["value"])
+                    self._write(os.path.join("features", key), hits, count)
+                    entry["rows"] = count + len(self._pending)
+            self.meta["rows"] = count + len(self._pending)
+            self.meta["text_bytes"] = int(ends[-1])
+            self._pending = []
+            self._save_meta()
+
+    def _write(self, name, array, committed_bytes):
+        with open(self._path(name), 'ab') as f:
+            f.truncate(committed_bytes)  # drop the tail of an interrupted flush
+            f.seek(committed_bytes)
+            f.write(array.tobytes())
+
+    def _replace(self, name, array):
+        tmp_file = f"{self._path(name)}.tmp"
+        array.tofile(tmp_file)
+        os.replace(tmp_file, self._path(name))
+
+    def feature(self, kind, value):
+        """Cached hit column for a rule and the number of rows it covers"""
+        entry = self.meta["features"].get(feature_key(kind, value))
+        if not entry or not entry["rows"]:
+            return np.zeros(0, dtype=bool), 0
+        column = np.fromfile(os.path.join(self.directory, "features", f"{feature_key(kind, value)}.bin"), dtype=bool)
+        return column[:entry["rows"]], entry["rows"]
+
+    def update_features(self, rules, max_workers=None, shard_bytes=4 * 1024 * 1024, min_parallel=200000):
+        """
+        Bring the hit column of every rule up to date and return them keyed by `feature_key`.
+
+        Only rules without a column, and rows added since a column was computed, are scanned.
+        Shards of about `shard_bytes` of text go to worker processes once at least
+        `min_parallel` row-rule pairs need scanning; fewer don't repay starting the workers.
+        """
+        self.flush()
+        rows = self.meta["rows"]
+        columns = {}
+        todo = {}  # feature -> first row to scan
+        for kind, value in rules.features():
+            column, covered = self.feature(kind, value)
+            full = np.zeros(rows, dtype=bool)
+            full[:covered] = column
+            columns[(kind, value)] = full
+            if covered < rows:
+                todo[(kind, value)] = covered
+        scanned = {"features": len(todo), "rows": 0}
+        if todo:
+            first = min(todo.values())
+            ends = self.column("text_end")
+            shards = []
+            start = first
+            while start < rows:
+                base = int(ends[start - 1]) if start else 0
+                stop = max(start + 1, int(np.searchsorted(ends, base + shard_bytes, side='right')))
+                stop = min(stop, rows)
+                shards.append((start, stop, [feature for feature, covered in todo.items() if covered < stop]))
+                start = stop
+            scanned["rows"] = rows - first
+            workers = max_workers or os.cpu_count() or 1
+            if workers == 1 or len(shards) == 1 or sum(stop - max(start, todo[feature]) for start, stop, features in shards
+                                                       for feature in features) < min_parallel:
+                results = [scan_rows(self.directory, start, stop, features) for start, stop, features in shards]
+            else:
+                # Spawned workers: rescoring may be started from a process that runs pipeline threads
+                context = multiprocessing.get_context("spawn")
+                with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as pool:
+                    results = list(pool.map(scan_rows, [self.directory] * len(shards), *zip(*shards)))
+            for (start, stop, features), (_, _, hits) in zip(shards, results):
+                for feature, column in zip(features, hits):
+                    columns[feature][start:stop] = column
+            for kind, value in todo:
+                key = feature_key(kind, value)
+                self._replace(os.path.join("features", key), columns[(kind, value)])
+                self.meta["features"][key] = {"kind": kind, "value": value, "rows": rows}
+            self._save_meta()
+        return {feature_key(kind, value): column for (kind, value), column in columns.items()}, scanned
+
+    def rescore(self, rules, max_workers=None, min_parallel=200000):
+        """
+        Decide every stored paper under `rules` without applying anything.
+
+        Returns the new status array, the rows whose decision changed (with the biomarkers
+        found and numeric flag of each) and scan statistics; pass it to `commit()` once the
+        changes have been applied.
+        """
+        columns, scanned = self.update_features(rules, max_workers=max_workers, min_parallel=min_parallel)
+        status, biomarker_hits, numeric = decide(rules, columns)
+        previous = np.array(self.column("status"))
+        changed = np.flatnonzero(status != previous)
+        ids = self.column("id")
+        changes = [{
+            "row": int(row),
+            "id": ids[row].decode('ascii'),
+            "previous": STATUSES[previous[row]],
+            "status": STATUSES[status[row]],
+            "biomarkers": [term for term, hit in zip(rules.biomarkers, biomarker_hits[row]) if hit],
+            "has_numerical": bool(numeric[row]),
+        } for row in changed]
+        counts = {name: int(np.count_nonzero(status == code)) for code, name in enumerate(STATUSES)}
+        return {"rules_version": rules.version, "rows": len(status), "scanned": scanned, "counts": counts,
+                "changes": changes, "status": status}
+
+    def records(self, rows):
+        """The stored records of `rows`, in order"""
+        self.record_writer.flush()
+        with CorpusReader(self.record_writer.directory) as reader:
+            for row in rows:
+                yield reader.page(row, 1)[0]
+
+    def commit(self, result):
+        """Persist the decisions of a `rescore()` result"""
+        with self._lock:
+            self.flush()
+            status = np.array(self.column("status"))
+            status[:len(result["status"])] = result["status"]
+            self._replace("status", status)
+            self.meta["rules_version"] = result["rules_version"]
+            self._save_meta()
+
+    def close(self):
+        self.flush()
+        self.record_writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect relevance rules and the stored abstracts")
+    commands = parser.add_subparsers(dest="command", required=True)
+    rules_parser = commands.add_parser("rules", help="Print the effective rules as JSON (a starting point for relevance_rules.json)")
+    rules_parser.add_argument("--rules", help="Rules file to merge over the defaults")
+    stats_parser = commands.add_parser("stats", help="Print row counts per decision and cached features")
+    stats_parser.add_argument("directory", help="Abstract store directory (e.g. biomarker_research/abstracts)")
+    args = parser.parse_args()
+
+    if args.command == "rules":
+        print(json.dumps(RelevanceRules.load(args.rules).to_dict(), indent=2, ensure_ascii=False))
+        return
+    store = AbstractStore(args.directory)
+    status = store.column("status")
+    print(json.dumps({
+        "rows": len(store),
+        "rules_version": store.meta["rules_version"],
+        "statuses": {name: int(np.count_nonzero(status == code)) for code, name in enumerate(STATUSES)},
+        "cached_features": len(store.meta["features"]),
+        "text_bytes": store.meta["text_bytes"],
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+"""
+Read-only HTTP service over the scraper's output directory (localhost only).
+
+ResearchStore keeps the paper registry, the corpus summaries and the consolidated text in
+memory. A background thread polls for changes: the registry and consolidated file by mtime
+and size, the corpus by the record count in `corpus.json` (the corpus is append-only, so
+only new records are read). Each reload builds a new immutable snapshot and swaps it in,
+so requests never wait on file I/O. Responses are serialized once per snapshot and query,
+kept in an LRU cache with their ETag, and answered with 304 when the client already has
+them.
+
+Endpoints:
+    GET /papers?offset=&limit=&source=&biomarker=&q=&query=&since=&until=&sort=date|title
+    GET /papers/<paper_id>     registry entry plus the corpus record (with abstract)
+    GET /registry              paper_registry.json as stored
+    GET /consolidated          consolidated_papers.txt
+    GET /health                snapshot versions and counts
+
+Usage (from backend/):
+    python research_service.py biomarker_research --port 8790
+"""
+import os
+import json
+import hashlib
+import logging
+import argparse
+import threading
+from collections import OrderedDict
+from urllib.parse import urlparse, parse_qs, unquote
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from corpus_store import CorpusReader
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8790
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+# Query parameters that affect a response; others (e.g. userId from the Node proxy) don't split the cache
+QUERY_PARAMS = ("offset", "limit", "source", "biomarker", "q", "query", "since", "until", "sort")
+
+
+def _signature(path):
+    """(mtime_ns, size) of a file, or None if it doesn't exist"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _biomarker_list(value):
+    if isinstance(value, list):
+        return value
+    if not value or value == "None detected":
+        return []
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+class Snapshot:
+    """Immutable view of the output directory at one point in time"""
+
+    def __init__(self, registry, registry_bytes, summaries, consolidated, versions):
+        self.registry = registry
+        self.registry_bytes = registry_bytes
+        self.consolidated = consolidated
+        self.versions = versions
+        self.version = hashlib.sha1(json.dumps(versions, sort_keys=True).encode()).hexdigest()[:16]
+
+        # Newest first; papers retrieved on the same day keep registry order
+        papers = []
+        for paper_id, entry in registry.items():
+            paper = {"id": paper_id, **entry}
+            summary = summaries.get(paper_id)
+            if summary:
+                paper.update(summary)
+            paper.setdefault("biomarkers", [])
+            papers.append(paper)
+        papers.reverse()
+        papers.sort(key=lambda paper: paper.get("date_retrieved") or "", reverse=True)
+        self.papers = papers
+        self.by_id = {paper["id"]: paper for paper in papers}
+        # Prefilters so the common single-filter listings scan only matching papers
+        self.by_source = {}
+        self.by_biomarker = {}
+        for paper in papers:
+            self.by_source.setdefault(paper.get("source"), []).append(paper)
+            for biomarker in paper["biomarkers"]:
+                self.by_biomarker.setdefault(biomarker.lower(), []).append(paper)
+
+    def select(self, params):
+        """Papers matching the filters in `params`, in the requested order"""
+        if params.get("biomarker"):
+            candidates = self.by_biomarker.get(params["biomarker"].lower(), [])
+        elif params.get("source"):
+            candidates = self.by_source.get(params["source"], [])
+        else:
+            candidates = self.papers
+        source = params.get("source")
+        text = (params.get("q") or "").lower()
+        query = params.get("query")
+        since, until = params.get("since"), params.get("until")
+        if source or text or query or since or until:
+            candidates = [
+                paper for paper in candidates
+                if (not source or paper.get("source") == source)
+                and (not text or text in paper.get("title", "").lower())
+                and (not query or query in paper.get("queries", ()))
+                and (not since or (paper.get("date_retrieved") or "") >= since)
+                and (not until or (paper.get("date_retrieved") or "") <= until)
+            ]
+        if params.get("sort") == "title":
+            candidates = sorted(candidates, key=lambda paper: paper.get("title", "").lower())
+        return candidates
+
+
+class ResearchStore:
+    """
+    In-memory, change-detecting view of a BiomarkerScraper output directory.
+
+    `poll()` reloads whatever changed and is called every `poll_interval` seconds by
+    `start()`; `respond(path, params)` returns a cached (status, content type, ETag, body).
+    """
+
+    def __init__(self, output_dir, poll_interval=1.0, cache_size=256):
+        self.output_dir = output_dir
+        self.registry_file = os.path.join(output_dir, "paper_registry.json")
+        self.consolidated_file = os.path.join(output_dir, "consolidated_papers.txt")
+        self.corpus_dir = os.path.join(output_dir, "corpus")
+        self.poll_interval = poll_interval
+        self.cache_size = cache_size
+        self.reloads = 0
+
+        self._registry = ({}, b"{}")
+        self._registry_signature = None
+        self._consolidated = None
+        self._consolidated_signature = None
+        self._corpus = None  # CorpusReader, opened once the corpus exists
+        self._corpus_count = 0
+        self._summaries = {}  # paper ID -> corpus fields used for filtering
+        self._missing = set()  # registry IDs not (yet) found in the corpus
+
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()  # guards the response cache
+        self._corpus_lock = threading.Lock()  # refresh() remaps the files under concurrent get()s
+        self._stop = threading.Event()
+        self._thread = None
+        self.snapshot = None
+        self.poll()
+
+    # Reloading ---------------------------------------------------------------------------
+
+    def _load_registry(self):
+        signature = _signature(self.registry_file)
+        if signature == self._registry_signature:
+            return False
+        if signature is None:
+            self._registry = ({}, b"{}")
+        else:
+            with open(self.registry_file, 'rb') as f:
+                data = f.read()
+            try:
+                registry = json.loads(data)
+            except ValueError:
+                # Caught mid-write; keep the previous registry and retry on the next poll
+                logger.debug("Registry is being written, keeping the previous version")
+                return False
+            self._registry = (registry, data)
+            self._missing.update(paper_id for paper_id in registry if paper_id not in self._summaries)
+        self._registry_signature = signature
+        return True
+
+    def _load_corpus(self):
+        if self._corpus is None:
+            if not os.path.exists(os.path.join(self.corpus_dir, "corpus.json")):
+                return False
+            self._corpus = CorpusReader(self.corpus_dir)
+        else:
+            with open(os.path.join(self.corpus_dir, "corpus.json"), 'r', encoding='utf-8') as f:
+                if json.load(f)["count"] == self._corpus_count:
+                    return False
+            self._corpus.refresh()
+        changed = len(self._corpus) != self._corpus_count
+        self._corpus_count = len(self._corpus)
+        if changed:
+            # Records are never rewritten, so only registry IDs without a summary need a lookup
+            self._missing.update(paper_id for paper_id in self._registry[0] if paper_id not in self._summaries)
+        return changed
+
+    def _resolve_missing(self):
+        if self._corpus is None or not self._missing:
+            return
+        for paper_id in list(self._missing):
+            record = self._corpus.get(paper_id)
+            if record is not None:
+                self._summaries[paper_id] = {
+                    "biomarkers": _biomarker_list(record.get("biomarkers")),
+                    "has_numerical": record.get("has_numerical"),
+                }
+                self._missing.discard(paper_id)
+
+    def _load_consolidated(self):
+        signature = _signature(self.consolidated_file)
+        if signature == self._consolidated_signature:
+            return False
+        if signature is None:
+            self._consolidated = None
+        else:
+            with open(self.consolidated_file, 'rb') as f:
+                self._consolidated = f.read()
+        self._consolidated_signature = signature
+        return True
+
+    def poll(self):
+        """Reload whatever changed on disk; returns True if a new snapshot was published"""
+        changed = False
+        with self._corpus_lock:
+            for name, load in (("registry", self._load_registry), ("corpus", self._load_corpus),
+                               ("consolidated", self._load_consolidated)):
+                try:
+                    changed = load() or changed
+                except Exception as e:
+                    logger.error(f"Error reloading {name}: {e}")
+            if not changed and self.snapshot is not None:
+                return False
+            self._resolve_missing()
+        registry, registry_bytes = self._registry
+        versions = {"registry": self._registry_signature, "corpus": self._corpus_count,
+                    "consolidated": self._consolidated_signature}
+        self.snapshot = Snapshot(registry, registry_bytes, self._summaries, self._consolidated, versions)
+        with self._lock:
+            self._cache.clear()
+        self.reloads += 1
+        logger.info(f"Loaded snapshot {self.snapshot.version}: {len(registry)} papers, "
+                    f"{self._corpus_count} corpus records")
+        return True
+
+    def _poll_loop(self):
+        while not self._stop.wait(self.poll_interval):
+            self.poll()
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._poll_loop, name="research-store-poll", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._corpus_lock:
+            if self._corpus is not None:
+                self._corpus.close()
+                self._corpus = None
+
+    # Responses ---------------------------------------------------------------------------
+
+    def respond(self, path, params):
+        """Return (status, content type, ETag, body bytes) for a GET, from the cache when possible"""
+        snapshot = self.snapshot
+        params = {name: value for name, value in params.items() if name in QUERY_PARAMS}
+        key = (snapshot.version, path, tuple(sorted(params.items())))
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+        status, content_type, body = self._render(snapshot, path, params)
+        etag = f'"{hashlib.sha1(body).hexdigest()[:20]}"' if status == 200 else None
+        response = (status, content_type, etag, body)
+        # A paper ID can be anything, so only cache those that exist
+        if status == 200:
+            with self._lock:
+                self._cache[key] = response
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return response
+
+    def _render(self, snapshot, path, params):
+        if path == "/papers":
+            try:
+                offset = max(0, int(params.get("offset", 0)))
+                limit = min(MAX_LIMIT, max(0, int(params.get("limit", DEFAULT_LIMIT))))
+            except ValueError:
+                return _json(400, {"error": "offset and limit must be integers"})
+            papers = snapshot.select(params)
+            return _json(200, {
+                "total": len(papers),
+                "offset": offset,
+                "limit": limit,
+                "version": snapshot.version,
+                "papers": papers[offset:offset + limit],
+            })
+        if path.startswith("/papers/"):
+            # IDs may contain reserved characters (e.g. "arxiv:2401.01234" or a PDF path), sent percent-encoded
+            paper_id = unquote(path[len("/papers/"):])
+            paper = snapshot.by_id.get(paper_id)
+            if paper is None:
+                return _json(404, {"error": f"No paper with ID {paper_id}"})
+            with self._corpus_lock:
+                record = self._corpus.get(paper_id) if self._corpus is not None else None
+            return _json(200, dict(paper, abstract=record.get("abstract") if record else None))
+        if path == "/registry":
+            if snapshot.versions["registry"] is None:
+                return _json(404, {"error": "Paper registry not found"})
+            return 200, "application/json", snapshot.registry_bytes
+        if path == "/consolidated":
+            if snapshot.consolidated is None:
+                return _json(404, {"error": "Consolidated papers text not found"})
+            return 200, "text/plain; charset=utf-8", snapshot.consolidated
+        if path == "/health":
+            return _json(200, {"version": snapshot.version, "papers": len(snapshot.papers),
+                               "corpus_records": snapshot.versions["corpus"], "reloads": self.reloads})
+        return _json(404, {"error": f"Unknown endpoint {path}"})
+
+
+def _json(status, payload):
+    return status, "application/json", json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+
+def make_handler(store):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body go out in separate writes; without TCP_NODELAY small keep-alive
+        # responses wait ~40 ms for the client's delayed ACK
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            params = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+            status, content_type, etag, body = store.respond(parsed.path.rstrip("/") or "/", params)
+            if etag and etag in self.headers.get("If-None-Match", ""):
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            if etag:
+                self.send_header("ETag", etag)
+                self.send_header("Cache-Control", "no-cache")  # revalidate, then reuse on 304
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+def serve(output_dir, host="127.0.0.1", port=DEFAULT_PORT, poll_interval=1.0):
+    store = ResearchStore(output_dir, poll_interval=poll_interval).start()
+    server = ThreadingHTTPServer((host, port), make_handler(store))
+    logger.info(f"Serving {output_dir} on http://{host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        store.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the scraper's outputs as cached JSON on localhost")
+    parser.add_argument("output_dir", nargs="?", default="biomarker_research", help="Scraper output directory")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind (default: localhost only)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds between change checks")
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"])
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    serve(args.output_dir, args.host, args.port, args.poll_interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+# Rejection reasons recorded by the scraper, listed so reports always show every reason
+REJECTION_REASONS = ("already_processed", "duplicate", "no_abstract", "not_relevant", "no_numeric_data")
+QUANTILE_LABELS = {"p50": "0.5", "p90": "0.9", "p99": "0.99", "max": "1"}
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list (None when empty)"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def _round(value, digits=6):
+    return round(value, digits) if value is not None else None
+
+
+class ScraperMetrics:
+    """
+    Thread-safe counters and timers for one scraper run.
+
+    Collects per-source HTTP request counts, latencies, bytes and errors, cache hits,
+    rejection reasons and wall/CPU time per stage, and writes them as a JSON run report
+    or a Prometheus text-format file.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = datetime.now()
+        self._started = time.perf_counter()
+        self.requests = {}      # source -> {"count", "errors", "bytes", "latencies"}
+        self.status_codes = {}  # source -> {status: count}
+        self.cache_hits = {}
+        self.rejections = {reason: 0 for reason in REJECTION_REASONS}
+        self.stages = {}        # stage -> {"calls", "wall_seconds", "cpu_seconds"}
+        self.counters = {}
+
+    def record_request(self, source, latency, nbytes=0, status=None, error=False):
+        with self._lock:
+            entry = self.requests.setdefault(source, {"count": 0, "errors": 0, "bytes": 0, "latencies": []})
+            entry["count"] += 1
+            entry["bytes"] += nbytes
+            entry["latencies"].append(latency)
+            if error:
+                entry["errors"] += 1
+            if status is not None:
+                codes = self.status_codes.setdefault(source, {})
+                codes[status] = codes.get(status, 0) + 1
+
+    def record_bytes(self, source, nbytes):
+        """Add body bytes read after the request was recorded (streamed responses)"""
+        with self._lock:
+            entry = self.requests.setdefault(source, {"count": 0, "errors": 0, "bytes": 0, "latencies": []})
+            entry["bytes"] += nbytes
+
+    def record_cache_hit(self, kind, count=1):
+        with self._lock:
+            self.cache_hits[kind] = self.cache_hits.get(kind, 0) + count
+
+    def record_rejection(self, reason):
+        with self._lock:
+            self.rejections[reason] = self.rejections.get(reason, 0) + 1
+
+    def increment(self, name, count=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + count
+
+    def record_stage(self, stage, wall_seconds, cpu_seconds=0.0, calls=1):
+        with self._lock:
+            entry = self.stages.setdefault(stage, {"calls": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0})
+            entry["calls"] += calls
+            entry["wall_seconds"] += wall_seconds
+            entry["cpu_seconds"] += cpu_seconds
+
+    @contextmanager
+    def stage_timer(self, stage):
+        """Time a block as one call of `stage` (CPU time is the calling thread's)"""
+        wall = time.perf_counter()
+        cpu = time.thread_time()
+        try:
+            yield
+        finally:
+            self.record_stage(stage, time.perf_counter() - wall, time.thread_time() - cpu)
+
+    def report(self, extra=None):
+        """Build the machine-readable run report"""
+        with self._lock:
+            sources = {}
+            for source, entry in self.requests.items():
+                latencies = sorted(entry["latencies"])
+                sources[source] = {
+                    "requests": entry["count"],
+                    "errors": entry["errors"],
+                    "bytes": entry["bytes"],
+                    "status_codes": {str(k): v for k, v in self.status_codes.get(source, {}).items()},
+                    "latency_seconds": {
+                        "p50": _round(percentile(latencies, 0.50)),
+                        "p90": _round(percentile(latencies, 0.90)),
+                        "p99": _round(percentile(latencies, 0.99)),
+                        "max": _round(latencies[-1] if latencies else None),
+                        "mean": _round(sum(latencies) / len(latencies) if latencies else None),
+                    },
+                }
+            report = {
+                "started_at": self.started_at.isoformat(timespec='seconds'),
+                "duration_seconds": round(time.perf_counter() - self._started, 3),
+                "sources": sources,
+                "cache_hits": dict(self.cache_hits),
+                "rejections": dict(self.rejections),
+                "stages": {name: {k: round(v, 6) if isinstance(v, float) else v for k, v in entry.items()}
+                           for name, entry in self.stages.items()},
+                "counters": dict(self.counters),
+            }
+        if extra:
+            report.update(extra)
+        return report
+
+    def write_json(self, path, extra=None):
+        report = self.report(extra)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        return report
+
+    def write_prometheus(self, path, prefix="biomarker_scraper"):
+        """Write the counters in Prometheus text exposition format (e.g. for node_exporter's textfile collector)"""
+        report = self.report()
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for labels, value in samples:
+                if value is None:
+                    continue
+                label_text = ",".join(f'{k}="{v}"' for k, v in labels.items())
+                lines.append(f"{prefix}_{name}{{{label_text}}} {value}" if label_text else f"{prefix}_{name} {value}")
+
+        sources = report["sources"]
+        metric("requests_total", "counter", "HTTP requests per source",
+               [({"source": s}, e["requests"]) for s, e in sources.items()])
+        metric("request_errors_total", "counter", "Failed HTTP requests per source",
+               [({"source": s}, e["errors"]) for s, e in sources.items()])
+        metric("response_bytes_total", "counter", "Response bytes received per source",
+               [({"source": s}, e["bytes"]) for s, e in sources.items()])
+        metric("request_latency_seconds", "gauge", "Request latency percentiles per source",
+               [({"source": s, "quantile": quantile}, e["latency_seconds"][key])
+                for s, e in sources.items() for key, quantile in QUANTILE_LABELS.items()])
+        metric("cache_hits_total", "counter", "Work avoided through cached or prefetched data",
+               [({"kind": k}, v) for k, v in report["cache_hits"].items()])
+        metric("rejections_total", "counter", "Papers rejected per reason",
+               [({"reason": r}, v) for r, v in report["rejections"].items()])
+        metric("stage_seconds_total", "counter", "Wall time spent per stage",
+               [({"stage": s}, e["wall_seconds"]) for s, e in report["stages"].items()])
+        metric("stage_cpu_seconds_total", "counter", "CPU time spent per stage",
+               [({"stage": s}, e["cpu_seconds"]) for s, e in report["stages"].items()])
+        metric("run_duration_seconds", "gauge", "Duration of the run", [({}, report["duration_seconds"])])
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_file = f"{path}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_file, path)
@@ -0,0 +1,211 @@
+import queue
+import threading
+import time
+
+# Marks the end of a stage's input; one is sent per downstream worker
+_DONE = object()
+
+
+class Stage:
+    """
+    One step of a StagedPipeline.
+
+    `func` receives an item and returns the item to pass downstream, or None to drop it.
+    Each stage has its own bounded input queue and worker threads, so a slow stage
+    applies back-pressure to the ones before it instead of letting work pile up in memory.
+    """
+
+    def __init__(self, name, func, workers=1, queue_size=32):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self._lock = threading.Lock()
+        self._remaining = self.workers
+
+    def _record(self, elapsed, result, failed=False, cpu=0.0):
+        with self._lock:
+            self.processed += 1
+            self.busy_seconds += elapsed
+            self.cpu_seconds += cpu
+            if failed:
+                self.errors += 1
+            elif result is None:
+                self.dropped += 1
+
+    def _worker_finished(self):
+        """Return True for the last worker of this stage to exit"""
+        with self._lock:
+            self._remaining -= 1
+            return self._remaining == 0
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "queue_depth": self.queue.qsize(),
+            "queue_size": self.queue.maxsize,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "cpu_seconds": round(self.cpu_seconds, 3),
+        }
+
+
+class StagedPipeline:
+    """
+    Producer threads feeding a chain of Stages connected by bounded queues.
+
+    Producers are iterables (typically search generators), each drained by its own
+    thread into the first stage. Items flow through the stages in order; whatever the
+    last stage returns is discarded. `run()` blocks until every producer is exhausted
+    and every queued item has passed through all stages.
+
+    `timing_hook(stage_name, wall_seconds, cpu_seconds)`, if given, is called for every
+    item a stage handles; time producers spend yielding items is reported as "search".
+    `error_hook(stage_name, item)`, if given, is called for every item a stage fails on.
+    """
+
+    def __init__(self, producers, stages, log=print, monitor_interval=None, timing_hook=None, error_hook=None):
+        if not stages:
+            raise ValueError("A pipeline needs at least one stage")
+        self.producers = list(producers)
+        self.stages = list(stages)
+        self.log = log
+        self.monitor_interval = monitor_interval
+        self.timing_hook = timing_hook
+        self.error_hook = error_hook
+        self.produced = 0
+        self.producer_errors = 0
+        self._produced_lock = threading.Lock()
+        self._producers_remaining = len(self.producers)
+        self._finished = threading.Event()
+
+    def queue_depths(self):
+        """Current number of items waiting in front of each stage"""
+        return {stage.name: stage.queue.qsize() for stage in self.stages}
+
+    def stats(self):
+        return {
+            "produced": self.produced,
+            "producer_errors": self.producer_errors,
+            "stages": {stage.name: stage.stats() for stage in self.stages},
+        }
+
+    def _close(self, index):
+        """Tell every worker of stage `index` that no more input is coming"""
+        if index >= len(self.stages):
+            return
+        stage = self.stages[index]
+        for _ in range(stage.workers):
+            stage.queue.put(_DONE)
+
+    def _produce(self, producer):
+        first = self.stages[0].queue
+        try:
+            iterator = iter(producer)
+            while True:
+                started, cpu = time.perf_counter(), time.thread_time()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                if self.timing_hook:
+                    self.timing_hook("search", time.perf_counter() - started, time.thread_time() - cpu)
+                first.put(item)
+                with self._produced_lock:
+                    self.produced += 1
+        except Exception as e:
+            self.log(f"Producer failed: {e}")
+            with self._produced_lock:
+                self.producer_errors += 1
+        finally:
+            with self._produced_lock:
+                self._producers_remaining -= 1
+                last = self._producers_remaining == 0
+            if last:
+                self._close(0)
+
+    def _work(self, index):
+        stage = self.stages[index]
+        downstream = self.stages[index + 1].queue if index + 1 < len(self.stages) else None
+        while True:
+            item = stage.queue.get()
+            if item is _DONE:
+                break
+            started, cpu = time.perf_counter(), time.thread_time()
+            failed = False
+            try:
+                result = stage.func(item)
+            except Exception as e:
+                result, failed = None, True
+                self.log(f"Error in {stage.name} stage: {e}")
+            elapsed, cpu = time.perf_counter() - started, time.thread_time() - cpu
+            stage._record(elapsed, result, failed=failed, cpu=cpu)
+            if self.timing_hook:
+                self.timing_hook(stage.name, elapsed, cpu)
+            if failed:
+                if self.error_hook:
+                    try:
+                        self.error_hook(stage.name, item)
+                    except Exception as e:
+                        self.log(f"Error hook failed for {stage.name} stage: {e}")
+                continue
+            if result is not None and downstream is not None:
+                downstream.put(result)
+        if stage._worker_finished():
+            self._close(index + 1)
+
+    def _monitor(self):
+        while not self._finished.wait(self.monitor_interval):
+            depths = ", ".join(f"{name}={depth}" for name, depth in self.queue_depths().items())
+            self.log(f"Queue depths: {depths}")
+
+    def run(self):
+        """Run the pipeline to completion and return per-stage statistics"""
+        threads = []
+        for index, stage in enumerate(self.stages):
+            for n in range(stage.workers):
+                threads.append(threading.Thread(
+                    target=self._work, args=(index,), name=f"{stage.name}-{n}", daemon=True
+                ))
+        for n, producer in enumerate(self.producers):
+            threads.append(threading.Thread(
+                target=self._produce, args=(producer,), name=f"producer-{n}", daemon=True
+            ))
+        if not self.producers:
+            self._close(0)
+
+        for thread in threads:
+            thread.start()
+        if self.monitor_interval:
+            threading.Thread(target=self._monitor, name="pipeline-monitor", daemon=True).start()
+
+        for thread in threads:
+            thread.join()
+        self._finished.set()
+        return self.stats()
+
+
+class RateLimiter:
+    """Spaces out calls shared across threads so they start at least `min_interval` seconds apart"""
+
+    def __init__(self, min_interval):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self):
+        """Block until the caller may issue its request"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.min_interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
@@ -0,0 +1,485 @@
+import os
+import re
+import sys
+import json
+import math
+import mmap
+import time
+import struct
+import shutil
+import logging
+import argparse
+import threading
+
+import numpy as np
+
+from relevance import DEFAULT_RULES, RelevanceRules
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+# Indexed fields and their BM25F weights; `biomarkers` holds the biomarkers the scraper detected
+FIELDS = ("title", "abstract", "body", "biomarkers")
+FIELD_WEIGHTS = {"title": 2.0, "abstract": 1.0, "body": 0.3, "biomarkers": 3.0}
+BIOMARKER_BOOST = 1.5
+# Words of multi-word biomarker names ("uric acid", "c-reactive protein") too common to boost
+GENERIC_BIOMARKER_WORDS = frozenset(
+    "acid acids protein proteins factor factors receptor receptors hormone hormones enzyme kinase "
+    "level levels concentration serum plasma blood salivary urinary total free alpha beta gamma".split()
+)
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-'][a-z0-9]+)*")
+ALIASES = {"interleukin-6": "il-6", "il6": "il-6", "c-reactive": "crp", "urate": "uric"}
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were which with "
+    "we our these those been than not but into also between during after before".split()
+)
+
+# <segment>.lex: header (term count) + sorted fixed-width entries + term string blob
+LEX_HEADER = struct.Struct("<I")
+LEX_ENTRY = struct.Struct("<IIQII")  # term offset, term length, postings offset, postings length, df
+# <segment>.docs: paper ID and per-field token counts for each local document
+DOC_DTYPE = np.dtype([("id", "S32"), ("lengths", "<u4", (len(FIELDS),))])
+
+
+def tokenize(text):
+    """Lowercased word tokens without stopwords; hyphenated names like IL-6 stay one token"""
+    tokens = []
+    for token in TOKEN_PATTERN.findall((text or "").lower()):
+        token = ALIASES.get(token, token)
+        if token not in STOPWORDS and len(token) > 1:
+            tokens.append(token)
+    return tokens
+
+
+def biomarker_terms(biomarkers):
+    """
+    Query tokens boosted as biomarkers, normalized like the biomarkers field.
+
+    A one-word name is boosted as is; a longer name only by its distinctive words, so
+    "uric acid" boosts "uric" but not every "fatty acid" or "amino acid" paper.
+    """
+    terms = set()
+    for name in biomarkers:
+        tokens = tokenize(name)
+        terms.update(tokens if len(tokens) == 1 else (token for token in tokens if token not in GENERIC_BIOMARKER_WORDS))
+    return frozenset(terms)
+
+
+def encode_varints(values):
+    """Encode non-negative integers as LEB128 varints (vectorized)"""
+    values = np.asarray(values, dtype=np.uint64)
+    if values.size == 0:
+        return b""
+    sizes = np.ones(values.size, dtype=np.int64)
+    for shift in (7, 14, 21, 28, 35):
+        sizes += values >= (1 << shift)
+    ends = np.cumsum(sizes)
+    starts = ends - sizes
+    out = np.zeros(int(ends[-1]), dtype=np.uint8)
+    for k in range(int(sizes.max())):
+        mask = sizes > k
+        byte = (values[mask] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        more = (sizes[mask] > k + 1).astype(np.uint64) << np.uint64(7)
+        out[starts[mask] + k] = (byte | more).astype(np.uint8)
+    return out.tobytes()
+
+
+def decode_varints(data):
+    """Decode a buffer of LEB128 varints into an int64 array (vectorized)"""
+    raw = np.frombuffer(data, dtype=np.uint8)
+    terminal = raw < 0x80
+    if terminal.all():
+        return raw.astype(np.int64)  # every value fits in one byte (typical for term frequencies)
+    ends = np.flatnonzero(terminal)
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+    sizes = ends - starts + 1
+    values = (raw[starts] & 0x7F).astype(np.int64)
+    multi = np.flatnonzero(sizes > 1)
+    for k in range(1, int(sizes.max())):
+        multi = multi[sizes[multi] > k]
+        values[multi] |= (raw[starts[multi] + k].astype(np.int64) & 0x7F) << (7 * k)
+    return values
+
+
+class Segment:
+    """An immutable, memory-mapped slice of the index: sorted lexicon, postings and document table"""
+
+    def __init__(self, directory, name):
+        self.name = name
+        base = os.path.join(directory, name)
+        self._files = []
+        self.lex = self._map(f"{base}.lex")
+        self.postings = self._map(f"{base}.post")
+        self.docs = np.frombuffer(self._map(f"{base}.docs"), dtype=DOC_DTYPE)
+        self.term_count = LEX_HEADER.unpack_from(self.lex, 0)[0]
+        self._blob_start = LEX_HEADER.size + self.term_count * LEX_ENTRY.size
+        self._norms = (None, None)
+
+    def _map(self, path):
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b""
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._files.append(mapped)
+        return mapped
+
+    def close(self):
+        self.docs = None
+        for mapped in self._files:
+            try:
+                mapped.close()
+            except BufferError:
+                pass  # numpy views may still reference the map; it closes when they are collected
+        self._files = []
+
+    def _entry(self, i):
+        return LEX_ENTRY.unpack_from(self.lex, LEX_HEADER.size + i * LEX_ENTRY.size)
+
+    def _term(self, entry):
+        start = self._blob_start + entry[0]
+        return self.lex[start:start + entry[1]]
+
+    def lookup(self, term):
+        """Binary search the lexicon; returns (postings offset, length, df) or None"""
+        key = term.encode('utf-8')
+        lo, hi = 0, self.term_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            entry = self._entry(mid)
+            found = self._term(entry)
+            if found < key:
+                lo = mid + 1
+            elif found > key:
+                hi = mid
+            else:
+                return entry[2], entry[3], entry[4]
+        return None
+
+    def postings_for(self, term):
+        """Return (local doc numbers, tf matrix [df x fields]) for a term, or None"""
+        found = self.lookup(term)
+        if found is None:
+            return None
+        offset, length, df = found
+        values = decode_varints(self.postings[offset:offset + length])
+        columns = values.reshape(1 + len(FIELDS), df)
+        return np.cumsum(columns[0]), columns[1:].T
+
+    def length_norms(self, avg_lengths, b):
+        """BM25 length normalization per document and field, cached for the current averages"""
+        key = (tuple(avg_lengths), b)
+        if self._norms[0] != key:
+            self._norms = (key, 1 - b + b * self.docs["lengths"] / avg_lengths)
+        return self._norms[1]
+
+    def terms(self):
+        for i in range(self.term_count):
+            entry = self._entry(i)
+            yield self._term(entry).decode('utf-8'), entry[2], entry[3], entry[4]
+
+
+def write_segment(directory, name, doc_ids, doc_lengths, postings):
+    """
+    Write one segment.
+
+    `postings` maps term -> list of (local doc number, tf tuple) in increasing doc order.
+    Each term's postings are stored column-wise (doc deltas, then one tf column per field),
+    all varint-encoded, so a whole list decodes in one vectorized pass.
+    """
+    base = os.path.join(directory, name)
+    docs = np.zeros(len(doc_ids), dtype=DOC_DTYPE)
+    for i, paper_id in enumerate(doc_ids):
+        encoded = paper_id.encode('ascii')
+        if len(encoded) > 32:
+            raise ValueError(f"Paper ID too long for the index: {paper_id}")
+        docs[i]["id"] = encoded
+        docs[i]["lengths"] = doc_lengths[i]
+    with open(f"{base}.docs", 'wb') as f:
+        f.write(docs.tobytes())
+
+    entries = []
+    blob = bytearray()
+    offset = 0
+    with open(f"{base}.post", 'wb') as post:
+        for term in sorted(postings, key=lambda t: t.encode('utf-8')):
+            plist = postings[term]
+            doc_numbers = np.fromiter((p[0] for p in plist), dtype=np.int64, count=len(plist))
+            deltas = np.diff(doc_numbers, prepend=0)
+            tfs = np.array([p[1] for p in plist], dtype=np.int64).T.reshape(-1)
+            data = encode_varints(np.concatenate([deltas, tfs]))
+            post.write(data)
+            encoded = term.encode('utf-8')
+            entries.append(LEX_ENTRY.pack(len(blob), len(encoded), offset, len(data), len(plist)))
+            blob += encoded
+            offset += len(data)
+    with open(f"{base}.lex", 'wb') as f:
+        f.write(LEX_HEADER.pack(len(entries)))
+        f.write(b"".join(entries))
+        f.write(blob)
+
+
+class SearchIndex:
+    """
+    On-disk BM25F index over accepted papers, updated incrementally.
+
+    Documents added with `add()` are buffered and written as a new immutable segment by
+    `commit()`; once there are more than `max_segments` segments the smallest are merged.
+    `search()` scores every segment with vectorized BM25F (title, abstract, full text and
+    detected-biomarker fields with their own weights and length normalization), boosts
+    biomarker query terms, and returns the top-k paper IDs. The boosted terms come from
+    the relevance rules' biomarker names (`biomarkers`, default DEFAULT_RULES).
+    """
+
+    def __init__(self, directory, max_segments=8, k1=1.2, b=0.75, biomarkers=None):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_segments = max_segments
+        self.k1 = k1
+        self.b = b
+        self.set_biomarkers(DEFAULT_RULES["biomarkers"] if biomarkers is None else biomarkers)
+        self._lock = threading.RLock()
+        self._buffer = {}  # term -> [(local doc number, tf tuple)]
+        self._buffer_ids = []
+        self._buffer_lengths = []
+        self.manifest_file = os.path.join(directory, "index.json")
+        self.manifest = self._load_manifest()
+        self.segments = [Segment(directory, seg["name"]) for seg in self.manifest["segments"]]
+        self._known_ids = None
+
+    def _load_manifest(self):
+        if os.path.exists(self.manifest_file):
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get("version") == FORMAT_VERSION:
+                return manifest
+            logger.warning("Search index format changed; rebuild it with `search_index.py rebuild`")
+        return {"version": FORMAT_VERSION, "segments": [], "doc_count": 0,
+                "field_lengths": [0] * len(FIELDS), "next_segment": 1}
+
+    def _save_manifest(self):
+        tmp_file = f"{self.manifest_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_file, self.manifest_file)
+
+    def set_biomarkers(self, biomarkers):
+        """Boost the tokens of these biomarker names in later searches (e.g. after a rules change)"""
+        self.biomarker_terms = biomarker_terms(biomarkers)
+
+    def __len__(self):
+        return self.manifest["doc_count"] + len(self._buffer_ids)
+
+    def __contains__(self, paper_id):
+        with self._lock:
+            if self._known_ids is None:
+                self._known_ids = {doc_id.decode('ascii') for seg in self.segments for doc_id in seg.docs["id"]}
+            return paper_id in self._known_ids or paper_id in self._buffer_ids
+
+    # Indexing --------------------------------------------------------------------------
+
+    def add(self, paper_id, title="", abstract="", body="", biomarkers=""):
+        """Buffer a document for the next commit; returns False if the ID is already indexed"""
+        if paper_id in self:
+            return False
+        fields = [tokenize(title), tokenize(abstract), tokenize(body), tokenize(biomarkers)]
+        counts = {}
+        for field_index, tokens in enumerate(fields):
+            for token in tokens:
+                tf = counts.setdefault(token, [0] * len(FIELDS))
+                tf[field_index] += 1
+        with self._lock:
+            local = len(self._buffer_ids)
+            self._buffer_ids.append(paper_id)
+            self._buffer_lengths.append([len(tokens) for tokens in fields])
+            for token, tf in counts.items():
+                self._buffer.setdefault(token, []).append((local, tf))
+        return True
+
+    def add_paper(self, paper_id, paper):
+        """Index a scraper paper dict (title, abstract, optional full_text and biomarkers)"""
+        biomarkers = paper.get('biomarkers') or ""
+        if isinstance(biomarkers, (list, tuple)):
+            biomarkers = " ".join(biomarkers)
+        elif biomarkers == "None detected":  # corpus records store a placeholder
+            biomarkers = ""
+        return self.add(paper_id, paper.get('title', ''), paper.get('abstract') or '',
+                        paper.get('full_text') or '', biomarkers)
+
+    def commit(self, min_docs=1):
+        """Write buffered documents as a new segment if there are at least `min_docs` of them"""
+        with self._lock:
+            if len(self._buffer_ids) < max(1, min_docs):
+                return False
+            name = f"seg_{self.manifest['next_segment']:05d}"
+            write_segment(self.directory, name, self._buffer_ids, self._buffer_lengths, self._buffer)
+            self.manifest["next_segment"] += 1
+            self.manifest["segments"].append({"name": name, "docs": len(self._buffer_ids)})
+            self.manifest["doc_count"] += len(self._buffer_ids)
+            for field_index in range(len(FIELDS)):
+                self.manifest["field_lengths"][field_index] += sum(lengths[field_index] for lengths in self._buffer_lengths)
+            self._save_manifest()
+            self.segments.append(Segment(self.directory, name))
+            if self._known_ids is not None:
+                self._known_ids.update(self._buffer_ids)
+            self._buffer, self._buffer_ids, self._buffer_lengths = {}, [], []
+            if len(self.segments) > self.max_segments:
+                # Merge the smallest segments so large ones are not rewritten on every small commit
+                by_size = sorted(self.segments, key=lambda segment: len(segment.docs))
+                self.merge(by_size[:len(by_size) - self.max_segments // 2 + 1])
+            return True
+
+    def merge(self, segments=None):
+        """Merge `segments` (default: all of them) into one new segment"""
+        with self._lock:
+            segments = list(self.segments if segments is None else segments)
+            if len(segments) < 2:
+                return
+            doc_ids, doc_lengths, postings = [], [], {}
+            for segment in segments:
+                base = len(doc_ids)
+                doc_ids.extend(doc_id.decode('ascii') for doc_id in segment.docs["id"])
+                doc_lengths.extend(segment.docs["lengths"].tolist())
+                for term, offset, length, df in segment.terms():
+                    columns = decode_varints(segment.postings[offset:offset + length]).reshape(1 + len(FIELDS), df)
+                    target = postings.setdefault(term, [])
+                    target.extend(zip((np.cumsum(columns[0]) + base).tolist(), columns[1:].T.tolist()))
+            name = f"seg_{self.manifest['next_segment']:05d}"
+            write_segment(self.directory, name, doc_ids, doc_lengths, postings)
+            merged = {segment.name for segment in segments}
+            self.manifest["next_segment"] += 1
+            self.manifest["segments"] = [seg for seg in self.manifest["segments"] if seg["name"] not in merged]
+            self.manifest["segments"].append({"name": name, "docs": len(doc_ids)})
+            self._save_manifest()
+            for segment in segments:
+                segment.close()
+            self.segments = [segment for segment in self.segments if segment.name not in merged]
+            self.segments.append(Segment(self.directory, name))
+            for old_name in merged:
+                for ext in ("lex", "post", "docs"):
+                    try:
+                        os.remove(os.path.join(self.directory, f"{old_name}.{ext}"))
+                    except OSError:
+                        pass
+            logger.info(f"Merged {len(merged)} index segments ({len(doc_ids)} papers)")
+
+    # Querying --------------------------------------------------------------------------
+
+    def search(self, query, k=10, field_weights=None, biomarker_boost=BIOMARKER_BOOST):
+        """Return up to `k` (paper_id, score) pairs for a free-text query, best first"""
+        terms = list(dict.fromkeys(tokenize(query)))
+        boosted = self.biomarker_terms
+        with self._lock:
+            segments = list(self.segments)
+            total_docs = self.manifest["doc_count"]
+            field_lengths = self.manifest["field_lengths"]
+        if not terms or not total_docs:
+            return []
+
+        weights = field_weights or FIELD_WEIGHTS
+        weight_vector = np.array([weights.get(field, 0.0) for field in FIELDS])
+        avg_lengths = np.array([max(length / total_docs, 1e-9) for length in field_lengths])
+
+        # Document frequency across segments for the IDF
+        df = {term: sum(found[2] for found in (seg.lookup(term) for seg in segments) if found) for term in terms}
+        idf = {term: math.log(1 + (total_docs - n + 0.5) / (n + 0.5)) for term, n in df.items() if n}
+
+        candidates = []
+        for segment in segments:
+            scores = None
+            norms = segment.length_norms(avg_lengths, self.b)  # [docs x fields]
+            for term, term_idf in idf.items():
+                found = segment.postings_for(term)
+                if found is None:
+                    continue
+                docs, tfs = found
+                weighted = (tfs * weight_vector / norms[docs]).sum(axis=1)
+                term_scores = term_idf * weighted * (self.k1 + 1) / (self.k1 + weighted)
+                if term in boosted:
+                    term_scores *= biomarker_boost
+                if scores is None:
+                    scores = np.zeros(len(segment.docs))
+                scores += np.bincount(docs, weights=term_scores, minlength=len(scores))
+            if scores is None:
+                continue
+            hits = np.flatnonzero(scores)
+            if hits.size > k:
+                hits = hits[np.argpartition(scores[hits], -k)[-k:]]
+            candidates.extend((segment.docs["id"][i].decode('ascii'), float(scores[i])) for i in hits)
+
+        candidates.sort(key=lambda hit: hit[1], reverse=True)
+        return candidates[:k]
+
+    def close(self):
+        for segment in self.segments:
+            segment.close()
+        self.segments = []
+
+
+def rebuild_from_corpus(index_dir, corpus_dir):
+    """Recreate the index from a corpus store (the full text of local PDFs is not kept there)"""
+    from corpus_store import CorpusReader
+
+    if os.path.exists(index_dir):
+        shutil.rmtree(index_dir)
+    index = SearchIndex(index_dir)
+    with CorpusReader(corpus_dir) as reader:
+        for n, record in enumerate(reader, 1):
+            index.add_paper(record["id"], record)
+            if n % 5000 == 0:
+                index.commit()
+    index.commit()
+    index.merge()
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query or rebuild the BM25 paper index")
+    parser.add_argument("directory", help="Index directory (e.g. biomarker_research/search_index)")
+    parser.add_argument("--corpus", help="Corpus store used for titles and rebuilds (default: ../corpus)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    query_parser = commands.add_parser("query", help="Print the top-k papers for a query")
+    query_parser.add_argument("query")
+    query_parser.add_argument("-k", type=int, default=10)
+    query_parser.add_argument("--ids-only", action="store_true", help="Print paper IDs only")
+    query_parser.add_argument("--rules", help="Relevance rules whose biomarkers are boosted (default: ../relevance_rules.json)")
+    commands.add_parser("rebuild", help="Rebuild the index from the corpus store")
+    commands.add_parser("stats", help="Print index statistics")
+    args = parser.parse_args()
+    corpus_dir = args.corpus or os.path.join(os.path.dirname(os.path.abspath(args.directory)), "corpus")
+
+    if args.command == "rebuild":
+        index = rebuild_from_corpus(args.directory, corpus_dir)
+        print(f"Indexed {len(index)} papers in {args.directory}")
+        return
+
+    rules_file = getattr(args, "rules", None) or os.path.join(os.path.dirname(os.path.abspath(args.directory)), "relevance_rules.json")
+    index = SearchIndex(args.directory, biomarkers=RelevanceRules.load(rules_file).biomarkers)
+    if args.command == "stats":
+        print(json.dumps({"papers": len(index), "segments": [seg["name"] for seg in index.manifest["segments"]]}, indent=2))
+        return
+
+    started = time.perf_counter()
+    hits = index.search(args.query, k=args.k)
+    elapsed = time.perf_counter() - started
+    if args.ids_only:
+        for paper_id, _ in hits:
+            print(paper_id)
+        return
+
+    reader = None
+    if os.path.exists(os.path.join(corpus_dir, "corpus.json")):
+        from corpus_store import CorpusReader
+        reader = CorpusReader(corpus_dir)
+    for paper_id, score in hits:
+        record = reader.get(paper_id) if reader else None
+        title = record["title"] if record else ""
+        print(f"{score:8.3f}  {paper_id}  {title[:90]}")
+    print(f"{len(hits)} results in {elapsed * 1000:.1f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
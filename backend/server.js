@@ -1559,7 +1559,36 @@ app.get('/check-admin/:userId', async (req, res) => {
   }
 });
 
+// Python read service over the scraper outputs (research_service.py); it keeps them in
+// memory and answers with cached, ETagged JSON. When it isn't running the handlers below
+// fall back to reading the files.
+const RESEARCH_SERVICE_URL = process.env.RESEARCH_SERVICE_URL || 'http://127.0.0.1:8790';
+const RESEARCH_QUERY_PARAMS = ['offset', 'limit', 'source', 'biomarker', 'q', 'query', 'since', 'until', 'sort'];
+
+// Forward a GET to the research service; resolves to false if the service is unreachable
+async function proxyResearchService(req, res, servicePath) {
+  try {
+    const response = await axios.get(`${RESEARCH_SERVICE_URL}${servicePath}`, {
+      headers: req.headers['if-none-match'] ? { 'If-None-Match': req.headers['if-none-match'] } : {},
+      responseType: 'arraybuffer',
+      timeout: 2000,
+      validateStatus: () => true
+    });
+    for (const name of ['content-type', 'etag', 'cache-control']) {
+      if (response.headers[name]) {
+        res.setHeader(name, response.headers[name]);
+      }
+    }
+    res.status(response.status).end(Buffer.from(response.data));
+    return true;
+  } catch (error) {
+    return false;
+  }
+}
+
 // Get list of research papers - admin only
+// With paging or filter parameters (see RESEARCH_QUERY_PARAMS) the research service
+// returns { total, offset, limit, papers }; without them, the registry object as before
 app.get('/research/papers', async (req, res) => {
   console.log('Research papers endpoint hit for user:', req.query.userId);
   const userId = req.query.userId;
@@ -1580,6 +1609,17 @@ app.get('/research/papers', async (req, res) => {
     }
   }
   
+  const params = new URLSearchParams();
+  for (const name of RESEARCH_QUERY_PARAMS) {
+    if (req.query[name] !== undefined) {
+      params.set(name, req.query[name]);
+    }
+  }
+  const servicePath = params.toString() ? `/papers?${params}` : '/registry';
+  if (await proxyResearchService(req, res, servicePath)) {
+    return;
+  }
+  
   try {
     const papersPath = path.join(__dirname, 'biomarker_research/paper_registry.json');
     
@@ -1618,6 +1658,10 @@ app.get('/research/consolidated', async (req, res) => {
     }
   }
   
+  if (await proxyResearchService(req, res, '/consolidated')) {
+    return;
+  }
+  
   try {
     const textPath = path.join(__dirname, 'biomarker_research/consolidated_papers.txt');
     
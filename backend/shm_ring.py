@@ -0,0 +1,377 @@
+"""
+Shared-memory ring buffer of live biomarker readings.
+
+The generator (synthesize-data.py) publishes every reading into a fixed-size
+`multiprocessing.shared_memory` segment of float64 columns. Co-located processes
+attach with ShmRingReader and read the latest samples as zero-copy NumPy views, with
+no serialization and no syscall per sample.
+
+Layout (all little-endian):
+
+    header   8 uint64 words: magic, version, capacity, column count, committed sample
+             count (`sequence`), seqlock counter, pending sequence, 1 reserved
+    names    one 32-byte ASCII slot per column
+    data     float64[columns, 2 * capacity], 64-byte aligned
+
+Every sample is written twice, at slot `i` and `i + capacity`, so the last N samples
+(N <= capacity) are always one contiguous slice of each column and never need to be
+stitched together across the wrap point.
+
+Writes follow a seqlock: the writer records the sequence its write will end at
+(`pending`), makes the lock counter odd, writes the data, advances `sequence` and makes
+the counter even again. Readers take `sequence` only while the counter is even and
+unchanged. A zero-copy window stays intact until `pending` laps it, which `is_valid()`
+checks. Use `copy_latest()` when the data must outlive that. There is one writer per
+segment.
+"""
+import sys
+import time
+import argparse
+from multiprocessing import shared_memory
+
+import numpy as np
+
+MAGIC = 0x30474E4952524D42  # b"BMRRING0" read as little-endian uint64
+VERSION = 1
+HEADER_WORDS = 8
+NAME_BYTES = 32
+DEFAULT_NAME = "biomarker_ring"
+DEFAULT_CAPACITY = 65536  # ~22 minutes at 50 Hz, ~9.4 MB for the default columns
+
+# Same order as the readings produced by synthesize-data.py; timestamp is Unix epoch seconds
+COLUMNS = ("timestamp", "cortisol_ug_dL", "lactate_mmol_L", "uric_acid_mg_dL", "crp_mg_L",
+           "il6_pg_mL", "body_temp_C", "heart_rate_BPM", "blood_oxygen_pct")
+
+_MAGIC, _VERSION, _CAPACITY, _COLUMNS, _SEQUENCE, _LOCK, _PENDING = range(7)
+
+
+def _data_offset(n_columns):
+    offset = HEADER_WORDS * 8 + n_columns * NAME_BYTES
+    return (offset + 63) // 64 * 64
+
+
+def segment_size(capacity, n_columns=len(COLUMNS)):
+    return _data_offset(n_columns) + n_columns * 2 * capacity * 8
+
+
+def _attach_untracked(name):
+    """
+    Attach to an existing segment without registering it with the resource tracker.
+
+    Before Python 3.13 attaching registers the segment too, so a reader's exit would
+    unlink a ring the generator is still writing.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    from multiprocessing import resource_tracker
+    register = resource_tracker.register
+    resource_tracker.register = lambda *args, **kwargs: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+class _RingSegment:
+    """NumPy views over a mapped ring segment"""
+
+    def __init__(self, shm):
+        self.shm = shm
+        self.header = np.ndarray((HEADER_WORDS,), dtype="<u8", buffer=shm.buf)
+        if int(self.header[_MAGIC]) != MAGIC or int(self.header[_VERSION]) != VERSION:
+            raise ValueError(f"Shared memory segment {shm.name!r} is not a biomarker ring (version {VERSION})")
+        self.capacity = int(self.header[_CAPACITY])
+        n_columns = int(self.header[_COLUMNS])
+        names = np.ndarray((n_columns,), dtype=f"S{NAME_BYTES}", buffer=shm.buf, offset=HEADER_WORDS * 8)
+        self.columns = tuple(name.decode("ascii") for name in names)
+        self.index = {name: i for i, name in enumerate(self.columns)}
+        self.data = np.ndarray((n_columns, 2 * self.capacity), dtype="<f8", buffer=shm.buf,
+                               offset=_data_offset(n_columns))
+
+    def release(self):
+        # Views must go before the mapping can be closed
+        self.header = self.data = None
+        self.shm.close()
+
+
+class ShmRingWriter:
+    """
+    Single producer for a ring segment.
+
+    Creates the segment `name`, or reuses an existing one with the same layout so readers
+    stay attached across generator restarts (its sequence carries on). A stale segment
+    with a different layout is replaced.
+    """
+
+    def __init__(self, name=DEFAULT_NAME, capacity=DEFAULT_CAPACITY, columns=COLUMNS):
+        if capacity < 1:
+            raise ValueError("capacity must be positive")
+        self.name = name
+        columns = tuple(columns)
+        size = segment_size(capacity, len(columns))
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            self._initialize(shm, capacity, columns)
+        except FileExistsError:
+            shm = shared_memory.SharedMemory(name=name)
+            if not self._compatible(shm, capacity, columns):
+                shm.close()
+                shm.unlink()
+                shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+                self._initialize(shm, capacity, columns)
+        self._segment = _RingSegment(shm)
+        self.capacity = capacity
+        self.columns = self._segment.columns
+        self._header = self._segment.header
+        self._data = self._segment.data
+        # Published in the header; tracked locally too so appends don't read shared memory
+        self._sequence = int(self._header[_SEQUENCE])
+        self._lock = int(self._header[_LOCK])
+        if self._lock % 2:  # a previous writer died mid-write
+            self._lock += 1
+            self._header[_LOCK] = self._lock
+        self._header[_PENDING] = self._sequence
+
+    @staticmethod
+    def _compatible(shm, capacity, columns):
+        """Whether an existing segment has exactly this layout"""
+        if shm.size < segment_size(capacity, len(columns)):
+            return False
+        header = np.ndarray((HEADER_WORDS,), dtype="<u8", buffer=shm.buf)
+        compatible = (int(header[_MAGIC]) == MAGIC and int(header[_VERSION]) == VERSION
+                      and int(header[_CAPACITY]) == capacity and int(header[_COLUMNS]) == len(columns))
+        if compatible:
+            names = np.ndarray((len(columns),), dtype=f"S{NAME_BYTES}", buffer=shm.buf, offset=HEADER_WORDS * 8)
+            compatible = tuple(name.decode("ascii") for name in names) == columns
+            del names
+        del header
+        return compatible
+
+    @staticmethod
+    def _initialize(shm, capacity, columns):
+        header = np.ndarray((HEADER_WORDS,), dtype="<u8", buffer=shm.buf)
+        header[:] = 0
+        names = np.ndarray((len(columns),), dtype=f"S{NAME_BYTES}", buffer=shm.buf, offset=HEADER_WORDS * 8)
+        names[:] = [name.encode("ascii") for name in columns]
+        header[_CAPACITY] = capacity
+        header[_COLUMNS] = len(columns)
+        header[_VERSION] = VERSION
+        header[_MAGIC] = MAGIC  # last, so a reader never sees a half-initialized segment as valid
+        del header, names
+
+    @property
+    def sequence(self):
+        """Number of samples published so far"""
+        return self._sequence
+
+    def _begin(self, count):
+        self._header[_PENDING] = self._sequence + count
+        self._lock += 1
+        self._header[_LOCK] = self._lock
+
+    def _commit(self, count):
+        self._sequence += count
+        self._header[_SEQUENCE] = self._sequence
+        self._lock += 1
+        self._header[_LOCK] = self._lock
+
+    def append(self, values):
+        """Publish one sample: a sequence of floats in column order"""
+        slot = self._sequence % self.capacity
+        self._begin(1)
+        self._data[:, slot] = values
+        self._data[:, slot + self.capacity] = values
+        self._commit(1)
+
+    def append_reading(self, reading, timestamp):
+        """Publish a reading dict from generate_single_reading; `timestamp` is its Unix time in seconds"""
+        self.append([timestamp] + [reading[name] for name in self.columns[1:]])
+
+    def extend(self, columns):
+        """
+        Publish many samples at once.
+
+        `columns` is a mapping of column name to equal-length arrays (every ring column
+        must be present) or a 2D array shaped (columns, samples). Only the last
+        `capacity` samples are kept.
+        """
+        if isinstance(columns, dict):
+            block = np.stack([np.asarray(columns[name], dtype="<f8") for name in self.columns])
+        else:
+            block = np.asarray(columns, dtype="<f8")
+        count = block.shape[1]
+        if count == 0:
+            return
+        skipped = max(0, count - self.capacity)
+        block = block[:, skipped:]
+        start = (self._sequence + skipped) % self.capacity
+        first = min(block.shape[1], self.capacity - start)
+        self._begin(count)
+        for offset in (0, self.capacity):
+            self._data[:, offset + start:offset + start + first] = block[:, :first]
+            self._data[:, offset:offset + block.shape[1] - first] = block[:, first:]
+        self._commit(count)
+
+    def close(self, unlink=True):
+        """Detach; with `unlink` the segment is also removed (attached readers keep their mapping)"""
+        if self._segment is None:
+            return
+        self._header = self._data = None
+        shm = self._segment.shm
+        self._segment.release()
+        self._segment = None
+        if unlink:
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+        else:
+            # Leave it for readers instead of having the resource tracker remove it at exit
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class RingWindow:
+    """The samples [start, end) of a ring as zero-copy views; check `ShmRingReader.is_valid` after using them"""
+
+    __slots__ = ("start", "end", "data", "_index")
+
+    def __init__(self, start, end, data, index):
+        self.start = start
+        self.end = end
+        self.data = data  # float64 view shaped (columns, samples)
+        self._index = index
+
+    def __len__(self):
+        return self.end - self.start
+
+    def __getitem__(self, column):
+        return self.data[self._index[column]]
+
+
+class ShmRingReader:
+    """Attach to a ring segment published by ShmRingWriter (any number of readers)"""
+
+    def __init__(self, name=DEFAULT_NAME):
+        shm = _attach_untracked(name)
+        try:
+            self._segment = _RingSegment(shm)
+        except ValueError:
+            shm.close()
+            raise
+        self.name = name
+        self.capacity = self._segment.capacity
+        self.columns = self._segment.columns
+        self._header = self._segment.header
+        self._data = self._segment.data
+        self._index = self._segment.index
+
+    @property
+    def sequence(self):
+        """Number of samples the writer has committed"""
+        return int(self._header[_SEQUENCE])
+
+    def _stable_sequence(self):
+        """Committed sequence read under the seqlock (spins while a write is in progress)"""
+        while True:
+            lock = int(self._header[_LOCK])
+            if lock % 2 == 0:
+                sequence = int(self._header[_SEQUENCE])
+                if int(self._header[_LOCK]) == lock:
+                    return sequence
+            time.sleep(0)
+
+    def _window(self, start, end):
+        slot = start % self.capacity
+        return RingWindow(start, end, self._data[:, slot:slot + end - start], self._index)
+
+    def latest(self, n=None):
+        """Zero-copy window over the last `n` committed samples (all retained samples by default)"""
+        end = self._stable_sequence()
+        n = self.capacity if n is None else min(n, self.capacity)
+        return self._window(max(0, end - n), end)
+
+    def since(self, sequence):
+        """Zero-copy window over the samples committed after `sequence` (the oldest are dropped if lapped)"""
+        end = self._stable_sequence()
+        return self._window(min(end, max(sequence, end - self.capacity)), end)
+
+    def is_valid(self, window):
+        """True while the writer hasn't started overwriting any sample in `window`"""
+        # `pending` is raised before a write touches the data, so it bounds every slot being written
+        return int(self._header[_PENDING]) <= window.start + self.capacity
+
+    def copy_latest(self, n=None):
+        """Consistent copy of the last `n` samples as {column: array}, retrying if the writer laps the read"""
+        while True:
+            window = self.latest(n)
+            data = window.data.copy()
+            if self.is_valid(window):
+                return window.start, {name: data[i] for i, name in enumerate(self.columns)}
+
+    def wait(self, sequence, timeout=None, poll_interval=0.001):
+        """Block until more than `sequence` samples are committed; returns the new sequence (or the old one on timeout)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            current = self.sequence
+            if current > sequence or (deadline is not None and time.monotonic() >= deadline):
+                return current
+            time.sleep(poll_interval)
+
+    def close(self):
+        if self._segment is None:
+            return
+        self._header = self._data = None
+        self._segment.release()
+        self._segment = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect a biomarker shared-memory ring")
+    parser.add_argument("name", nargs="?", default=DEFAULT_NAME, help="Segment name (synthesize-data.py --shm-ring)")
+    parser.add_argument("--tail", type=int, default=5, help="Print the last N samples")
+    parser.add_argument("--follow", action="store_true", help="Keep printing new samples as they arrive")
+    parser.add_argument("--unlink", action="store_true", help="Remove the segment")
+    args = parser.parse_args()
+
+    if args.unlink:
+        shm = shared_memory.SharedMemory(name=args.name)
+        shm.close()
+        shm.unlink()
+        print(f"Removed {args.name}")
+        return
+
+    with ShmRingReader(args.name) as reader:
+        print(f"{args.name}: {reader.sequence} samples published, capacity {reader.capacity}")
+        print(" ".join(f"{name:>16}" for name in reader.columns))
+        sequence = max(0, reader.sequence - args.tail)
+        try:
+            while True:
+                window = reader.since(sequence)
+                rows = window.data.T.copy()
+                if not reader.is_valid(window):
+                    continue  # lapped while copying; re-read from the oldest retained sample
+                for row in rows:
+                    print(" ".join(f"{value:>16.4f}" for value in row))
+                sequence = window.end
+                if not args.follow:
+                    break
+                reader.wait(sequence, timeout=1.0)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+import os
+import json
+import math
+import shutil
+import logging
+import argparse
+import threading
+from collections import Counter
+
+import numpy as np
+
+from search_index import tokenize
+
+try:
+    import scipy.sparse as sparse
+except ImportError:  # optional: the NumPy path computes the same scores, a little slower
+    sparse = None
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+ID_DTYPE = np.dtype("S32")
+ARRAYS = {"indptr": np.int64, "indices": np.int32, "data": np.float32, "ids": ID_DTYPE}
+
+
+def paper_text(paper):
+    """The text a paper is compared on: its title and abstract"""
+    return f"{paper.get('title', '')}\n{paper.get('abstract') or ''}"
+
+
+class SimilarityIndex:
+    """
+    TF-IDF vectors of accepted papers for "related papers" lookups.
+
+    Rows are L2-normalized, sublinear TF-IDF vectors over a pruned vocabulary, stored as CSR
+    arrays (`indptr`, `indices`, `data`, plus the paper IDs) in flat files that are
+    memory-mapped on open. New papers are vectorized with the current vocabulary and IDF
+    and appended on `commit()`; once the corpus has grown `refit_growth` times since the
+    last fit, `commit()` refits the vocabulary over every paper (supplied by the caller) so
+    that new terms enter and IDF weights follow the corpus. Each fit writes a new
+    generation directory and switches to it by rewriting `index.json`, so a crash leaves
+    the previous generation intact.
+    """
+
+    def __init__(self, directory, min_df=2, max_df=0.5, max_features=50000, refit_growth=2.0):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.min_df = min_df
+        self.max_df = max_df
+        self.max_features = max_features
+        self.refit_growth = refit_growth
+        self._lock = threading.RLock()
+        self._buffer = []  # (paper_id, text) added since the last commit
+        self._known_ids = None
+        self.meta_file = os.path.join(directory, "index.json")
+        self.meta = self._load_meta()
+        self._open()
+
+    def _load_meta(self):
+        if os.path.exists(self.meta_file):
+            with open(self.meta_file, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get("version") == FORMAT_VERSION:
+                return meta
+            logger.warning("Similarity index format changed; it will be refitted on the next commit")
+        return {"version": FORMAT_VERSION, "generation": 0, "rows": 0, "nnz": 0, "fit_rows": 0}
+
+    def _save_meta(self):
+        tmp_file = f"{self.meta_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f, indent=2)
+        os.replace(tmp_file, self.meta_file)
+
+    def _generation_dir(self, generation=None):
+        return os.path.join(self.directory, f"gen_{self.meta['generation'] if generation is None else generation:05d}")
+
+    def _open(self):
+        """Memory-map the current generation (nothing is rebuilt)"""
+        self.vocabulary, self.idf = {}, np.zeros(0, dtype=np.float32)
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.indices = np.zeros(0, dtype=np.int32)
+        self.data = np.zeros(0, dtype=np.float32)
+        self.ids = np.zeros(0, dtype=ID_DTYPE)
+        self._matrix = None
+        if not self.meta["generation"]:
+            return
+        gen_dir = self._generation_dir()
+        with open(os.path.join(gen_dir, "vocabulary.json"), 'r', encoding='utf-8') as f:
+            terms = json.load(f)
+        self.vocabulary = {term: column for column, term in enumerate(terms)}
+        self.idf = np.fromfile(os.path.join(gen_dir, "idf.bin"), dtype=np.float32)
+        lengths = {"indptr": self.meta["rows"] + 1, "indices": self.meta["nnz"],
+                   "data": self.meta["nnz"], "ids": self.meta["rows"]}
+        for name, dtype in ARRAYS.items():
+            if lengths[name]:
+                setattr(self, name, np.memmap(os.path.join(gen_dir, f"{name}.bin"), dtype=dtype,
+                                              mode='r', shape=(lengths[name],)))
+
+    def __len__(self):
+        return self.meta["rows"]
+
+    # Vectorizing -----------------------------------------------------------------------
+
+    def vectorize(self, texts):
+        """CSR arrays (indptr, indices, data) of L2-normalized TF-IDF rows for `texts`"""
+        return self._vectorize_counts(Counter(tokenize(text)) for text in texts)
+
+    def _vectorize_counts(self, token_counts):
+        indptr, indices, data = [0], [], []
+        for counts in token_counts:
+            counts = {token: n for token, n in counts.items() if token in self.vocabulary}
+            columns = np.fromiter((self.vocabulary[token] for token in counts), dtype=np.int32, count=len(counts))
+            order = np.argsort(columns)
+            weights = (1 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))) * self.idf[columns]
+            norm = float(np.sqrt((weights ** 2).sum()))
+            indices.append(columns[order])
+            data.append((weights[order] / norm if norm else weights[order]).astype(np.float32))
+            indptr.append(indptr[-1] + len(counts))
+        return (np.array(indptr, dtype=np.int64),
+                np.concatenate(indices) if indices else np.zeros(0, dtype=np.int32),
+                np.concatenate(data) if data else np.zeros(0, dtype=np.float32))
+
+    def _fit_vocabulary(self, documents):
+        """Choose the vocabulary and IDF from (paper_id, text) pairs; returns the tokenized documents"""
+        tokenized, df = [], Counter()
+        for paper_id, text in documents:
+            counts = Counter(tokenize(text))
+            tokenized.append((paper_id, counts))
+            df.update(counts.keys())
+        total = len(tokenized)
+        # Terms seen in a single paper carry no similarity signal, but small corpora keep them
+        min_df = self.min_df if total >= 50 else 1
+        max_df = max(1, int(self.max_df * total)) if total >= 50 else total
+        kept = [term for term, n in df.items() if min_df <= n <= max_df]
+        kept.sort(key=lambda term: (-df[term], term))
+        terms = sorted(kept[:self.max_features])
+        idf = np.array([math.log((1 + total) / (1 + df[term])) + 1 for term in terms], dtype=np.float32)
+        return terms, idf, tokenized
+
+    # Updating --------------------------------------------------------------------------
+
+    def add(self, paper_id, text):
+        """Buffer a paper for the next commit; returns False if it is already indexed or buffered"""
+        with self._lock:
+            if self._known_ids is None:
+                self._known_ids = {paper_id.decode('ascii') for paper_id in self.ids}
+                self._known_ids.update(pending_id for pending_id, _ in self._buffer)
+            if paper_id in self._known_ids:
+                return False
+            self._known_ids.add(paper_id)
+            self._buffer.append((paper_id, text))
+            return True
+
+    def add_paper(self, paper_id, paper):
+        return self.add(paper_id, paper_text(paper))
+
+    def __contains__(self, paper_id):
+        return self._row(paper_id) is not None
+
+    def needs_refit(self):
+        rows = self.meta["rows"] + len(self._buffer)
+        return rows > 0 and (not self.meta["generation"] or rows >= self.refit_growth * max(1, self.meta["fit_rows"]))
+
+    def commit(self, documents=None):
+        """
+        Write buffered papers.
+
+        `documents` is a callable returning every indexed paper as (paper_id, text) pairs
+        (e.g. from the corpus store); it is only called when the index needs a refit.
+        Without it, buffered papers are appended with the current vocabulary.
+        """
+        with self._lock:
+            if self.needs_refit() and (documents is not None or not self.meta["generation"]):
+                source = list(documents()) if documents is not None else []
+                seen = {paper_id for paper_id, _ in source}
+                source.extend(item for item in self._buffer if item[0] not in seen)
+                self.fit(source)
+                return True
+            if not self._buffer:
+                return False
+            self._append([(paper_id, Counter(tokenize(text))) for paper_id, text in self._buffer])
+            self._buffer = []
+            return True
+
+    def fit(self, documents):
+        """Rebuild the index from scratch from (paper_id, text) pairs"""
+        with self._lock:
+            terms, idf, tokenized = self._fit_vocabulary(documents)
+            self.vocabulary = {term: column for column, term in enumerate(terms)}
+            self.idf = idf
+            generation = self.meta["generation"] + 1
+            gen_dir = self._generation_dir(generation)
+            shutil.rmtree(gen_dir, ignore_errors=True)
+            os.makedirs(gen_dir)
+            with open(os.path.join(gen_dir, "vocabulary.json"), 'w', encoding='utf-8') as f:
+                json.dump(terms, f)
+            idf.tofile(os.path.join(gen_dir, "idf.bin"))
+            for name in ARRAYS:
+                open(os.path.join(gen_dir, f"{name}.bin"), 'wb').close()
+            with open(os.path.join(gen_dir, "indptr.bin"), 'wb') as f:
+                np.zeros(1, dtype=np.int64).tofile(f)
+
+            previous = self.meta["generation"]
+            self._known_ids = None
+            self.meta.update({"generation": generation, "rows": 0, "nnz": 0, "fit_rows": len(tokenized),
+                              "vocabulary": len(terms)})
+            self._append(tokenized, save=False)
+            self._save_meta()
+            self._buffer = []
+            if previous:
+                shutil.rmtree(self._generation_dir(previous), ignore_errors=True)
+            logger.info(f"Fitted similarity index: {len(tokenized)} papers, {len(terms)} terms")
+
+    def _append(self, documents, save=True):
+        """Append (paper_id, token counts) rows to the current generation"""
+        gen_dir = self._generation_dir()
+        ids = np.array([paper_id.encode('ascii') for paper_id, _ in documents], dtype=ID_DTYPE)
+        indptr, indices, data = self._vectorize_counts(counts for _, counts in documents)
+        rows, nnz = self.meta["rows"], self.meta["nnz"]
+        sizes = {"indptr": rows + 1, "indices": nnz, "data": nnz, "ids": rows}
+        chunks = {"indptr": indptr[1:] + nnz, "indices": indices, "data": data, "ids": ids}
+        for name, dtype in ARRAYS.items():
+            with open(os.path.join(gen_dir, f"{name}.bin"), 'r+b') as f:
+                # Drop anything past the committed size (left by an interrupted append)
+                f.truncate(sizes[name] * np.dtype(dtype).itemsize)
+                f.seek(0, os.SEEK_END)
+                chunks[name].astype(dtype).tofile(f)
+        self.meta["rows"] = rows + len(ids)
+        self.meta["nnz"] = nnz + len(indices)
+        if self._known_ids is not None:
+            self._known_ids.update(paper_id for paper_id, _ in documents)
+        if save:
+            self._save_meta()
+        self._open()
+
+    # Querying --------------------------------------------------------------------------
+
+    def _row(self, paper_id):
+        if not len(self.ids):
+            return None
+        hits = np.flatnonzero(self.ids == paper_id.encode('ascii'))
+        return int(hits[0]) if hits.size else None
+
+    def _scores(self, query):
+        """Cosine scores of every row against the dense query columns `query` [vocabulary x batch]"""
+        rows = self.meta["rows"]
+        if sparse is not None:
+            if self._matrix is None:
+                self._matrix = sparse.csr_matrix((self.data, self.indices, self.indptr),
+                                                 shape=(rows, len(self.vocabulary)), copy=False)
+            return np.asarray(self._matrix @ query)
+        # Only the stored entries in a query's columns contribute: find them with one boolean
+        # gather, then accumulate per row
+        scores = np.zeros((rows, query.shape[1]), dtype=np.float32)
+        used = query.any(axis=1)
+        positions = np.flatnonzero(used[self.indices])
+        if positions.size:
+            row_of = np.searchsorted(self.indptr, positions, side='right') - 1
+            products = self.data[positions, None] * query[self.indices[positions]]
+            for column in range(query.shape[1]):
+                scores[:, column] = np.bincount(row_of, weights=products[:, column], minlength=rows)
+        return scores
+
+    def _top_k(self, scores, k, exclude=None):
+        results = []
+        for column in range(scores.shape[1]):
+            column_scores = scores[:, column].copy()
+            if exclude and exclude[column] is not None:
+                column_scores[exclude[column]] = 0
+            hits = np.flatnonzero(column_scores > 0)
+            if hits.size > k:
+                hits = hits[np.argpartition(column_scores[hits], -k)[-k:]]
+            hits = hits[np.argsort(-column_scores[hits])]
+            results.append([(self.ids[i].decode('ascii'), float(column_scores[i])) for i in hits])
+        return results
+
+    def query(self, texts, k=10):
+        """Top-k (paper_id, cosine) lists for each text in a batch"""
+        texts = list(texts)
+        with self._lock:
+            if not texts or not self.meta["rows"]:
+                return [[] for _ in texts]
+            indptr, indices, data = self.vectorize(texts)
+            query = np.zeros((len(self.vocabulary), len(texts)), dtype=np.float32)
+            for column in range(len(texts)):
+                query[indices[indptr[column]:indptr[column + 1]], column] = data[indptr[column]:indptr[column + 1]]
+            return self._top_k(self._scores(query), k)
+
+    def similar_to(self, paper_ids, k=10):
+        """Top-k related papers for each indexed paper ID in a batch (the paper itself excluded)"""
+        with self._lock:
+            rows = [self._row(paper_id) for paper_id in paper_ids]
+            query = np.zeros((len(self.vocabulary), len(rows)), dtype=np.float32)
+            for column, row in enumerate(rows):
+                if row is not None:
+                    start, end = self.indptr[row], self.indptr[row + 1]
+                    query[self.indices[start:end], column] = self.data[start:end]
+            if not self.meta["rows"]:
+                return [[] for _ in rows]
+            return self._top_k(self._scores(query), k, exclude=rows)
+
+
+def fit_from_corpus(index_dir, corpus_dir, **options):
+    """Refit the index over every paper in a corpus store"""
+    from corpus_store import CorpusReader
+
+    index = SimilarityIndex(index_dir, **options)
+    with CorpusReader(corpus_dir) as reader:
+        index.fit((record["id"], paper_text(record)) for record in reader)
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find related papers with the TF-IDF similarity index")
+    parser.add_argument("directory", help="Index directory (e.g. biomarker_research/similarity_index)")
+    parser.add_argument("--corpus", help="Corpus store used for titles and refits (default: ../corpus)")
+    parser.add_argument("-k", type=int, default=10)
+    commands = parser.add_subparsers(dest="command", required=True)
+    paper_parser = commands.add_parser("paper", help="Papers related to indexed papers")
+    paper_parser.add_argument("paper_ids", nargs="+")
+    text_parser = commands.add_parser("text", help="Papers related to a piece of text")
+    text_parser.add_argument("text")
+    commands.add_parser("fit", help="Refit the index from the corpus store")
+    args = parser.parse_args()
+    corpus_dir = args.corpus or os.path.join(os.path.dirname(os.path.abspath(args.directory)), "corpus")
+
+    if args.command == "fit":
+        index = fit_from_corpus(args.directory, corpus_dir)
+        print(f"Indexed {len(index)} papers over {len(index.vocabulary)} terms")
+        return
+
+    index = SimilarityIndex(args.directory)
+    if args.command == "paper":
+        queries, results = args.paper_ids, index.similar_to(args.paper_ids, k=args.k)
+    else:
+        queries, results = [args.text], index.query([args.text], k=args.k)
+
+    reader = None
+    if os.path.exists(os.path.join(corpus_dir, "corpus.json")):
+        from corpus_store import CorpusReader
+        reader = CorpusReader(corpus_dir)
+    for query, hits in zip(queries, results):
+        print(f"Related to {query[:80]}:")
+        for paper_id, score in hits:
+            record = reader.get(paper_id) if reader else None
+            print(f"  {score:6.3f}  {paper_id}  {record['title'][:80] if record else ''}")
+
+
+if __name__ == "__main__":
+    main()
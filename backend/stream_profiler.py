@@ -0,0 +1,337 @@
+"""
+Low-overhead stage timing for the synthetic data stream (synthesize-data.py).
+
+StageProfiler keeps, for each stage of the stream loop, lifetime totals, a rolling window
+of recent durations (for percentiles) and a log2-bucketed histogram. It prints a one-line
+summary every `report_interval` seconds and dumps everything to JSON when the stream
+stops. When profiling is off, NULL_PROFILER stands in: its timer is a shared no-op object,
+so the loop only pays for an empty with-block per stage.
+
+ProgramProfiler optionally runs a whole-program profiler alongside: cProfile (exact, but
+it slows Python code down noticeably) or a sampling thread that snapshots the main
+thread's stack every few milliseconds (a few percent overhead, fine at production rates).
+"""
+import os
+import sys
+import json
+import time
+import threading
+from collections import deque
+
+HISTOGRAM_BUCKETS = 40  # bucket i holds durations in [2**(i-1), 2**i) µs; the last one is open-ended
+IDLE_STAGES = ("sleep",)  # stages that are waiting rather than working
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))]
+
+
+def _round(value, digits=9):
+    return round(value, digits) if value is not None else None
+
+
+def _format_seconds(seconds):
+    if seconds is None:
+        return "-"
+    if seconds >= 1:
+        return f"{seconds:.2f}s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.1f}ms"
+    return f"{seconds * 1e6:.0f}µs"
+
+
+class StageStats:
+    """Running statistics for one stage"""
+
+    __slots__ = ("count", "total", "max", "recent", "buckets")
+
+    def __init__(self, window):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=window)
+        self.buckets = [0] * HISTOGRAM_BUCKETS
+
+    def record(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.recent.append(seconds)
+        self.buckets[min(int(seconds * 1e6).bit_length(), HISTOGRAM_BUCKETS - 1)] += 1
+
+    def snapshot(self):
+        recent = sorted(self.recent)
+        histogram = {f"<{2 ** i}": n for i, n in enumerate(self.buckets[:-1]) if n}
+        if self.buckets[-1]:
+            histogram[f">={2 ** (HISTOGRAM_BUCKETS - 2)}"] = self.buckets[-1]
+        return {
+            "count": self.count,
+            "total_seconds": round(self.total, 6),
+            "mean_seconds": _round(self.total / self.count) if self.count else None,
+            "max_seconds": _round(self.max),
+            # Percentiles cover the rolling window, so they follow the current behaviour
+            "recent": {
+                "samples": len(recent),
+                "p50_seconds": _round(_percentile(recent, 0.50)),
+                "p90_seconds": _round(_percentile(recent, 0.90)),
+                "p99_seconds": _round(_percentile(recent, 0.99)),
+            },
+            "histogram_us": histogram,
+        }
+
+
+class _StageTimer:
+    """Reusable context manager timing one stage (the stream loop is single-threaded)"""
+
+    __slots__ = ("stats", "_started")
+
+    def __init__(self, stats):
+        self.stats = stats
+        self._started = 0.0
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stats.record(time.perf_counter() - self._started)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class NullProfiler:
+    """Stand-in used when profiling is disabled; every hook is a no-op"""
+
+    enabled = False
+    _timer = _NullTimer()
+
+    def stage(self, name):
+        return self._timer
+
+    def record(self, name, seconds):
+        pass
+
+    def tick(self, readings=1):
+        pass
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def write_json(self, path, extra=None):
+        return None
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class StageProfiler:
+    """
+    Per-stage timers for the stream loop.
+
+    Wrap each stage in `with profiler.stage("name"):` and call `tick()` once per reading;
+    `tick` prints a summary line every `report_interval` seconds (0 disables it) showing
+    per-stage latency percentiles, each stage's share of wall time and the reading rate
+    the busy stages could sustain without sleeping.
+    """
+
+    enabled = True
+
+    def __init__(self, report_interval=10.0, window=1024, log=print, program_profiler=None):
+        self.report_interval = report_interval
+        self.window = window
+        self.log = log
+        self.program_profiler = program_profiler
+        self.stages = {}
+        self._timers = {}
+        self.readings = 0
+        self._started = time.perf_counter()
+        self._next_report = self._started + report_interval if report_interval else float('inf')
+        self._last_report = (self._started, 0, {})  # (time, readings, stage totals) at the previous summary
+
+    def stage(self, name):
+        timer = self._timers.get(name)
+        if timer is None:
+            timer = self._timers[name] = _StageTimer(self._stats(name))
+        return timer
+
+    def _stats(self, name):
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = StageStats(self.window)
+        return stats
+
+    def record(self, name, seconds):
+        """Record a duration measured elsewhere"""
+        self._stats(name).record(seconds)
+
+    def tick(self, readings=1):
+        self.readings += readings
+        now = time.perf_counter()
+        if now >= self._next_report:
+            self.log(self.summary_line(now))
+            self._next_report = now + self.report_interval
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._last_report = (self._started, 0, {})
+        if self.report_interval:
+            self._next_report = self._started + self.report_interval
+        if self.program_profiler:
+            self.program_profiler.start()
+
+    def stop(self):
+        if self.program_profiler:
+            self.program_profiler.stop()
+
+    def summary_line(self, now=None):
+        """One line describing the interval since the previous summary"""
+        now = now or time.perf_counter()
+        last_time, last_readings, last_totals = self._last_report
+        elapsed = max(now - last_time, 1e-9)
+        readings = self.readings - last_readings
+        parts = [f"[profile] {readings / elapsed:.1f} readings/s"]
+        busy = 0.0
+        for name, stats in self.stages.items():
+            share = (stats.total - last_totals.get(name, 0.0)) / elapsed
+            if name not in IDLE_STAGES:
+                busy += stats.total - last_totals.get(name, 0.0)
+            recent = sorted(stats.recent)
+            parts.append(f"{name} p50 {_format_seconds(_percentile(recent, 0.5))} "
+                         f"p99 {_format_seconds(_percentile(recent, 0.99))} {share:.1%}")
+        if readings and busy:
+            parts.append(f"capacity ~{readings / busy:.0f} readings/s")
+        self._last_report = (now, self.readings, {name: stats.total for name, stats in self.stages.items()})
+        return " | ".join(parts)
+
+    def report(self, extra=None):
+        wall = time.perf_counter() - self._started
+        busy = sum(stats.total for name, stats in self.stages.items() if name not in IDLE_STAGES)
+        report = {
+            "wall_seconds": round(wall, 6),
+            "readings": self.readings,
+            "readings_per_second": round(self.readings / wall, 3) if wall else None,
+            "busy_seconds": round(busy, 6),
+            # Rate the loop could sustain if it never slept: which stage caps throughput
+            "capacity_readings_per_second": round(self.readings / busy, 1) if busy else None,
+            "stages": {name: dict(stats.snapshot(), share_of_wall=round(stats.total / wall, 6) if wall else None)
+                       for name, stats in self.stages.items()},
+        }
+        if self.program_profiler:
+            report["program_profile"] = self.program_profiler.report()
+        if extra:
+            report.update(extra)
+        return report
+
+    def write_json(self, path, extra=None):
+        """Write the report atomically and return it"""
+        report = self.report(extra)
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_file = f"{path}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_file, path)
+        return report
+
+
+class ProgramProfiler:
+    """
+    Whole-program profiler run around the stream loop.
+
+    `kind` is "cprofile" (writes pstats data to `output_file`, viewable with
+    `python -m pstats` or snakeviz) or "sample" (writes collapsed stacks, one
+    "frame;frame;frame count" line per stack, for flamegraph.pl or speedscope).
+    """
+
+    def __init__(self, kind, output_file, sample_interval=0.005):
+        if kind not in ("cprofile", "sample"):
+            raise ValueError(f"Unknown profiler: {kind}")
+        self.kind = kind
+        self.output_file = output_file
+        self.sample_interval = sample_interval
+        self.stacks = {}
+        self.samples = 0
+        self._profile = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._target = None
+
+    def start(self):
+        if self.kind == "cprofile":
+            import cProfile
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        else:
+            self._target = threading.get_ident()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._sample_loop, name="stream-sampler", daemon=True)
+            self._thread.start()
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.sample_interval):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            key = ";".join(reversed(stack))
+            self.stacks[key] = self.stacks.get(key, 0) + 1
+            self.samples += 1
+
+    def stop(self):
+        """Stop profiling and write `output_file`"""
+        if self.kind == "cprofile":
+            if self._profile is None:
+                return
+            self._profile.disable()
+            self._profile.dump_stats(self.output_file)
+        else:
+            if self._thread is None:
+                return
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+            with open(self.output_file, 'w', encoding='utf-8') as f:
+                for stack, count in sorted(self.stacks.items()):
+                    f.write(f"{stack} {count}\n")
+
+    def report(self, top=15):
+        """Summary of the hottest functions for the JSON report"""
+        summary = {"kind": self.kind, "output_file": self.output_file}
+        if self.kind == "cprofile":
+            if self._profile is not None:
+                import pstats
+                stats = pstats.Stats(self._profile).stats
+                hottest = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:top]
+                summary["top_cumulative"] = [
+                    {"function": f"{name} ({os.path.basename(filename)}:{line})", "calls": calls,
+                     "own_seconds": round(own, 6), "cumulative_seconds": round(cumulative, 6)}
+                    for (filename, line, name), (_, calls, own, cumulative, _) in hottest
+                ]
+        else:
+            own = {}
+            for stack, count in self.stacks.items():
+                leaf = stack.rsplit(";", 1)[-1]
+                own[leaf] = own.get(leaf, 0) + count
+            summary["samples"] = self.samples
+            summary["sample_interval_seconds"] = self.sample_interval
+            summary["top_own"] = [{"frame": frame, "samples": count, "share": round(count / self.samples, 4)}
+                                  for frame, count in sorted(own.items(), key=lambda item: -item[1])[:top]]
+        return summary
@@ -2,24 +2,30 @@
 # When in streaming mode, data is always saved to biomarker_data.csv regardless of the 
 # output file specified, ensuring the data is available for the frontend.
 
-import numpy as np
-import pandas as pd
+# NumPy, pandas and requests are imported inside the functions that need them. Streaming
+# only needs requests (and not even that with --test), so it starts without loading the
+# heavy modules.
 import datetime
 import argparse
-import requests
 import time
 import json
-import socket
-import threading
+import csv
+import math
+import random
 import os
 from pathlib import Path
 
+from stream_profiler import StageProfiler, ProgramProfiler, NULL_PROFILER
+
+JSON_HEADERS = {'Content-Type': 'application/json'}
+
 def generate_biomarker_data_batch(
     duration_seconds=60,
     sample_rate=50,
     output_file="biomarker_data.csv",
     add_noise=True,
-    add_trend=True
+    add_trend=True,
+    ring=None
 ):
     """
     Generate synthetic time series data for biomarkers at specified sample rate.
@@ -36,7 +42,12 @@ def generate_biomarker_data_batch(
         Whether to add random noise to the signal
     add_trend : bool
         Whether to add slow-varying trends to simulate real biological changes
+    ring : ShmRingWriter or None
+        Shared-memory ring (shm_ring.py) to also publish the samples to
     """
+    import numpy as np
+    import pandas as pd
+    
     # Calculate total number of data points
     total_samples = duration_seconds * sample_rate
     
@@ -145,6 +156,20 @@ def generate_biomarker_data_batch(
     heart_rate = np.clip(heart_rate, 60, 100)
     blood_oxygen = np.clip(blood_oxygen, 95, 100)
     
+    # Publish to shared memory for local consumers, in one bulk write
+    if ring is not None:
+        ring.extend({
+            'timestamp': start_time.timestamp() + np.arange(total_samples) / sample_rate,
+            'cortisol_ug_dL': cortisol,
+            'lactate_mmol_L': lactate,
+            'uric_acid_mg_dL': uric_acid,
+            'crp_mg_L': crp,
+            'il6_pg_mL': il6,
+            'body_temp_C': body_temp,
+            'heart_rate_BPM': heart_rate,
+            'blood_oxygen_pct': blood_oxygen
+        })
+    
     # Create DataFrame
     df = pd.DataFrame({
         'timestamp': timestamps,
@@ -161,23 +186,94 @@ def generate_biomarker_data_batch(
     # Format timestamp as string
     df['timestamp'] = df['timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S.%f')
     
-    # Save to CSV with append mode
+    print(f"Generated {total_samples} samples ({duration_seconds} seconds at {sample_rate}Hz)")
+    write_batch_csv(df, output_file)
+    
+    return df
+
+def write_batch_csv(df, output_file):
+    """Append a batch DataFrame to a CSV file, writing headers only when the file is new"""
     # Check if file exists to determine whether to write headers
     file_exists = os.path.isfile(output_file)
     
     if file_exists:
         # Append without headers
         df.to_csv(output_file, index=False, mode='a', header=False)
-        print(f"Generated {total_samples} samples ({duration_seconds} seconds at {sample_rate}Hz)")
         print(f"Data appended to {output_file}")
     else:
         # Create new file with headers
         df.to_csv(output_file, index=False)
-        print(f"Generated {total_samples} samples ({duration_seconds} seconds at {sample_rate}Hz)")
         print(f"New data file created at {output_file}")
+
+def generate_scenario_batch(
+    duration_seconds=60,
+    sample_rate=50,
+    output_file="biomarker_data.csv",
+    add_noise=True,
+    add_trend=True,
+    scenario="random",
+    subjects=1,
+    seed=None,
+    ring=None
+):
+    """
+    Generate correlated, event-driven biomarker data with the physiology model.
+    
+    Unlike generate_biomarker_data_batch, biomarkers move together: exercise raises
+    lactate and heart rate, inflammation raises CRP and IL-6 over hours, and so on.
+    See physiology_model.py for the model.
+    
+    Parameters:
+    -----------
+    duration_seconds : int
+        Duration of the time series in seconds
+    sample_rate : int
+        Number of samples per second (Hz)
+    output_file : str
+        Path to save the CSV output
+    add_noise : bool
+        Whether to add correlated AR(1) noise
+    add_trend : bool
+        Whether to add circadian rhythms
+    scenario : str or None
+        'random' for a random timeline of exercise, inflammation, stress, meal and sleep
+        events per subject, a path to a JSON timeline, or None for no events
+    subjects : int
+        Number of simulated subjects; above 1 a subject_id column is added
+    seed : int or None
+        Random seed for reproducible output
+    ring : ShmRingWriter or None
+        Shared-memory ring (shm_ring.py) to also publish the first subject's samples to
+    """
+    import numpy as np
+    import pandas as pd
+    from physiology_model import PhysiologyModel, BIOMARKERS, load_timeline
+    
+    events = load_timeline(scenario) if scenario and scenario != 'random' else scenario
+    start_time = datetime.datetime.now()
+    model = PhysiologyModel(sample_rate, seed=seed, add_noise=add_noise, add_rhythms=add_trend)
+    t, signals = model.generate(duration_seconds, start_time=start_time, events=events, subjects=subjects)
+    
+    if ring is not None:
+        ring.extend({'timestamp': start_time.timestamp() + t, **{name: signals[name][0] for name in BIOMARKERS}})
+    
+    # Subjects are written one after another, each with the full time range
+    timestamps = np.datetime64(start_time, 'us') + np.round(t * 1e6).astype('timedelta64[us]')
+    df = pd.DataFrame({'timestamp': np.tile(timestamps, subjects),
+                       **{name: signals[name].ravel() for name in BIOMARKERS}})
+    if subjects > 1:
+        df.insert(1, 'subject_id', np.repeat(np.arange(subjects), len(t)))
+    df['timestamp'] = df['timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S.%f')
+    
+    print(f"Generated {len(df)} samples ({subjects} subject(s), {duration_seconds} seconds at {sample_rate}Hz, "
+          f"scenario: {scenario or 'none'})")
+    write_batch_csv(df, output_file)
     
     return df
 
+def _clip(value, low, high):
+    return min(max(value, low), high)
+
 def generate_single_reading(
     base_time=None,
     add_noise=True,
@@ -222,50 +318,50 @@ def generate_single_reading(
     
     # Cortisol has diurnal rhythm (higher in morning, lower in evening)
     day_progress = hour_of_day / 24  # 0 to 1 throughout the day
-    cortisol = cortisol_base + 5 * np.sin(2 * np.pi * day_progress)
+    cortisol = cortisol_base + 5 * math.sin(2 * math.pi * day_progress)
     
     # Other biomarkers with slight time variations
     t = time_offset
-    lactate = lactate_base + 0.3 * np.sin(2 * np.pi * t / 60)
-    uric_acid = uric_acid_base + 0.5 * np.sin(2 * np.pi * t / 180)
-    crp = crp_base + 0.4 * np.sin(2 * np.pi * t / 240)
-    il6 = il6_base + 1.2 * np.sin(2 * np.pi * t / 120)
-    body_temp = body_temp_base + 0.2 * np.sin(2 * np.pi * day_progress)
-    heart_rate = heart_rate_base + 5 * np.sin(2 * np.pi * t / 30)
-    blood_oxygen = blood_oxygen_base + 0.5 * np.sin(2 * np.pi * t / 45)
+    lactate = lactate_base + 0.3 * math.sin(2 * math.pi * t / 60)
+    uric_acid = uric_acid_base + 0.5 * math.sin(2 * math.pi * t / 180)
+    crp = crp_base + 0.4 * math.sin(2 * math.pi * t / 240)
+    il6 = il6_base + 1.2 * math.sin(2 * math.pi * t / 120)
+    body_temp = body_temp_base + 0.2 * math.sin(2 * math.pi * day_progress)
+    heart_rate = heart_rate_base + 5 * math.sin(2 * math.pi * t / 30)
+    blood_oxygen = blood_oxygen_base + 0.5 * math.sin(2 * math.pi * t / 45)
     
     # Add small trend if requested
     if add_small_trend:
         # Very small trends that simulate short-term physiological changes
-        cortisol += 0.2 * np.sin(2 * np.pi * t / 300)
-        lactate += 0.05 * np.sin(2 * np.pi * t / 240)
-        uric_acid += 0.03 * np.sin(2 * np.pi * t / 450)
-        crp += 0.1 * np.sin(2 * np.pi * t / 600)
-        il6 += 0.2 * np.sin(2 * np.pi * t / 500)
-        body_temp += 0.01 * np.sin(2 * np.pi * t / 720)
-        heart_rate += 2 * np.sin(2 * np.pi * t / 180)
-        blood_oxygen += 0.2 * np.sin(2 * np.pi * t / 360)
+        cortisol += 0.2 * math.sin(2 * math.pi * t / 300)
+        lactate += 0.05 * math.sin(2 * math.pi * t / 240)
+        uric_acid += 0.03 * math.sin(2 * math.pi * t / 450)
+        crp += 0.1 * math.sin(2 * math.pi * t / 600)
+        il6 += 0.2 * math.sin(2 * math.pi * t / 500)
+        body_temp += 0.01 * math.sin(2 * math.pi * t / 720)
+        heart_rate += 2 * math.sin(2 * math.pi * t / 180)
+        blood_oxygen += 0.2 * math.sin(2 * math.pi * t / 360)
     
     # Add noise if requested
     if add_noise:
-        cortisol += np.random.normal(0, 0.3)
-        lactate += np.random.normal(0, 0.05)
-        uric_acid += np.random.normal(0, 0.1)
-        crp += np.random.normal(0, 0.1)
-        il6 += np.random.normal(0, 0.15)
-        body_temp += np.random.normal(0, 0.03)
-        heart_rate += np.random.normal(0, 0.8)
-        blood_oxygen += np.random.normal(0, 0.1)
+        cortisol += random.gauss(0, 0.3)
+        lactate += random.gauss(0, 0.05)
+        uric_acid += random.gauss(0, 0.1)
+        crp += random.gauss(0, 0.1)
+        il6 += random.gauss(0, 0.15)
+        body_temp += random.gauss(0, 0.03)
+        heart_rate += random.gauss(0, 0.8)
+        blood_oxygen += random.gauss(0, 0.1)
     
     # Ensure values stay within physiological ranges
-    cortisol = np.clip(cortisol, 5.0, 25.0)
-    lactate = np.clip(lactate, 0.5, 22.0)
-    uric_acid = np.clip(uric_acid, 3.5, 7.2)
-    crp = np.clip(crp, 0.1, 10.0)
-    il6 = np.clip(il6, 0.0, 10.0)
-    body_temp = np.clip(body_temp, 36.5, 37.5)
-    heart_rate = np.clip(heart_rate, 60, 100)
-    blood_oxygen = np.clip(blood_oxygen, 95, 100)
+    cortisol = _clip(cortisol, 5.0, 25.0)
+    lactate = _clip(lactate, 0.5, 22.0)
+    uric_acid = _clip(uric_acid, 3.5, 7.2)
+    crp = _clip(crp, 0.1, 10.0)
+    il6 = _clip(il6, 0.0, 10.0)
+    body_temp = _clip(body_temp, 36.5, 37.5)
+    heart_rate = _clip(heart_rate, 60, 100)
+    blood_oxygen = _clip(blood_oxygen, 95, 100)
     
     return {
         'timestamp': timestamp.strftime('%Y-%m-%d %H:%M:%S.%f'),
@@ -279,6 +375,15 @@ def generate_single_reading(
         'blood_oxygen_pct': blood_oxygen
     }
 
+def append_readings_csv(output_file, readings):
+    """Append reading dicts to a CSV file, writing the header if the file is new (same layout as pandas' to_csv)"""
+    file_exists = os.path.isfile(output_file)
+    with open(output_file, 'a', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(readings[0]), lineterminator='\n')
+        if not file_exists:
+            writer.writeheader()
+        writer.writerows(readings)
+
 def stream_biomarker_data(
     server_url='http://localhost:3000/readings',
     stream_interval=0.2,  # Stream to server every 0.2 seconds (5Hz) - increased from 0.5s
@@ -294,7 +399,13 @@ def stream_biomarker_data(
     csv_update_interval=100,  # Update CSV after 100 samples (every 2 seconds at 50Hz)
     batch_duration_seconds=60,
     batch_sample_rate=50,     # Batch generation at 50Hz
-    batch_output_file=None
+    batch_output_file=None,
+    profile_stages=False,     # Time each stage of the loop (near-zero cost when off)
+    profile_interval=10.0,    # Seconds between profile summary lines
+    profile_output='stream_profile.json',
+    program_profiler=None,    # 'cprofile' or 'sample' to also profile the whole loop
+    shm_ring=None,            # Shared-memory segment name to publish readings to
+    shm_capacity=65536        # Samples kept in the shared-memory ring
 ):
     """
     Stream biomarker data to server in real-time and optionally save to CSV.
@@ -331,6 +442,18 @@ def stream_biomarker_data(
         Sample rate in Hz for batch generation
     batch_output_file : str
         Path to save the batch CSV output
+    profile_stages : bool
+        Whether to time the generate, encode, send, csv_flush and sleep stages
+    profile_interval : float
+        Seconds between profile summary lines (0 to only write the JSON report)
+    profile_output : str
+        Path of the JSON profile report written when streaming stops
+    program_profiler : str or None
+        'cprofile' or 'sample' to also run a whole-program profiler, written next to profile_output
+    shm_ring : str or None
+        Name of a shared-memory ring (shm_ring.py) to publish every reading to, for local readers
+    shm_capacity : int
+        Number of most recent samples the ring keeps
     """
     if verbose:
         print(f"Starting biomarker data streaming to {server_url}")
@@ -354,6 +477,17 @@ def stream_biomarker_data(
                 print(f"Generating initial batch data to: {batch_output_file}")
                 print(f"Batch settings: {batch_duration_seconds} seconds at {batch_sample_rate}Hz")
         
+    # Stage timers; the disabled profiler's hooks are no-ops
+    profile_stages = profile_stages or program_profiler is not None
+    profiler = NULL_PROFILER
+    if profile_stages:
+        whole_program = None
+        if program_profiler:
+            extension = '.prof' if program_profiler == 'cprofile' else '.folded'
+            whole_program = ProgramProfiler(program_profiler, os.path.splitext(profile_output)[0] + extension)
+        profiler = StageProfiler(report_interval=profile_interval, program_profiler=whole_program)
+        print(f"Profiling stream stages; report will be written to {profile_output}")
+    
     start_time = datetime.datetime.now()
     reading_count = 0
     base_time = start_time
@@ -395,6 +529,19 @@ def stream_biomarker_data(
             add_trend=add_trend
         )
     
+    if not test_mode:
+        import requests
+    
+    # Shared-memory ring for co-located readers (needs NumPy, so only imported when used)
+    ring = None
+    if shm_ring:
+        from shm_ring import ShmRingWriter
+        ring = ShmRingWriter(shm_ring, capacity=shm_capacity)
+        base_epoch = base_time.timestamp()
+        if verbose:
+            print(f"Publishing readings to shared memory ring '{shm_ring}' ({shm_capacity} samples)")
+    
+    profiler.start()
     try:
         while True:
             current_time = datetime.datetime.now()
@@ -408,12 +555,17 @@ def stream_biomarker_data(
                     break
             
             # Generate a single reading
-            reading = generate_single_reading(
-                base_time=base_time,
-                add_noise=add_noise,
-                add_small_trend=add_trend,
-                time_offset=time_offset
-            )
+            with profiler.stage("generate"):
+                reading = generate_single_reading(
+                    base_time=base_time,
+                    add_noise=add_noise,
+                    add_small_trend=add_trend,
+                    time_offset=time_offset
+                )
+            
+            if ring is not None:
+                with profiler.stage("publish"):
+                    ring.append_reading(reading, base_epoch + time_offset)
             
             # Store reading for CSV export
             if save_csv:
@@ -422,7 +574,11 @@ def stream_biomarker_data(
             # Send data to server
             if not test_mode:
                 try:
-                    response = requests.post(server_url, json=reading)
+                    # Encode separately (as requests' json= would) so encoding and the round trip are timed apart
+                    with profiler.stage("encode"):
+                        body = json.dumps(reading, allow_nan=False).encode('utf-8')
+                    with profiler.stage("send"):
+                        response = requests.post(server_url, data=body, headers=JSON_HEADERS)
                     if response.status_code != 200 and response.status_code != 201:
                         if verbose:
                             print(f"Error sending data: {response.status_code} - {response.text}")
@@ -432,27 +588,19 @@ def stream_biomarker_data(
             
             # Print progress
             reading_count += 1
+            profiler.tick()
             if verbose and reading_count % 10 == 0:
                 print(f"Sent {reading_count} readings to server")
             
             # Periodically update CSV file - always update biomarker_data.csv
             if save_csv and reading_count % csv_update_interval == 0:
-                df = pd.DataFrame(all_readings)
-                
-                # Append to output_file
-                file_exists = os.path.isfile(output_file)
-                if file_exists:
-                    df.to_csv(output_file, mode='a', header=False, index=False)
-                else:
-                    df.to_csv(output_file, index=False)
-                
-                # Always save to biomarker_data.csv regardless of output_file
-                if output_file != 'biomarker_data.csv':
-                    file_exists = os.path.isfile('biomarker_data.csv')
-                    if file_exists:
-                        df.to_csv('biomarker_data.csv', mode='a', header=False, index=False)
-                    else:
-                        df.to_csv('biomarker_data.csv', index=False)
+                with profiler.stage("csv_flush"):
+                    # Append to output_file
+                    append_readings_csv(output_file, all_readings)
+                    
+                    # Always save to biomarker_data.csv regardless of output_file
+                    if output_file != 'biomarker_data.csv':
+                        append_readings_csv('biomarker_data.csv', all_readings)
                 
                 if verbose:
                     print(f"Appended {len(all_readings)} readings to CSV file(s)")
@@ -464,7 +612,8 @@ def stream_biomarker_data(
             time_offset += stream_interval
             sleep_time = stream_interval - ((datetime.datetime.now() - current_time).total_seconds())
             if sleep_time > 0:
-                time.sleep(sleep_time)
+                with profiler.stage("sleep"):
+                    time.sleep(sleep_time)
                 
     except KeyboardInterrupt:
         if verbose:
@@ -472,22 +621,12 @@ def stream_biomarker_data(
     finally:
         # Save final CSV
         if save_csv and all_readings:
-            df = pd.DataFrame(all_readings)
-            
             # Append to output_file
-            file_exists = os.path.isfile(output_file)
-            if file_exists:
-                df.to_csv(output_file, mode='a', header=False, index=False)
-            else:
-                df.to_csv(output_file, index=False)
+            append_readings_csv(output_file, all_readings)
                 
             # Always save to biomarker_data.csv regardless of output_file
             if output_file != 'biomarker_data.csv':
-                file_exists = os.path.isfile('biomarker_data.csv')
-                if file_exists:
-                    df.to_csv('biomarker_data.csv', mode='a', header=False, index=False)
-                else:
-                    df.to_csv('biomarker_data.csv', index=False)
+                append_readings_csv('biomarker_data.csv', all_readings)
                     
                 if verbose:
                     print(f"Appended final {len(all_readings)} readings to {output_file} and biomarker_data.csv")
@@ -495,8 +634,25 @@ def stream_biomarker_data(
                 if verbose:
                     print(f"Appended final {len(all_readings)} readings to {output_file}")
         
+        if ring is not None:
+            ring.close()
+        
         if verbose:
             print(f"Sent a total of {reading_count} readings over {(datetime.datetime.now() - start_time).total_seconds() / 60:.2f} minutes")
+        
+        # Dump the stage profile (and the whole-program profile, if any)
+        if profile_stages:
+            profiler.stop()
+            profiler.write_json(profile_output, extra={
+                "settings": {
+                    "stream_interval": stream_interval,
+                    "sample_rate": sample_rate,
+                    "test_mode": test_mode,
+                    "save_csv": save_csv,
+                    "csv_update_interval": csv_update_interval,
+                }
+            })
+            print(f"Stream profile saved to {profile_output}")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Generate synthetic biomarker time series data')
@@ -516,6 +672,18 @@ if __name__ == "__main__":
                           help='Disable random noise in the signal')
     batch_parser.add_argument('--no-trend', action='store_false', dest='trend',
                           help='Disable biological trends in the signal')
+    batch_parser.add_argument('--model', choices=['sinusoid', 'physiology'], default='sinusoid',
+                          help='Independent sinusoids (default) or the correlated physiology model with scenario events')
+    batch_parser.add_argument('--scenario', type=str, default='random',
+                          help="Physiology model events: 'random', 'none' or a JSON timeline file (default: random)")
+    batch_parser.add_argument('--subjects', type=int, default=1,
+                          help='Number of subjects to simulate with the physiology model (default: 1)')
+    batch_parser.add_argument('--seed', type=int, default=None,
+                          help='Random seed for the physiology model')
+    batch_parser.add_argument('--shm-ring', type=str, default=None,
+                          help='Also publish the batch to this shared-memory ring (left in place for readers)')
+    batch_parser.add_argument('--shm-capacity', type=int, default=65536,
+                          help='Samples kept in the shared-memory ring (default: 65536)')
     
     # Streaming command
     stream_parser = subparsers.add_parser('stream', help='Stream data to server in real-time')
@@ -554,6 +722,22 @@ if __name__ == "__main__":
     stream_parser.add_argument('--batch-rate', type=int, default=50,
                            help='Sample rate in Hz for batch generation (default: 50Hz)')
     
+    # Profiling
+    stream_parser.add_argument('--profile', action='store_true', dest='profile_stages',
+                           help='Time each stage of the stream loop and print periodic summaries')
+    stream_parser.add_argument('--profile-interval', type=float, default=10.0,
+                           help='Seconds between profile summary lines (default: 10, 0 to disable)')
+    stream_parser.add_argument('--profile-output', type=str, default='stream_profile.json',
+                           help='JSON file for the profile report written on exit (default: stream_profile.json)')
+    stream_parser.add_argument('--profiler', choices=['cprofile', 'sample'], default=None,
+                           help='Also run a whole-program profiler (implies --profile)')
+    
+    # Shared-memory publishing for local consumers
+    stream_parser.add_argument('--shm-ring', type=str, default=None,
+                           help='Publish every reading to this shared-memory ring (read it with shm_ring.ShmRingReader)')
+    stream_parser.add_argument('--shm-capacity', type=int, default=65536,
+                           help='Samples kept in the shared-memory ring (default: 65536)')
+    
     args = parser.parse_args()
     
     # If no command is provided, default to batch mode for backward compatibility
@@ -564,14 +748,39 @@ if __name__ == "__main__":
         if output_dir and not output_dir.exists():
             output_dir.mkdir(parents=True, exist_ok=True)
         
+        # Optionally publish the batch to shared memory as well
+        ring = None
+        if getattr(args, 'shm_ring', None):
+            from shm_ring import ShmRingWriter
+            ring = ShmRingWriter(args.shm_ring, capacity=args.shm_capacity)
+        
         # Generate data batch
-        generate_biomarker_data_batch(
-            duration_seconds=args.duration if hasattr(args, 'duration') else 60,
-            sample_rate=args.rate if hasattr(args, 'rate') else 50,
-            output_file=args.output if hasattr(args, 'output') else 'biomarker_data.csv',
-            add_noise=args.noise if hasattr(args, 'noise') else True,
-            add_trend=args.trend if hasattr(args, 'trend') else True
-        )
+        if getattr(args, 'model', 'sinusoid') == 'physiology':
+            generate_scenario_batch(
+                duration_seconds=args.duration,
+                sample_rate=args.rate,
+                output_file=args.output,
+                add_noise=args.noise,
+                add_trend=args.trend,
+                scenario=None if args.scenario == 'none' else args.scenario,
+                subjects=args.subjects,
+                seed=args.seed,
+                ring=ring
+            )
+        else:
+            generate_biomarker_data_batch(
+                duration_seconds=args.duration if hasattr(args, 'duration') else 60,
+                sample_rate=args.rate if hasattr(args, 'rate') else 50,
+                output_file=args.output if hasattr(args, 'output') else 'biomarker_data.csv',
+                add_noise=args.noise if hasattr(args, 'noise') else True,
+                add_trend=args.trend if hasattr(args, 'trend') else True,
+                ring=ring
+            )
+        
+        if ring is not None:
+            ring.close(unlink=False)
+            print(f"Published {ring.sequence} samples to shared memory ring '{args.shm_ring}' "
+                  f"(remove it with: python shm_ring.py {args.shm_ring} --unlink)")
     elif args.command == 'stream':
         # If batch-generate is requested but no output specified, set a default
         if args.batch_generate and not args.batch_output:
@@ -593,5 +802,11 @@ if __name__ == "__main__":
             csv_update_interval=args.csv_update_interval,
             batch_duration_seconds=args.batch_duration if args.batch_generate else None,
             batch_sample_rate=args.batch_rate,
-            batch_output_file=args.batch_output
+            batch_output_file=args.batch_output,
+            profile_stages=args.profile_stages,
+            profile_interval=args.profile_interval,
+            profile_output=args.profile_output,
+            program_profiler=args.profiler,
+            shm_ring=args.shm_ring,
+            shm_capacity=args.shm_capacity
         )
\ No newline at end of file
@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [BACKEND_DIR, os.path.join(BACKEND_DIR, "benchmarks")]
+
+
+@pytest.fixture
+def make_scraper(tmp_path):
+    """Build BiomarkerScrapers on one output directory, pointed at a fixture server and without politeness delays"""
+    from webScraper import BiomarkerScraper
+    from scraper_pipeline import RateLimiter
+
+    output_dir = str(tmp_path / "research")
+
+    def make(server):
+        scraper = BiomarkerScraper(output_dir=output_dir)
+        server.configure_scraper(scraper)
+        scraper.rate_limiters = {source: RateLimiter(0) for source in scraper.rate_limiters}
+        scraper.request_delay = (0, 0)
+        scraper.retry_backoff = 0
+        scraper.extract_workers = 0
+        scraper.flush_interval = 0
+        return scraper
+
+    return make
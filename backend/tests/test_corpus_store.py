@@ -0,0 +1,33 @@
+import pytest
+
+from corpus_store import CorpusReader, CorpusWriter
+
+
+@pytest.mark.parametrize("codec", [None, "gzip"])
+def test_reopening_after_a_crash_rolls_back_to_the_last_flush(tmp_path, codec):
+    directory = str(tmp_path / "corpus")
+    writer = CorpusWriter(directory, codec=codec, block_size=256)
+    for n in range(20):
+        writer.append(f"paper-{n}", {"title": f"Paper {n}", "abstract": "x" * 50})
+    writer.flush()
+
+    for n in range(20, 30):
+        writer.append(f"paper-{n}", {"title": f"Paper {n}", "abstract": "y" * 50})
+    # Crash: unflushed records reach the files, but corpus.json and the hash index are never updated
+    writer._write_pending()
+    writer._data.flush()
+    writer._order.flush()
+
+    reopened = CorpusWriter(directory, codec=codec)
+    assert len(reopened) == 20
+    assert "paper-19" in reopened
+    assert "paper-20" not in reopened
+    assert reopened.append("paper-20", {"title": "Paper 20 again"})
+    reopened.close()
+
+    with CorpusReader(directory) as reader:
+        assert len(reader) == 21
+        assert reader.get("paper-5")["title"] == "Paper 5"
+        assert reader.get("paper-20")["title"] == "Paper 20 again"
+        assert reader.get("paper-21") is None
+        assert [record["id"] for record in reader][-2:] == ["paper-19", "paper-20"]
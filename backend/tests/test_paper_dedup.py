@@ -0,0 +1,47 @@
+from paper_dedup import PaperDedupIndex
+
+ABSTRACT = ("Salivary cortisol and lactate were measured in forty endurance athletes before and after "
+            "a graded exercise test, and both rose in proportion to perceived exertion.")
+
+
+def paper(**fields):
+    return {"title": "Salivary cortisol and lactate during graded exercise", "abstract": ABSTRACT, **fields}
+
+
+def test_claimed_paper_catches_copies_until_released():
+    index = PaperDedupIndex()
+    index.claim("a", paper(doi="10.1000/xyz.1"))
+    assert index.find_duplicate(paper(doi="10.1000/XYZ.1", title="Other title")) == "a"
+    assert index.find_duplicate(paper(url="https://example.org/copy")) == "a"
+
+    index.add_alias("a", {"pmid": "31234567"})
+    index.release("a")
+    assert index.claims == {}
+    assert index.find_duplicate(paper(doi="10.1000/xyz.1")) is None
+    assert index.find_duplicate({"title": "Unrelated", "pmid": "31234567"}) is None
+    assert index.buckets == {}
+
+
+def test_release_keeps_identifiers_of_added_papers():
+    index = PaperDedupIndex()
+    index.add("a", paper(doi="10.1000/xyz.1"))
+    # A second copy shares the DOI but brings a new PMID; only the PMID belongs to its claim
+    index.claim("b", {"title": "Another study", "doi": "10.1000/xyz.1", "pmid": "31234567"})
+    index.release()
+    assert index.find_duplicate({"title": "Unrelated", "doi": "10.1000/xyz.1"}) == "a"
+    assert index.find_duplicate({"title": "Unrelated", "pmid": "31234567"}) is None
+    assert len(index) == 1
+
+
+def test_only_added_papers_are_saved(tmp_path):
+    index_file = str(tmp_path / "dedup_index.json")
+    index = PaperDedupIndex(index_file)
+    index.claim("a", paper(doi="10.1000/xyz.1"))
+    index.claim("b", {"title": "Lactate clearance in sepsis", "pmid": "31234567"})
+    index.add("a", paper(doi="10.1000/xyz.1"))
+    index.save()
+
+    loaded = PaperDedupIndex.load(index_file)
+    assert loaded.find_duplicate(paper(doi="10.1000/xyz.1")) == "a"
+    assert loaded.find_duplicate({"title": "Lactate clearance in sepsis", "pmid": "31234567"}) is None
+    assert len(loaded) == 1
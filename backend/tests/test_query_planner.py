@@ -0,0 +1,68 @@
+import pytest
+
+from fixture_server import FixtureCorpus, FixtureServer
+from query_planner import QueryPlanner
+
+QUERY = "inflammation"
+
+
+def pubmed_position(scraper):
+    entry = scraper.harvest_state.get("pubmed", QUERY)
+    return entry["cursor"], entry["last_harvest"]
+
+
+def unscored_pmids(scraper):
+    """PMIDs the duplicate index holds for papers that never got a decision"""
+    return [key for key, paper_id in scraper.dedup_index.identifiers.items()
+            if key.startswith("pmid:") and scraper.abstract_store.status(paper_id) is None]
+
+
+@pytest.mark.parametrize("endpoint", ["landing", "esummary"])
+def test_failed_pubmed_page_is_harvested_on_next_run(make_scraper, endpoint):
+    corpus = FixtureCorpus(40)
+
+    with FixtureServer(corpus, fail_endpoints={endpoint}) as server:
+        scraper = make_scraper(server)
+        report = QueryPlanner(scraper).run([QUERY], max_results_per_query=40)
+    assert report["accepted"] > 0  # the arXiv half still goes through
+    assert pubmed_position(scraper) == (0, None)
+    assert not [paper for paper in scraper.processed_papers.values() if paper["source"] == "pubmed"]
+    assert unscored_pmids(scraper) == []
+
+    with FixtureServer(corpus) as server:
+        scraper = make_scraper(server)
+        assert unscored_pmids(scraper) == []
+        report = QueryPlanner(scraper).run([QUERY], max_results_per_query=40)
+    pubmed_papers = [paper for paper in scraper.processed_papers.values() if paper["source"] == "pubmed"]
+    assert pubmed_papers
+    assert report["cursors_advanced"] == 2
+    assert pubmed_position(scraper)[1] is not None  # every PubMed record was read, so the window is complete
+    assert scraper.abstract_store.status(scraper.dedup_index.identifiers[f"pmid:{corpus.pmid(0)}"]) is not None
+
+
+def test_known_papers_are_not_fetched_again(make_scraper):
+    corpus = FixtureCorpus(40)
+    with FixtureServer(corpus) as server:
+        first = QueryPlanner(make_scraper(server)).run([QUERY], max_results_per_query=20)
+        landing_requests = server.requests.get("landing", 0)
+        # Rewind the cursors so the second run reads the same records
+        scraper = make_scraper(server)
+        scraper.harvest_state.entries.clear()
+        second = QueryPlanner(scraper).run([QUERY], max_results_per_query=20)
+    # Only PubMed records whose landing page has no abstract are tried again
+    missing = sum(1 for index in range(10) if not corpus.paper(index)["abstract"])
+    assert first["accepted"] > 0
+    assert second["accepted"] == 0
+    assert second["already_known"] == second["unique"] - missing
+    assert server.requests.get("landing", 0) == landing_requests + missing
+
+
+def test_papers_found_by_several_queries_are_processed_once(make_scraper):
+    with FixtureServer(FixtureCorpus(40)) as server:
+        scraper = make_scraper(server)
+        # The fixture ignores the query text, so both queries return the same records
+        report = QueryPlanner(scraper).run([QUERY, "cortisol"], max_results_per_query=20)
+    assert report["hits"] == 40
+    assert report["unique"] == 20
+    assert report["cross_query_duplicates"] == 20
+    assert scraper.metrics.report()["stages"]["dedup"]["calls"] == 20
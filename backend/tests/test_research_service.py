@@ -0,0 +1,17 @@
+import json
+from urllib.parse import quote
+
+from research_service import ResearchStore
+
+
+def test_paper_ids_are_percent_decoded(tmp_path):
+    paper_ids = ["arxiv:2401.01234v2", "pdf/reviews/cortisol review.pdf", "5d41402abc4b2a76b9719d911017c592"]
+    registry = {paper_id: {"title": f"Paper {n}", "source": "arxiv"} for n, paper_id in enumerate(paper_ids)}
+    (tmp_path / "paper_registry.json").write_text(json.dumps(registry))
+
+    store = ResearchStore(str(tmp_path))
+    for paper_id in paper_ids:
+        status, _, _, body = store.respond("/papers/" + quote(paper_id, safe=""), {})
+        assert status == 200
+        assert json.loads(body)["id"] == paper_id
+    assert store.respond("/papers/" + quote("arxiv:0000.00000"), {})[0] == 404
@@ -0,0 +1,92 @@
+from fixture_server import FixtureCorpus, FixtureServer
+
+QUERY = "inflammation"
+
+
+def harvest_position(scraper, source):
+    entry = scraper.harvest_state.get(source, QUERY)
+    return entry["cursor"], entry["last_harvest"]
+
+
+def test_run_keeps_cursors_until_papers_are_persisted(make_scraper):
+    corpus = FixtureCorpus(80)
+
+    with FixtureServer(corpus, fail_endpoints={"landing"}) as server:
+        scraper = make_scraper(server)
+        scraper.run(QUERY, max_results=20)
+    assert scraper.last_run_errors > 0
+    assert harvest_position(scraper, "pubmed") == (0, None)
+    assert harvest_position(scraper, "arxiv") == (0, None)
+
+    with FixtureServer(corpus) as server:
+        scraper = make_scraper(server)
+        accepted = scraper.run(QUERY, max_results=20)
+    assert scraper.last_run_errors == 0
+    assert any(paper["source"] == "pubmed" for paper in scraper.processed_papers.values())
+    assert accepted > 0
+    assert harvest_position(scraper, "pubmed") == (10, None)
+    assert harvest_position(scraper, "arxiv") == (10, None)
+
+
+def test_streamed_requests_count_the_bytes_read(tmp_path, monkeypatch):
+    import io
+
+    import requests
+
+    from webScraper import BiomarkerScraper
+
+    corpus = FixtureCorpus(10)
+    pmid = corpus.pmid(0)
+    # A chunked landing page with a long tail after the abstract
+    body = (corpus.landing_page(pmid) + "<p>tail</p>" * 20000).encode()
+
+    def get(url, **kwargs):
+        response = requests.models.Response()
+        response.status_code = 200
+        response.url = url
+        response.raw = io.BytesIO(body)
+        return response
+
+    monkeypatch.setattr(requests, "get", get)
+    scraper = BiomarkerScraper(output_dir=str(tmp_path / "research"))
+    scraper.landing_chunk_size = 1024
+
+    scraper.fetch_abstract({"title": "Fixture", "url": f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/", "source": "pubmed"})
+    page_bytes = scraper.metrics.requests["pubmed_page"]["bytes"]
+    assert 0 < page_bytes < len(body)
+    assert scraper.metrics.counters["landing_pages_truncated"] == 1
+
+    assert scraper.http_get("pubmed", "https://example.org/feed", stream=True).content == body
+    assert scraper.metrics.requests["pubmed"]["bytes"] == len(body)
+
+
+def test_transient_server_errors_are_retried(make_scraper, monkeypatch):
+    import io
+    from urllib.parse import urlparse
+
+    import requests
+
+    get = requests.get
+    failed_paths = set()
+
+    def flaky_get(url, **kwargs):
+        # The first request to every endpoint is answered with a 503
+        path = urlparse(url).path
+        if path not in failed_paths:
+            failed_paths.add(path)
+            response = requests.models.Response()
+            response.status_code = 503
+            response.url = url
+            response.raw = io.BytesIO(b"Service temporarily unavailable")
+            return response
+        return get(url, **kwargs)
+
+    monkeypatch.setattr(requests, "get", flaky_get)
+    with FixtureServer(FixtureCorpus(40)) as server:
+        scraper = make_scraper(server)
+        scraper.run(QUERY, max_results=20)
+    assert scraper.last_run_errors == 0
+    assert scraper.metrics.counters.get("harvest_failures", 0) == 0
+    assert scraper.metrics.counters["http_retries"] == len(failed_paths)
+    assert {paper["source"] for paper in scraper.processed_papers.values()} == {"pubmed", "arxiv"}
+    assert harvest_position(scraper, "pubmed") == (10, None)
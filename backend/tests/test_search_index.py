@@ -0,0 +1,61 @@
+import pytest
+
+from relevance import DEFAULT_RULES
+from search_index import biomarker_terms
+
+
+def test_biomarker_terms_follow_rules_and_aliases():
+    assert biomarker_terms(DEFAULT_RULES["biomarkers"]) == {"cortisol", "lactate", "uric", "crp", "il-6"}
+
+
+def test_multi_word_biomarkers_boost_only_distinctive_words():
+    assert biomarker_terms(["uric acid", "c-reactive protein", "tumor necrosis factor alpha"]) == {
+        "uric", "crp", "tumor", "necrosis"}
+    assert biomarker_terms(["protein"]) == {"protein"}
+
+
+def index_papers(index, start, stop):
+    for n in range(start, stop):
+        biomarker = ("cortisol", "lactate", "crp")[n % 3]
+        index.add(f"paper-{n}", title=f"{biomarker} response study {n}",
+                  abstract=f"We measured {biomarker} in {n} athletes during exercise and recovery.",
+                  biomarkers=biomarker)
+
+
+def test_merging_segments_keeps_search_results(tmp_path):
+    from search_index import SearchIndex
+
+    index = SearchIndex(str(tmp_path / "index"), max_segments=100)
+    for start in range(0, 60, 10):
+        index_papers(index, start, start + 10)
+        index.commit()
+    queries = ["cortisol exercise", "lactate recovery athletes", "crp 42"]
+    # k covers every match, so papers tied on score can't make the top-k differ
+    before = {query: dict(index.search(query, k=60)) for query in queries}
+    assert len(index.segments) == 6
+
+    index.merge()
+    assert len(index.segments) == 1
+    assert len(index) == 60 and "paper-59" in index
+    for query in queries:
+        assert before[query]
+        assert dict(index.search(query, k=60)) == pytest.approx(before[query])
+    index.close()
+
+    reopened = SearchIndex(str(tmp_path / "index"))
+    assert len(reopened.segments) == 1
+    assert reopened.search("crp 42", k=1)[0][0] == "paper-42"
+    reopened.close()
+
+
+def test_commit_merges_the_smallest_segments_past_max_segments(tmp_path):
+    from search_index import SearchIndex
+
+    index = SearchIndex(str(tmp_path / "index"), max_segments=4)
+    for start in range(0, 50, 10):
+        index_papers(index, start, start + 10)
+        index.commit()
+    assert len(index.segments) <= 4
+    assert sum(len(segment.docs) for segment in index.segments) == 50
+    assert len(index.search("lactate", k=50)) == 17
+    index.close()
@@ -0,0 +1,98 @@
+import os
+import itertools
+import threading
+
+import numpy as np
+import pytest
+
+from shm_ring import ShmRingReader, ShmRingWriter
+
+COLUMNS = ("timestamp", "value")
+_names = itertools.count()
+
+
+@pytest.fixture
+def ring():
+    """A small writer/reader pair on a segment unique to this test"""
+    writer = ShmRingWriter(f"test_ring_{os.getpid()}_{next(_names)}", capacity=8, columns=COLUMNS)
+    reader = ShmRingReader(writer.name)
+    yield writer, reader
+    reader.close()
+    writer.close()
+
+
+def append(writer, start, stop):
+    for n in range(start, stop):
+        writer.append([n, n * 10])
+
+
+def test_window_stays_valid_until_the_writer_laps_it(ring):
+    writer, reader = ring
+    append(writer, 0, 5)
+    window = reader.latest(4)
+    assert (window.start, window.end) == (1, 5)
+    assert window["value"].tolist() == [10, 20, 30, 40]
+
+    # Samples 5..8 reuse the slot of sample 0, which is outside the window
+    append(writer, 5, 9)
+    assert reader.is_valid(window)
+    assert window["value"].tolist() == [10, 20, 30, 40]
+
+    append(writer, 9, 10)
+    assert not reader.is_valid(window)
+
+
+def test_window_is_invalid_while_a_lapping_write_is_in_progress(ring):
+    writer, reader = ring
+    append(writer, 0, 8)
+    window = reader.latest()
+    # The writer announces the write before touching any slot; nothing is committed yet
+    writer._begin(1)
+    assert reader.sequence == 8
+    assert not reader.is_valid(window)
+    writer._commit(1)
+
+
+def test_readers_wait_for_a_write_in_progress(ring):
+    writer, reader = ring
+    append(writer, 0, 3)
+    writer._begin(2)
+    result = {}
+    thread = threading.Thread(target=lambda: result.update(sequence=reader.latest().end), daemon=True)
+    thread.start()
+    thread.join(0.2)
+    assert thread.is_alive()
+
+    writer._data[:, 3:5] = [[3, 4], [30, 40]]
+    writer._data[:, 11:13] = [[3, 4], [30, 40]]
+    writer._commit(2)
+    thread.join(5)
+    assert result == {"sequence": 5}
+
+
+def test_copy_latest_after_extend_wraps_around(ring):
+    writer, reader = ring
+    append(writer, 0, 6)
+    writer.extend({"timestamp": np.arange(6, 26), "value": np.arange(6, 26) * 10})
+    start, data = reader.copy_latest(5)
+    assert start == 21
+    assert data["timestamp"].tolist() == [21, 22, 23, 24, 25]
+    assert reader.since(23)["value"].tolist() == [230, 240, 250]
+
+
+def test_writer_restart_recovers_from_an_interrupted_write(ring):
+    writer, reader = ring
+    append(writer, 0, 3)
+    writer._begin(1)  # dies mid-write
+    name = writer.name
+    writer.close(unlink=False)
+
+    restarted = ShmRingWriter(name, capacity=8, columns=COLUMNS)
+    try:
+        assert restarted.sequence == 3
+        window = reader.latest()
+        assert reader.is_valid(window)
+        restarted.append([3, 30])
+        assert reader.latest(2)["value"].tolist() == [20, 30]
+    finally:
+        restarted.close()
@@ -1,41 +1,116 @@
 import os
-import re
 import time
 import random
-import requests
-import pandas as pd
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, quote
-from datetime import datetime
+from urllib.parse import urljoin
+from datetime import datetime, timedelta
 import xml.etree.ElementTree as ET  # Using built-in XML parser
 import json
 import hashlib
+import logging
+import argparse
+import threading
+from paper_dedup import PaperDedupIndex
+from harvest_state import HarvestState
+from scraper_pipeline import Stage, StagedPipeline, RateLimiter
+from query_planner import QueryPlanner
+from scraper_metrics import ScraperMetrics
+from pdf_ingest import PdfIngestor
+from corpus_store import CorpusWriter, CorpusReader, export_consolidated, parse_consolidated
+from abstract_extract import AbstractExtractionPool, extractor_for, read_region
+
+# requests, pandas and the numpy-backed modules (relevance, search_index,
+# similarity_index, findings) are imported where they are first used, so
+# --help, dry runs and library imports of this module don't pay for them
+
+logger = logging.getLogger("webScraper")
 
 class BiomarkerScraper:
-    def __init__(self, output_dir="research_papers"):
-        self.biomarkers = ["cortisol", "lactate", "uric acid", "crp", "il-6", "interleukin-6"]
+    def __init__(self, output_dir="research_papers", corpus_codec=None):
+        from relevance import RelevanceRules
+        
+        # Acceptance rules; <output_dir>/relevance_rules.json overrides any of the default lists
+        self.relevance_rules_file = os.path.join(output_dir, "relevance_rules.json")
+        self.rules = RelevanceRules.load(self.relevance_rules_file)
+        self.biomarkers = self.rules.biomarkers
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         }
+        self.pubmed_base_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/"
+        self.arxiv_base_url = "https://export.arxiv.org/api/query"
+        self.pubmed_article_url = "https://pubmed.ncbi.nlm.nih.gov/"  # landing pages, fetched for abstracts
+        self.arxiv_page_size = 1000  # entries per arXiv request (the API serves up to 2000); pages are parsed as they stream in
+        # How far back a query's first arXiv window reaches; later windows start at the previous harvest
+        self.arxiv_initial_days = 30
+        # Minimum spacing between API calls, shared by every thread talking to the source
+        self.rate_limiters = {
+            "pubmed": RateLimiter(0.34),  # NCBI allows 3 requests/second without an API key
+            "arxiv": RateLimiter(3.0),    # arXiv asks for 3 seconds between calls
+        }
         self.output_dir = output_dir
         self.create_output_dir()
-        self.results_df = pd.DataFrame(columns=["Title", "URL", "Abstract", "Biomarkers", "Has_Numerical_Data", "Date_Retrieved", "Source", "Paper_ID"])
-        self.debug_mode = True  # Set to True to enable debug output
+        self.results_columns = ["Title", "URL", "Abstract", "Biomarkers", "Has_Numerical_Data", "Date_Retrieved", "Source", "Paper_ID"]
+        self.results_df = None  # Last batch written to CSV (a DataFrame once results have been saved)
+        self.pending_results = []  # Rows accepted since the last CSV flush
+        self.results_saved = False
+        self.source_counts = {}
+        self.accepted_count = 0
+        self.request_timeout = 30  # seconds
+        self.http_retries = 3  # extra attempts after a 5xx response or connection error
+        self.retry_backoff = 1.0  # seconds before the first retry, doubling for each next one
+        self.metrics = ScraperMetrics()
+        
+        # Pipeline tuning: worker threads per stage, bounded queue size between stages
+        self.stage_workers = {"fetch": 4, "score": 1}
+        self.queue_size = 32
+        self.queue_monitor_interval = 10  # seconds between queue depth reports in debug mode
+        self.request_delay = (1, 2)  # random pause before each landing-page fetch
+        # Processes parsing landing pages for abstracts (0 parses on the fetch threads);
+        # a single-CPU machine gains nothing from shipping pages to another process
+        self.extract_workers = min(4, (os.cpu_count() or 1) - 1)
+        self.extraction_pool = None
+        self.landing_chunk_size = 16384  # bytes read at a time while looking for the abstract
+        self.save_interval = 5  # append results and flush the corpus and registry every N accepted papers
+        self.flush_interval = 60  # seconds between background index, findings and export flushes (0 waits for the end of the run)
+        self.flush_lock = threading.Lock()  # one index flush at a time
+        self.pipeline = None
+        self.last_run_errors = None  # producer and stage errors of the last pipeline run (None if it aborted)
+        self.state_lock = threading.RLock()  # guards registry and dedup index across stages
         
         # Load previously processed papers if exists
         self.paper_registry_file = os.path.join(output_dir, "paper_registry.json")
         self.consolidated_file = os.path.join(output_dir, "consolidated_papers.txt")
         self.processed_papers = self.load_paper_registry()
         
+        # The corpus, indexes, findings table and abstract store are opened on first use
+        # (see the properties below), so runs that never touch one don't pay for opening it
+        self.open_lock = threading.RLock()  # opens each store once across pipeline threads
+        self.corpus_dir = os.path.join(output_dir, "corpus")
+        self.corpus_codec = corpus_codec
+        self._corpus = None
+        # Search index documents are buffered and written as a segment once
+        # `index_commit_size` accumulate and at the end of every run
+        self.search_index_dir = os.path.join(output_dir, "search_index")
+        self.index_commit_size = 500
+        self._search_index = None
+        self._similarity_index = None
+        self._findings = None
+        self._abstract_store = None
+        
+        # Cross-source duplicate index persisted next to the registry
+        self.dedup_index_file = os.path.join(output_dir, "dedup_index.json")
+        self.dedup_index = self.load_dedup_index()
+        
+        # Pagination cursors and last-harvest dates per source and query
+        self.harvest_state = HarvestState.load(os.path.join(output_dir, "harvest_state.json"))
+    
     def debug_print(self, message):
-        """Print debug messages if debug mode is enabled"""
-        if self.debug_mode:
-            print(f"[DEBUG] {message}")
+        """Log a debug message (shown with --log-level DEBUG)"""
+        logger.debug(message)
     
     def create_output_dir(self):
         if not os.path.exists(self.output_dir):
             os.makedirs(self.output_dir)
-            print(f"Created output directory: {self.output_dir}")
+            logger.info(f"Created output directory: {self.output_dir}")
     
     def load_paper_registry(self):
         """Load the registry of processed papers from a JSON file"""
@@ -44,7 +119,7 @@ class BiomarkerScraper:
                 with open(self.paper_registry_file, 'r', encoding='utf-8') as f:
                     return json.load(f)
             except Exception as e:
-                print(f"Error loading paper registry: {e}")
+                logger.error(f"Error loading paper registry: {e}")
                 return {}
         else:
             return {}
@@ -52,11 +127,107 @@ class BiomarkerScraper:
     def save_paper_registry(self):
         """Save the registry of processed papers to a JSON file"""
         try:
-            with open(self.paper_registry_file, 'w', encoding='utf-8') as f:
+            # Written atomically so readers (research_service.py) never see a partial file
+            tmp_file = f"{self.paper_registry_file}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
                 json.dump(self.processed_papers, f, indent=2)
-            print(f"Paper registry saved to {self.paper_registry_file}")
+            os.replace(tmp_file, self.paper_registry_file)
+            logger.info(f"Paper registry saved to {self.paper_registry_file}")
         except Exception as e:
-            print(f"Error saving paper registry: {e}")
+            logger.error(f"Error saving paper registry: {e}")
+    
+    def load_dedup_index(self):
+        """Load the duplicate index, backfilling it from the registry on first use"""
+        index = PaperDedupIndex.load(self.dedup_index_file)
+        missing = [pid for pid in self.processed_papers if pid not in index.signatures]
+        for paper_id in missing:
+            index.add(paper_id, self.processed_papers[paper_id])
+        if missing:
+            self.debug_print(f"Backfilled dedup index with {len(missing)} registry papers")
+        return index
+    
+    def save_dedup_index(self):
+        """Save the duplicate index if it changed since the last save"""
+        if not self.dedup_index.dirty:
+            return
+        try:
+            self.dedup_index.save()
+            self.debug_print(f"Dedup index saved to {self.dedup_index_file}")
+        except Exception as e:
+            logger.error(f"Error saving dedup index: {e}")
+    
+    def http_get(self, source, url, **kwargs):
+        """
+        GET `url` on behalf of `source`, honouring its rate limit and recording request metrics.
+        
+        5xx responses and connection errors are retried up to `http_retries` times, waiting
+        `retry_backoff` seconds before the first retry and twice as long before each next one.
+        """
+        limiter = self.rate_limiters.get(source)
+        kwargs.setdefault("headers", self.headers)
+        kwargs.setdefault("timeout", self.request_timeout)
+        
+        import requests
+        
+        for attempt in range(self.http_retries + 1):
+            if attempt:
+                delay = self.retry_backoff * 2 ** (attempt - 1)
+                self.debug_print(f"Retrying {source} request in {delay:.1f}s ({attempt}/{self.http_retries})")
+                self.metrics.increment("http_retries")
+                time.sleep(delay)
+            if limiter:
+                limiter.wait()
+            started = time.perf_counter()
+            try:
+                response = requests.get(url, **kwargs)
+            except requests.ConnectionError:
+                self.metrics.record_request(source, time.perf_counter() - started, error=True)
+                if attempt < self.http_retries:
+                    continue
+                raise
+            except Exception:
+                self.metrics.record_request(source, time.perf_counter() - started, error=True)
+                raise
+            if response.status_code < 500 or attempt == self.http_retries:
+                break
+            self.metrics.record_request(source, time.perf_counter() - started, 0, response.status_code, error=True)
+            response.close()
+        
+        if kwargs.get("stream"):
+            # Count a streamed body as it is read: Content-Length is absent for chunked
+            # responses and overstates bodies that are closed early
+            nbytes = 0
+            response.iter_content = self.counted_chunks(source, response.iter_content)
+        else:
+            nbytes = len(response.content)
+        self.metrics.record_request(
+            source, time.perf_counter() - started, nbytes,
+            response.status_code, error=response.status_code >= 400
+        )
+        return response
+    
+    def counted_chunks(self, source, iter_content):
+        """Wrap a response's iter_content so every chunk read is added to `source`'s bytes"""
+        def counted(*args, **kwargs):
+            for chunk in iter_content(*args, **kwargs):
+                self.metrics.record_bytes(source, len(chunk))
+                yield chunk
+        return counted
+    
+    def write_run_report(self, report_file=None, prometheus_file=None, extra=None):
+        """Write the run's metrics as JSON (and optionally as a Prometheus text file)"""
+        report_file = report_file or os.path.join(self.output_dir, "run_report.json")
+        extra = dict(extra or {})
+        extra.setdefault("accepted", self.accepted_count)
+        extra.setdefault("registry_size", len(self.processed_papers))
+        try:
+            self.metrics.write_json(report_file, extra)
+            logger.info(f"Run report saved to {report_file}")
+            if prometheus_file:
+                self.metrics.write_prometheus(prometheus_file)
+                logger.info(f"Prometheus metrics saved to {prometheus_file}")
+        except Exception as e:
+            logger.error(f"Error writing run report: {e}")
     
     def generate_paper_id(self, paper):
         """Generate a unique ID for a paper based on its URL and title"""
@@ -67,244 +238,442 @@ class BiomarkerScraper:
         """Check if a paper has already been processed"""
         return paper_id in self.processed_papers
     
-    def search_pubmed(self, query="inflammation biomarkers", max_results=50):
-        """Search PubMed for relevant articles using E-utilities API instead of web scraping"""
-        # Use E-utilities API which is more reliable than web scraping
-        base_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/"
+    def find_duplicate(self, paper):
+        """
+        Return the ID of an already seen copy of this paper (same DOI/PMID/arXiv ID or a
+        near-identical title/abstract from another source), or None if it is new
+        """
+        with self.state_lock:
+            duplicate_id = self.dedup_index.find_duplicate(paper)
+            if duplicate_id is not None and duplicate_id != paper.get("id"):
+                # Remember this copy's identifiers so the next encounter is an exact hit
+                self.dedup_index.add_alias(duplicate_id, paper)
+        return duplicate_id
+    
+    def is_new_paper(self, paper):
+        """Check a search result against the registry and the duplicate index"""
+        if self.is_paper_processed(paper["id"]) or self.find_duplicate(paper):
+            self.debug_print(f"Skipping already processed {paper.get('source', '')} paper: {paper['title'][:50]}...")
+            return False
+        return True
+    
+    def parse_pubmed_summary(self, pmid, article_data):
+        """Build a paper dict from one ESummary record (None if it has no title)"""
+        title = article_data.get('title', '').strip()
+        if not title:
+            return None
         
-        # Step 1: Search for IDs
-        search_url = f"{base_url}esearch.fcgi?db=pubmed&term={quote(query)}&retmax={max_results}&usehistory=y&retmode=json"
+        paper = {
+            "title": title,
+            "url": f"{self.pubmed_article_url}{pmid}/",
+            "abstract": article_data.get('abstract', ''),  # Pre-fetch the abstract when available
+            "source": "pubmed",
+            "pmid": pmid
+        }
+        
+        # Keep the DOI so the same paper from another source is recognized
+        for article_id in article_data.get('articleids', []):
+            if article_id.get('idtype') == 'doi':
+                paper["doi"] = article_id.get('value')
         
-        print(f"Searching PubMed for: {query}")
-        self.debug_print(f"Using URL: {search_url}")
+        paper["id"] = self.generate_paper_id(paper)
+        return paper
+    
+    def pubmed_window_params(self, window_start, window_end):
+        """ESearch date parameters restricting results to a harvest window (empty on the first run)"""
+        if not window_start:
+            return {}
+        # Entrez date of the record, so papers indexed since the last harvest are picked up
+        params = {
+            "datetype": "edat",
+            "mindate": window_start[:10].replace('-', '/'),
+            "maxdate": window_end[:10].replace('-', '/'),
+        }
+        self.debug_print(f"Incremental PubMed harvest from {params['mindate']} to {params['maxdate']}")
+        return params
+    
+    def commit_harvest_position(self, source, query, cursor, total):
+        """Move a query's harvest cursor, closing the window once it has been read to the end"""
+        if total is not None and cursor >= total:
+            self.harvest_state.complete(source, query)
+        else:
+            self.harvest_state.advance(source, query, cursor, total)
+    
+    def search_pubmed_ids(self, query="inflammation biomarkers", max_results=50):
+        """
+        Return (ids, cursor, total): the next `max_results` PubMed IDs of the query's harvest
+        window, without fetching summaries, and the window position after them.
+        
+        Used by the query planner, which merges the ID sets of many queries before
+        fetching each unique paper once. The cursor isn't moved here; the planner commits
+        the position with `commit_harvest_position` once the papers have been persisted.
+        """
+        entry, window_start, window_end = self.harvest_state.open_window("pubmed", query)
+        cursor = entry["cursor"]
+        params = {
+            "db": "pubmed",
+            "term": query,
+            "retstart": cursor,
+            "retmax": max_results if max_results is not None else 10000,
+            "retmode": "json",
+        }
+        params.update(self.pubmed_window_params(window_start, window_end))
         
         try:
-            response = requests.get(search_url, headers=self.headers)
-            response.raise_for_status()  # Raise exception for HTTP errors
-            
-            if response.status_code != 200:
-                print(f"Failed to fetch PubMed search results: {response.status_code}")
-                return []
-            
-            search_data = response.json()
-            self.debug_print(f"PubMed search response: {search_data.keys()}")
-            
-            # Extract IDs
-            ids = search_data.get('esearchresult', {}).get('idlist', [])
-            if not ids:
-                print("No PubMed IDs found in search results")
-                return []
-                
-            self.debug_print(f"Found {len(ids)} PubMed IDs")
-            
-            # Step 2: Fetch summaries for these IDs
-            id_string = ",".join(ids)
-            summary_url = f"{base_url}esummary.fcgi?db=pubmed&id={id_string}&retmode=json"
-            
-            summary_response = requests.get(summary_url, headers=self.headers)
-            summary_response.raise_for_status()
-            
-            if summary_response.status_code != 200:
-                print(f"Failed to fetch PubMed summaries: {summary_response.status_code}")
-                return []
-                
-            summary_data = summary_response.json()
-            
-            # Parse results
-            results = []
-            for id in ids:
+            response = self.http_get("pubmed", f"{self.pubmed_base_url}esearch.fcgi", params=params)
+            response.raise_for_status()
+            search_result = response.json().get('esearchresult', {})
+        except Exception as e:
+            logger.error(f"Error in PubMed search for '{query}': {e}")
+            self.metrics.increment("harvest_failures")
+            return [], None, None
+        
+        ids = search_result.get('idlist', [])
+        total = int(search_result.get('count', 0))
+        return ids, cursor + len(ids), total
+    
+    def iter_pubmed_summaries(self, ids, batch_size=200, failed=None):
+        """
+        Yield papers for a list of PubMed IDs, fetching ESummary records in batches.
+        
+        The IDs of batches that couldn't be fetched are appended to the `failed` list if given.
+        """
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            params = {"db": "pubmed", "id": ",".join(batch), "retmode": "json"}
+            try:
+                response = self.http_get("pubmed", f"{self.pubmed_base_url}esummary.fcgi", params=params)
+                response.raise_for_status()
+                summary_data = response.json().get('result', {})
+            except Exception as e:
+                logger.error(f"Error fetching PubMed summaries: {e}")
+                self.metrics.increment("harvest_failures")
+                if failed is not None:
+                    failed.extend(batch)
+                continue
+            for pmid in batch:
                 try:
-                    article_data = summary_data.get('result', {}).get(id, {})
-                    
-                    if not article_data:
-                        continue
-                        
-                    title = article_data.get('title', '').strip()
-                    
-                    if not title:
-                        continue
-                        
-                    # Create PubMed URL
-                    url = f"https://pubmed.ncbi.nlm.nih.gov/{id}/"
-                    
-                    abstract = article_data.get('abstract', '')
-                    
-                    paper = {
-                        "title": title,
-                        "url": url,
-                        "abstract": abstract,  # Pre-fetch the abstract when available
-                        "source": "pubmed"
-                    }
-                    
-                    # Generate a unique ID for this paper
-                    paper["id"] = self.generate_paper_id(paper)
-                    
-                    # Check if we've already processed this paper
-                    if self.is_paper_processed(paper["id"]):
-                        self.debug_print(f"Skipping already processed PubMed paper: {title[:50]}...")
-                        continue
-                    
-                    results.append(paper)
+                    paper = self.parse_pubmed_summary(pmid, summary_data.get(pmid, {}))
                 except Exception as e:
-                    print(f"Error processing PubMed article {id}: {e}")
-            
-            print(f"Found {len(results)} new articles from PubMed")
-            return results
-            
-        except Exception as e:
-            print(f"Error in PubMed search: {e}")
-            return []
+                    logger.error(f"Error processing PubMed article {pmid}: {e}")
+                    continue
+                if paper is not None:
+                    yield paper
     
-    def search_arxiv(self, query="inflammation biomarkers", max_results=50):
-        """Search arXiv using their API and parse the XML response properly"""
-        base_url = "https://export.arxiv.org/api/query"
-        search_query = f"search_query=all:{quote(query)}&start=0&max_results={max_results}"
+    def iter_pubmed(self, query="inflammation biomarkers", max_results=50, page_size=100, position=None):
+        """
+        Yield PubMed papers from the E-utilities history server, paging through the full result set.
+        
+        Results are restricted to the current harvest window (entries added since the last
+        completed harvest of this query). At most `max_results` records are read per call
+        (None reads the whole window); the cursor is saved after every page so the next
+        call continues from there.
+        
+        If a `position` dict is given, the window position ("cursor" and "total") is kept
+        there after every page instead of being saved, for the caller to commit later.
+        """
+        base_url = self.pubmed_base_url
+        entry, window_start, window_end = self.harvest_state.open_window("pubmed", query)
+        cursor = entry["cursor"]
         
-        print(f"Searching arXiv for: {query}")
-        self.debug_print(f"Using URL: {base_url}?{search_query}")
+        logger.info(f"Searching PubMed for: {query}")
+        
+        # Step 1: Run the search on the history server; only the WebEnv/query_key and count are needed
+        params = {
+            "db": "pubmed",
+            "term": query,
+            "retmax": 0,
+            "usehistory": "y",
+            "retmode": "json",
+        }
+        params.update(self.pubmed_window_params(window_start, window_end))
         
         try:
-            response = requests.get(f"{base_url}?{search_query}")
-            response.raise_for_status()
+            response = self.http_get("pubmed", f"{base_url}esearch.fcgi", params=params)
+            response.raise_for_status()  # Raise exception for HTTP errors
             
-            if response.status_code != 200:
-                print(f"Failed to fetch arXiv results: {response.status_code}")
-                return []
+            search_result = response.json().get('esearchresult', {})
+            total = int(search_result.get('count', 0))
+            webenv = search_result.get('webenv')
+            query_key = search_result.get('querykey')
             
-            # Use ElementTree to parse XML properly instead of BeautifulSoup
-            root = ET.fromstring(response.content)
+            if total == 0 or not webenv:
+                logger.info("No PubMed IDs found in search results")
+                if position is not None:
+                    position.update(cursor=0, total=0)
+                else:
+                    self.harvest_state.complete("pubmed", query)
+                return
             
-            # Define namespace
-            namespace = {'atom': 'http://www.w3.org/2005/Atom'}
+            if cursor >= total:
+                # The window shrank since the last run (e.g. records merged); start it over
+                cursor = 0
+            self.debug_print(f"PubMed reports {total} results, resuming at offset {cursor}")
+        except Exception as e:
+            logger.error(f"Error in PubMed search: {e}")
+            self.metrics.increment("harvest_failures")
+            return
+        
+        # Step 2: Page through summaries using the stored result set
+        read = 0
+        while cursor < total and (max_results is None or read < max_results):
+            retmax = page_size if max_results is None else min(page_size, max_results - read)
+            summary_params = {
+                "db": "pubmed",
+                "query_key": query_key,
+                "WebEnv": webenv,
+                "retstart": cursor,
+                "retmax": retmax,
+                "retmode": "json",
+            }
+            try:
+                summary_response = self.http_get("pubmed", f"{base_url}esummary.fcgi", params=summary_params)
+                summary_response.raise_for_status()
+                summary_data = summary_response.json().get('result', {})
+            except Exception as e:
+                logger.error(f"Error fetching PubMed summaries at offset {cursor}: {e}")
+                self.metrics.increment("harvest_failures")
+                break
             
-            # Find all entry elements
-            entries = root.findall('.//atom:entry', namespace)
+            ids = summary_data.get('uids', [])
+            if not ids:
+                break
             
-            results = []
-            for entry in entries:
+            for pmid in ids:
                 try:
-                    title_elem = entry.find('./atom:title', namespace)
-                    id_elem = entry.find('./atom:id', namespace)
-                    summary_elem = entry.find('./atom:summary', namespace)
-                    
-                    if title_elem is not None and id_elem is not None:
-                        title = title_elem.text.strip()
-                        arxiv_url = id_elem.text.strip()
-                        
-                        # Extract abstract if available
-                        abstract = ""
-                        if summary_elem is not None:
-                            abstract = summary_elem.text.strip()
-                        
-                        paper = {
-                            "title": title,
-                            "url": arxiv_url,
-                            "abstract": abstract,  # Pre-fetch the abstract when available
-                            "source": "arxiv"
-                        }
-                        
-                        # Generate a unique ID for this paper
-                        paper["id"] = self.generate_paper_id(paper)
-                        
-                        # Check if we've already processed this paper
-                        if self.is_paper_processed(paper["id"]):
-                            self.debug_print(f"Skipping already processed arXiv paper: {title[:50]}...")
-                            continue
-                        
-                        results.append(paper)
+                    paper = self.parse_pubmed_summary(pmid, summary_data.get(pmid, {}))
                 except Exception as e:
-                    print(f"Error parsing arXiv entry: {e}")
+                    logger.error(f"Error processing PubMed article {pmid}: {e}")
                     continue
+                if paper is not None:
+                    yield paper
+            
+            # The cursor only moves once the whole page has been handed downstream
+            cursor += len(ids)
+            read += len(ids)
+            if position is not None:
+                position.update(cursor=cursor, total=total)
+            else:
+                self.harvest_state.advance("pubmed", query, cursor, total)
+        
+        if position is None and cursor >= total:
+            self.harvest_state.complete("pubmed", query)
+        
+        self.debug_print(f"Read {cursor}/{total} PubMed records of the current window")
+    
+    def search_pubmed(self, query="inflammation biomarkers", max_results=50, page_size=100):
+        """Search PubMed and return the papers that have not been seen before"""
+        results = [paper for paper in self.iter_pubmed(query, max_results, page_size) if self.is_new_paper(paper)]
+        logger.info(f"Found {len(results)} new articles from PubMed")
+        return results
+    
+    def parse_arxiv_entry(self, entry, namespace):
+        """Build a paper dict from one Atom <entry> (None if it lacks a title or ID)"""
+        title_elem = entry.find('./atom:title', namespace)
+        id_elem = entry.find('./atom:id', namespace)
+        summary_elem = entry.find('./atom:summary', namespace)
+        doi_elem = entry.find('./arxiv:doi', namespace)
+        
+        if title_elem is None or id_elem is None:
+            return None
+        
+        paper = {
+            "title": title_elem.text.strip(),
+            "url": id_elem.text.strip(),
+            # Pre-fetch the abstract when available
+            "abstract": summary_elem.text.strip() if summary_elem is not None and summary_elem.text else "",
+            "source": "arxiv"
+        }
+        if doi_elem is not None and doi_elem.text:
+            paper["doi"] = doi_elem.text.strip()
+        
+        paper["id"] = self.generate_paper_id(paper)
+        return paper
+    
+    def iter_atom_entries(self, chunks, namespace, feed_info):
+        """
+        Parse an Atom feed incrementally from byte chunks, yielding each <entry> as soon as it is complete.
+        
+        Consumed entries are cleared and detached from the feed element, so memory stays
+        bounded by one entry plus the parser's buffer however large the page is. The feed's
+        totalResults is stored in `feed_info["total"]` when it is seen.
+        """
+        parser = ET.XMLPullParser(events=("start", "end"))
+        entry_tag = f"{{{namespace['atom']}}}entry"
+        total_tag = f"{{{namespace['opensearch']}}}totalResults"
+        feed = None
+        for chunk in chunks:
+            parser.feed(chunk)
+            for event, elem in parser.read_events():
+                if event == "start":
+                    if feed is None:
+                        feed = elem
+                elif elem.tag == entry_tag:
+                    yield elem
+                    elem.clear()
+                    feed.remove(elem)
+                elif elem.tag == total_tag and elem.text:
+                    feed_info["total"] = int(elem.text)
+        parser.close()
+    
+    def iter_arxiv(self, query="inflammation biomarkers", max_results=50, page_size=None, position=None):
+        """
+        Yield arXiv papers from their API, paging through the full result set of the current harvest window.
+        
+        The window is expressed as a submittedDate range and sorted by submission date, so
+        offsets stay stable between runs and later runs only see newly submitted papers.
+        Each page is streamed and parsed as it downloads, so papers reach the pipeline
+        before the page is complete.
+        
+        If a `position` dict is given, the window position ("cursor" and "total") is kept
+        there after every page instead of being saved, for the caller to commit later.
+        """
+        base_url = self.arxiv_base_url
+        page_size = page_size or self.arxiv_page_size
+        entry, window_start, window_end = self.harvest_state.open_window("arxiv", query)
+        cursor = entry["cursor"]
+        total = entry["total"]
+        
+        # A query's first window covers only recent submissions, so daily runs reach new
+        # papers at once instead of paging forward through the archive from 1991
+        if not window_start:
+            initial_start = datetime.strptime(window_end, '%Y-%m-%d %H:%M') - timedelta(days=self.arxiv_initial_days)
+            window_start = initial_start.strftime('%Y-%m-%d %H:%M')
+        # arXiv date ranges use YYYYMMDDHHMM
+        range_start = window_start.replace('-', '').replace(' ', '').replace(':', '')
+        range_end = window_end.replace('-', '').replace(' ', '').replace(':', '')
+        search_query = f"all:{query} AND submittedDate:[{range_start} TO {range_end}]"
+        
+        logger.info(f"Searching arXiv for: {query}")
+        self.debug_print(f"Incremental arXiv harvest from {window_start} to {window_end}")
+        
+        # Define namespaces
+        namespace = {
+            'atom': 'http://www.w3.org/2005/Atom',
+            'arxiv': 'http://arxiv.org/schemas/atom',
+            'opensearch': 'http://a9.com/-/spec/opensearch/1.1/'
+        }
+        
+        read = 0
+        while (total is None or cursor < total) and (max_results is None or read < max_results):
+            page = page_size if max_results is None else min(page_size, max_results - read)
+            params = {
+                "search_query": search_query,
+                "start": cursor,
+                "max_results": page,
+                "sortBy": "submittedDate",
+                "sortOrder": "ascending",
+            }
+            self.debug_print(f"Requesting arXiv results {cursor}-{cursor + page}")
             
-            print(f"Found {len(results)} new papers on arXiv")
-            return results
+            try:
+                response = self.http_get("arxiv", base_url, params=params, stream=True)
+                response.raise_for_status()
+            except Exception as e:
+                logger.error(f"Error in arXiv search: {e}")
+                self.metrics.increment("harvest_failures")
+                break
             
-        except Exception as e:
-            print(f"Error in arXiv search: {e}")
-            return []
+            feed_info = {}
+            entries = 0
+            failed = False
+            try:
+                with response:
+                    for atom_entry in self.iter_atom_entries(response.iter_content(chunk_size=64 * 1024), namespace, feed_info):
+                        entries += 1
+                        try:
+                            paper = self.parse_arxiv_entry(atom_entry, namespace)
+                        except Exception as e:
+                            logger.error(f"Error parsing arXiv entry: {e}")
+                            continue
+                        if paper is not None:
+                            yield paper
+            except Exception as e:
+                # Entries already yielded count as read; the next run resumes after them
+                logger.error(f"Error reading arXiv response: {e}")
+                self.metrics.increment("harvest_failures")
+                failed = True
+            total = feed_info.get("total", total)
+            
+            cursor += entries
+            read += entries
+            if position is not None:
+                position.update(cursor=cursor, total=total)
+            else:
+                self.harvest_state.advance("arxiv", query, cursor, total)
+            if failed or not entries:
+                break
+        
+        if position is None and total is not None and cursor >= total:
+            self.harvest_state.complete("arxiv", query)
+        
+        self.debug_print(f"Read {cursor}/{total if total is not None else '?'} arXiv records of the current window")
     
+    def search_arxiv(self, query="inflammation biomarkers", max_results=50, page_size=None):
+        """Search arXiv and return the papers that have not been seen before"""
+        results = [paper for paper in self.iter_arxiv(query, max_results, page_size) if self.is_new_paper(paper)]
+        logger.info(f"Found {len(results)} new papers on arXiv")
+        return results
+
     def fetch_paper_details(self, paper):
-        """Fetch additional details for papers if abstract isn't already fetched"""
+        """Fetch additional details for papers if abstract isn't already fetched (None if the page can't be read)"""
+        try:
+            return self.fetch_abstract(paper)
+        except Exception as e:
+            logger.error(f"Error fetching paper details: {e}")
+            return None
+    
+    def fetch_abstract(self, paper):
+        """The abstract from a paper's landing page, or None if it has none; raises if the page can't be fetched"""
         # If we already have the abstract, return it
         if paper.get('abstract'):
             self.debug_print(f"Using pre-fetched abstract for: {paper['title'][:50]}...")
             return paper['abstract']
-            
-        print(f"Fetching details for: {paper['title'][:50]}...")
         
+        logger.info(f"Fetching details for: {paper['title'][:50]}...")
+        
+        # Stream the page so reading stops shortly after the abstract's element
+        response = self.http_get(f"{paper.get('source', 'unknown')}_page", paper['url'], timeout=10, stream=True)
         try:
-            response = requests.get(paper['url'], headers=self.headers, timeout=10)
-            if response.status_code != 200:
-                print(f"Failed to fetch paper details: {response.status_code}")
-                return None
-                
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Different websites have different structures
-            abstract = None
-            
-            # Try PubMed structure
-            if "pubmed" in paper['url']:
-                abstract_elem = soup.select_one("#abstract")
-                if abstract_elem:
-                    abstract = abstract_elem.text.strip()
-                    
-                # Alternative PubMed selectors
-                if not abstract:
-                    abstract_selectors = [
-                        ".abstract-content",
-                        ".abstract-text",
-                        "[data-ga-label='abstract']"
-                    ]
-                    for selector in abstract_selectors:
-                        elem = soup.select_one(selector)
-                        if elem:
-                            abstract = elem.text.strip()
-                            break
-            
-            # Try arXiv structure
-            elif "arxiv" in paper['url']:
-                abstract_elem = soup.select_one(".abstract, .abstract-full")
-                if abstract_elem:
-                    abstract = abstract_elem.text.strip()
-                    # Remove "Abstract: " prefix if present
-                    abstract = re.sub(r'^Abstract:\s*', '', abstract, flags=re.IGNORECASE)
-            
-            # Generic fallback
-            if not abstract:
-                abstract_elems = soup.select(".abstract, #abstract, [name='abstract'], .paper-abstract")
-                if abstract_elems:
-                    abstract = abstract_elems[0].text.strip()
-            
-            return abstract
-            
-        except Exception as e:
-            print(f"Error fetching paper details: {e}")
+            response.raise_for_status()
+            extractor = extractor_for(paper['url'])
+            html, stopped_early = read_region(response.iter_content(self.landing_chunk_size), extractor)
+        finally:
+            response.close()
+        if stopped_early:
+            self.metrics.increment("landing_pages_truncated")
+        
+        with self.metrics.stage_timer("abstract_extract"):
+            pool = self.get_extraction_pool()
+            if pool:
+                return pool.extract(extractor, html, response.encoding)
+            return extractor.extract(html, response.encoding)
+    
+    def get_extraction_pool(self):
+        """The landing-page extraction pool, started on first use (None when extraction runs in-thread)"""
+        if self.extract_workers <= 0:
             return None
+        with self.state_lock:
+            if self.extraction_pool is None:
+                self.extraction_pool = AbstractExtractionPool(self.extract_workers)
+            return self.extraction_pool
+    
+    def close_extraction_pool(self):
+        with self.state_lock:
+            if self.extraction_pool is not None:
+                self.extraction_pool.close()
+                self.extraction_pool = None
     
     def check_relevance(self, text):
         """Check if paper is relevant based on biomarkers and inflammation context"""
         if not text:
             self.debug_print("No text provided for relevance check")
             return False, []
-            
-        text_lower = text.lower()
-        
-        # Check for inflammation context - more flexible
-        inflammation_terms = ["inflammation", "inflammatory", "inflamed", "immune response", "cytokine"]
-        has_inflammation = any(term in text_lower for term in inflammation_terms)
-        
-        # Check for biomarkers
-        found_biomarkers = []
-        for biomarker in self.biomarkers:
-            if biomarker in text_lower:
-                found_biomarkers.append(biomarker)
-        
-        # More flexible relevance check - either has inflammation terms or biomarkers
-        is_relevant = has_inflammation or len(found_biomarkers) > 0
         
+        # Either inflammation terms or biomarkers make a paper relevant
+        is_relevant, found_biomarkers = self.rules.check_relevance(text)
         if not is_relevant:
-            self.debug_print(f"Paper not relevant: inflammation={has_inflammation}, biomarkers={found_biomarkers}")
+            self.debug_print(f"Paper not relevant: biomarkers={found_biomarkers}")
         
         return is_relevant, found_biomarkers
     
@@ -312,86 +681,297 @@ class BiomarkerScraper:
         """Check if the abstract contains numerical data related to measurements"""
         if not text:
             return False
-            
-        # More comprehensive patterns for numerical data
-        numerical_patterns = [
-            r'\d+\s*(?:pg/ml|ng/ml|mg/l|μmol/l|mmol/l|μg/dl|mg/dl|pmol/l)',  # Units
-            r'p\s*[<>=]\s*0\.\d+',  # p-values
-            r'[+-]?\s*\d+(?:\.\d+)?%',  # Percentage values
-            r'mean\s*[±:]\s*\d+(?:\.\d+)?',  # Mean values
-            r'\d+(?:\.\d+)?\s*±\s*\d+(?:\.\d+)?',  # Values with standard deviations
-            r'correlation\s*(?:coefficient)?\s*[=:]\s*[+-]?\d+\.\d+',  # Correlation values
-            r'(?:concentration|level)s?\s*(?:of|were|was)\s*\d+(?:\.\d+)?',  # Concentration statements
-            r'\d+\s*(?:patients|subjects|participants)',  # Sample sizes
-            r'(?:significantly|considerably)\s*(?:higher|lower|increased|decreased)',  # Statistical significance terms
-            r'fold[- ]?change',  # Fold change
-            r'hazard ratio',  # Statistical measures
-            r'confidence interval',  # Statistical measures
-            r'odds ratio'  # Statistical measures
-        ]
+        return self.rules.has_numerical_data(text)
+    
+    def open_once(self, name, opener):
+        """Return the store kept in attribute `name`, opening it with `opener()` on first use"""
+        store = getattr(self, name)
+        if store is None:
+            with self.open_lock:
+                store = getattr(self, name)
+                if store is None:
+                    store = opener()
+                    setattr(self, name, store)
+        return store
+    
+    @property
+    def corpus(self):
+        """Indexed corpus of accepted papers; consolidated_papers.txt is exported from it"""
+        return self.open_once("_corpus", lambda: self.open_corpus(self.corpus_codec))
+    
+    @property
+    def search_index(self):
+        """BM25 keyword index over accepted papers"""
+        return self.open_once("_search_index", self.open_search_index)
+    
+    @property
+    def similarity_index(self):
+        """TF-IDF vectors for related-paper lookups"""
+        return self.open_once("_similarity_index", self.open_similarity_index)
+    
+    @property
+    def findings(self):
+        """Typed numeric findings (values, units, statistics) extracted from corpus abstracts"""
+        from findings import FindingsTable
         
-        for pattern in numerical_patterns:
-            if re.search(pattern, text.lower()):
-                return True
-                
-        # Check for tables and figures
-        table_indicators = ['table', 'fig.', 'figure', 'chart', 'graph', 'plot', 'diagram', 'data shown']
-        for indicator in table_indicators:
-            if indicator in text.lower():
-                return True
-                
-        return False
-    
-    def add_paper_to_consolidated_file(self, paper_data):
-        """Add paper information to a consolidated text file instead of individual files"""
+        return self.open_once("_findings", lambda: FindingsTable(os.path.join(self.output_dir, "findings")))
+    
+    @property
+    def abstract_store(self):
+        """Every scored abstract, accepted or not, with cached rule features for `rescore()`"""
+        return self.open_once("_abstract_store", self.open_abstract_store)
+    
+    def open_corpus(self, codec=None):
+        """Open the indexed corpus, seeding it from a legacy consolidated text file on first use"""
+        corpus = CorpusWriter(self.corpus_dir, codec=codec)
+        if len(corpus) == 0 and os.path.exists(self.consolidated_file):
+            ids_by_url = {entry.get('url'): paper_id for paper_id, entry in self.processed_papers.items()}
+            try:
+                for record in parse_consolidated(self.consolidated_file):
+                    corpus.append(ids_by_url.get(record.get('url')) or self.generate_paper_id(record), record)
+            except Exception as e:
+                logger.error(f"Error importing {self.consolidated_file} into the corpus: {e}")
+            # The text file already holds these papers
+            corpus.set_extra("consolidated_exported", len(corpus))
+            corpus.flush()
+            logger.info(f"Imported {len(corpus)} papers from {self.consolidated_file} into {self.corpus_dir}")
+        return corpus
+    
+    def add_paper_to_corpus(self, paper_id, paper_data):
+        """Append an accepted paper to the indexed corpus (no-op if it is already stored)"""
         try:
-            with open(self.consolidated_file, 'a', encoding='utf-8') as f:
-                f.write("\n" + "="*80 + "\n")
-                f.write(f"Paper Title: {paper_data['title']}\n")
-                f.write(f"URL: {paper_data['url']}\n")
-                f.write(f"Source: {paper_data['source']}\n")
-                f.write(f"Biomarkers: {paper_data['biomarkers']}\n")
-                f.write(f"Has Numerical Data: {paper_data['has_numerical']}\n")
-                f.write(f"Date Retrieved: {paper_data['date_retrieved']}\n")
-                f.write("-"*40 + " ABSTRACT " + "-"*40 + "\n")
-                f.write(f"{paper_data['abstract']}\n")
-                
-            return True
+            return self.corpus.append(paper_id, paper_data)
         except Exception as e:
-            print(f"Error adding paper to consolidated file: {e}")
+            logger.error(f"Error adding paper to corpus: {e}")
             return False
     
-    def process_paper(self, paper):
-        """Process a single paper and add to registry if relevant"""
+    def open_abstract_store(self):
+        """Open the store of scored abstracts, seeding it with the corpus papers on first use"""
+        from relevance import AbstractStore
+        
+        store = AbstractStore(os.path.join(self.output_dir, "abstracts"), rules=self.rules)
+        if len(store) == 0 and len(self.corpus) > 0:
+            # Papers rejected before the store existed are gone; the accepted ones are in the corpus
+            self.corpus.flush()
+            with CorpusReader(self.corpus_dir) as reader:
+                for record in reader:
+                    paper_id = record.pop('id')
+                    store.add(paper_id, record, record.get('abstract'), "accepted")
+            store.flush()
+            logger.info(f"Stored {len(store)} corpus abstracts for rescoring")
+        return store
+    
+    def open_search_index(self):
+        """Open the keyword index, building it from the corpus when it is missing"""
+        from search_index import SearchIndex
+        
+        index = SearchIndex(self.search_index_dir, biomarkers=self.rules.biomarkers)
+        if len(index) == 0 and len(self.corpus) > 0:
+            self.corpus.flush()
+            with CorpusReader(self.corpus_dir) as reader:
+                for record in reader:
+                    index.add_paper(record['id'], record)
+            index.commit()
+            logger.info(f"Indexed {len(index)} corpus papers for search")
+        return index
+    
+    def corpus_documents(self):
+        """Every corpus paper as (paper_id, text) pairs for the similarity index"""
+        from similarity_index import paper_text
+        
+        self.corpus.flush()
+        with CorpusReader(self.corpus_dir) as reader:
+            for record in reader:
+                yield record['id'], paper_text(record)
+    
+    def open_similarity_index(self):
+        """Open the related-papers index, fitting it on the corpus when it is missing"""
+        from similarity_index import SimilarityIndex
+        
+        index = SimilarityIndex(os.path.join(self.output_dir, "similarity_index"))
+        if len(index) == 0 and len(self.corpus) > 0:
+            index.fit(self.corpus_documents())
+        return index
+    
+    def related_papers(self, paper_id=None, text=None, k=10):
+        """Accepted papers most similar to a stored paper or to free text, as corpus records with a `score`"""
+        if paper_id is not None:
+            hits = self.similarity_index.similar_to([paper_id], k=k)[0]
+        else:
+            hits = self.similarity_index.query([text or ""], k=k)[0]
+        return self.load_scored_papers(hits)
+    
+    def load_scored_papers(self, hits):
+        """Corpus records for (paper_id, score) pairs, in order"""
+        if not hits:
+            return []
+        self.corpus.flush()
+        papers = []
+        with CorpusReader(self.corpus_dir) as reader:
+            for paper_id, score in hits:
+                record = reader.get(paper_id)
+                # The corpus is append-only; papers withdrawn by a rescore stay in it
+                if record and self.abstract_store.status(paper_id) in (None, "accepted"):
+                    papers.append({**record, "score": round(score, 4)})
+        return papers
+    
+    def search_papers(self, query, k=10):
+        """Top-k accepted papers for a keyword query, as corpus records with a `score`"""
+        return self.load_scored_papers(self.search_index.search(query, k=k))
+    
+    def extract_findings(self, max_workers=None):
+        """Extract numeric findings from corpus papers added since the last extraction"""
+        from findings import extract_corpus
+        
+        try:
+            with self.metrics.stage_timer("findings"):
+                return extract_corpus(self.findings, self.corpus_dir, max_workers=max_workers)
+        except Exception as e:
+            logger.error(f"Error extracting findings: {e}")
+            return 0
+    
+    def export_consolidated_file(self):
+        """Append papers added to the corpus since the last export to consolidated_papers.txt"""
+        exported = self.corpus.get_extra("consolidated_exported", 0)
+        if exported >= len(self.corpus) and os.path.exists(self.consolidated_file):
+            return
+        try:
+            with CorpusReader(self.corpus_dir) as reader:
+                if os.path.exists(self.consolidated_file):
+                    count = export_consolidated(reader, self.consolidated_file, start=exported)
+                else:
+                    count = export_consolidated(reader, self.consolidated_file, header=self.consolidated_header("all queries"))
+            self.corpus.set_extra("consolidated_exported", count)
+            self.corpus.flush()
+        except Exception as e:
+            logger.error(f"Error exporting consolidated file: {e}")
+    
+    def dedup_stage(self, paper):
+        """Pipeline stage: drop papers already in the registry or already seen from another source"""
         paper_id = paper.get("id") or self.generate_paper_id(paper)
+        paper["id"] = paper_id
         
         # Skip if already processed
         if self.is_paper_processed(paper_id):
-            print(f"Skipping already processed paper: {paper['title'][:50]}...")
-            return False
+            self.debug_print(f"Skipping already processed paper: {paper['title'][:50]}...")
+            self.metrics.record_rejection("already_processed")
+            return None
         
-        # Get abstract if not already fetched
-        abstract = paper.get('abstract') or self.fetch_paper_details(paper)
+        # Skip copies of papers seen earlier from another source before any network fetch
+        with self.state_lock:
+            duplicate_id = self.find_duplicate(paper)
+            if duplicate_id is not None:
+                if duplicate_id != paper_id:
+                    logger.info(f"Skipping duplicate of paper {duplicate_id}: {paper['title'][:50]}...")
+                    self.metrics.record_rejection("duplicate")
+                else:
+                    self.metrics.record_rejection("already_processed")
+                return None
+            # Claim the paper now so an in-flight copy from another source is caught too;
+            # the claim only becomes permanent once the paper is scored
+            self.dedup_index.claim(paper_id, paper)
+        return paper
+    
+    def release_paper(self, stage_name, paper):
+        """Drop the duplicate-index claim of a paper that failed in `stage_name`, so a later run retries it"""
+        with self.state_lock:
+            self.dedup_index.release(paper.get('id'))
+    
+    def fetch_stage(self, paper):
+        """
+        Pipeline stage: make sure the paper has an abstract, fetching the landing page if needed.
+        
+        A page that can't be fetched fails the stage, so the paper's claim is released and
+        the harvest cursors stay put until a later run reads it.
+        """
+        if not paper.get('abstract'):
+            # Add random delay to be respectful to servers
+            time.sleep(random.uniform(*self.request_delay))
+            paper['abstract'] = self.fetch_abstract(paper)
+        else:
+            self.metrics.record_cache_hit("prefetched_abstract")
+        return paper
+    
+    def score_stage(self, paper):
+        """Pipeline stage: apply the relevance and numerical-data checks"""
+        abstract = paper.get('abstract')
+        paper['accepted'] = False
         if not abstract:
-            print("No abstract found, skipping...")
-            return False
-            
+            logger.info(f"No abstract found, skipping: {paper['title'][:50]}...")
+            self.metrics.record_rejection("no_abstract")
+            return paper
+        
         # Print first 100 chars of abstract for debugging
         self.debug_print(f"Abstract preview: {abstract[:100]}...")
-            
-        is_relevant, found_biomarkers = self.check_relevance(abstract)
+        
+        # Local documents are scored on their full text, harvested papers on the abstract
+        text = paper.get('full_text') or abstract
+        is_relevant, found_biomarkers = self.check_relevance(text)
         if not is_relevant:
-            print("Paper not relevant for this query, skipping...")
-            return False
-            
-        has_numerical = self.has_numerical_data(abstract)
+            logger.info(f"Paper not relevant for this query, skipping: {paper['title'][:50]}...")
+            self.metrics.record_rejection("not_relevant")
+            paper['status'] = "not_relevant"
+            return paper
+        
+        has_numerical = self.has_numerical_data(text)
         if not has_numerical:
-            print("No numerical data found, skipping...")
-            return False
+            logger.info(f"No numerical data found, skipping: {paper['title'][:50]}...")
+            self.metrics.record_rejection("no_numeric_data")
+            paper['status'] = "no_numeric_data"
+            return paper
+        
+        logger.info(f"Paper is relevant! Found biomarkers: {', '.join(found_biomarkers)} ({paper['title'][:50]}...)")
+        paper['accepted'] = True
+        paper['status'] = "accepted"
+        paper['biomarkers'] = found_biomarkers
+        paper['has_numerical'] = has_numerical
+        return paper
+    
+    def persist_stage(self, paper):
+        """Pipeline stage: record the outcome and write accepted papers (single worker)"""
+        paper_id = paper['id']
+        
+        # Scored papers are indexed for good, with the abstract so later copies are also
+        # matched on their text; papers without an abstract are released to be retried
+        with self.state_lock:
+            if paper.get('status'):
+                self.dedup_index.add(paper_id, paper)
+            else:
+                self.dedup_index.release(paper_id)
+        
+        # Keep every scored abstract so a rule change can be applied without refetching
+        if paper.get('status'):
+            self.store_abstract(paper)
+        
+        if not paper.get('accepted'):
+            return None
+        
+        self.store_accepted_paper(paper)
+        
+        # Save progress periodically; indexes and findings are left to flush_indexes()
+        if self.accepted_count % self.save_interval == 0:
+            self.flush_progress()
+        return paper
+    
+    def store_abstract(self, paper):
+        """Add a scored paper to the abstract store with its decision"""
+        record = {key: paper[key] for key in ("title", "url", "abstract", "source", "queries", "full_text") if paper.get(key)}
+        record["date_retrieved"] = datetime.now().strftime('%Y-%m-%d')
+        try:
+            self.abstract_store.add(paper['id'], record, paper.get('full_text') or paper.get('abstract'), paper['status'])
+        except Exception as e:
+            logger.error(f"Error adding paper to abstract store: {e}")
+    
+    def store_accepted_paper(self, paper, date_retrieved=None):
+        """Add an accepted paper to the corpus, indexes, registry and pending CSV rows"""
+        from similarity_index import paper_text
+        
+        paper_id = paper['id']
+        abstract = paper.get('abstract')
+        found_biomarkers = paper['biomarkers']
+        has_numerical = paper['has_numerical']
+        date_retrieved = date_retrieved or datetime.now().strftime('%Y-%m-%d')
         
-        print(f"Paper is relevant! Found biomarkers: {', '.join(found_biomarkers)}")
-        print(f"Numerical data: {'Yes' if has_numerical else 'No'}")
-            
         # Store the paper in the registry
         paper_data = {
             "title": paper['title'],
@@ -399,105 +979,280 @@ class BiomarkerScraper:
             "abstract": abstract,
             "biomarkers": ", ".join(found_biomarkers) if found_biomarkers else "None detected",
             "has_numerical": has_numerical,
-            "date_retrieved": datetime.now().strftime('%Y-%m-%d'),
+            "date_retrieved": date_retrieved,
             "source": paper.get('source', 'unknown')
         }
+        if paper.get('queries'):
+            paper_data["queries"] = paper['queries']
         
-        # Add to consolidated file
-        self.add_paper_to_consolidated_file(paper_data)
+        # A paper accepted again after a rescore withdrew it is still in the corpus and indexes
+        if paper_id not in self.corpus:
+            # Add to the indexed corpus (exported to the consolidated text file on save)
+            self.add_paper_to_corpus(paper_id, paper_data)
+            # Index the full text of local PDFs too; the corpus only keeps their abstract
+            self.search_index.add(paper_id, paper['title'], abstract or "", paper.get('full_text') or "",
+                                  " ".join(found_biomarkers))
+            self.similarity_index.add(paper_id, paper_text(paper_data))
         
         # Add to registry to avoid reprocessing
         self.processed_papers[paper_id] = {
             "title": paper['title'],
             "url": paper['url'],
-            "date_retrieved": datetime.now().strftime('%Y-%m-%d'),
+            "date_retrieved": date_retrieved,
             "source": paper.get('source', 'unknown')
         }
+        if paper.get('queries'):
+            # Every query of a planned run that returned this paper
+            self.processed_papers[paper_id]["queries"] = paper['queries']
         
-        # Store in DataFrame for CSV export
-        self.results_df = pd.concat([self.results_df, pd.DataFrame([{
+        # Buffer the row for the next CSV flush
+        self.pending_results.append({
             "Title": paper['title'],
             "URL": paper['url'],
             "Abstract": abstract[:500] + "..." if abstract and len(abstract) > 500 else abstract,
-            "Biomarkers": ", ".join(found_biomarkers) if found_biomarkers else "None detected",
+            "Biomarkers": paper_data['biomarkers'],
             "Has_Numerical_Data": has_numerical,
-            "Date_Retrieved": datetime.now().strftime('%Y-%m-%d'),
-            "Source": paper.get('source', 'unknown'),
+            "Date_Retrieved": date_retrieved,
+            "Source": paper_data['source'],
             "Paper_ID": paper_id
-        }])], ignore_index=True)
+        })
+        self.accepted_count += 1
+    
+    def rescore(self, rules=None, max_workers=None, dry_run=False):
+        """
+        Apply relevance rules to every stored abstract without fetching anything again.
+        
+        `rules` defaults to the rules file; other rules are saved as the rules file once
+        applied, so later harvests score the same way. Newly accepted papers are stored like
+        harvested ones. Newly rejected papers leave the registry and search and related-paper
+        results; the append-only corpus and consolidated file keep them. Returns a report.
+        """
+        from relevance import RelevanceRules
         
+        rules = rules or RelevanceRules.load(self.relevance_rules_file)
+        with self.state_lock:
+            with self.metrics.stage_timer("rescore"):
+                result = self.abstract_store.rescore(rules, max_workers=max_workers)
+            changes = result["changes"]
+            accepted = [change for change in changes if change["status"] == "accepted"]
+            withdrawn = [change for change in changes if change["previous"] == "accepted"]
+            report = {
+                "rules_version": result["rules_version"],
+                "papers": result["rows"],
+                "scanned": result["scanned"],
+                "decisions": result["counts"],
+                "newly_accepted": [change["id"] for change in accepted],
+                "newly_rejected": [change["id"] for change in withdrawn],
+                "reclassified": len(changes) - len(accepted) - len(withdrawn),
+                "dry_run": dry_run,
+            }
+            logger.info(f"Rescored {result['rows']} abstracts: {len(accepted)} newly accepted, "
+                        f"{len(withdrawn)} newly rejected")
+            if dry_run:
+                return report
+            
+            rows = [change["row"] for change in accepted]
+            for change, record in zip(accepted, self.abstract_store.records(rows)):
+                paper = dict(record, biomarkers=change["biomarkers"], has_numerical=change["has_numerical"])
+                self.store_accepted_paper(paper, date_retrieved=record.get("date_retrieved"))
+            for change in withdrawn:
+                self.processed_papers.pop(change["id"], None)
+            self.abstract_store.commit(result)
+            if rules is not self.rules and rules.to_dict() != self.rules.to_dict():
+                rules.save(self.relevance_rules_file)
+            self.rules = rules
+            self.biomarkers = rules.biomarkers
+            if self._search_index is not None:
+                self._search_index.set_biomarkers(rules.biomarkers)
+            self.save_progress()
+        return report
+    
+    def process_paper(self, paper):
+        """Process a single paper and add to registry if relevant"""
+        for stage in (self.dedup_stage, self.fetch_stage, self.score_stage, self.persist_stage):
+            try:
+                paper = stage(paper)
+            except Exception:
+                self.release_paper(stage.__name__, paper)
+                raise
+            if paper is None:
+                return False
         return True
     
+    def build_pipeline(self, producers):
+        """
+        Build the search -> dedup -> fetch -> score -> persist pipeline.
+        
+        Each producer (typically a source search generator) runs in its own thread.
+        Worker counts and queue sizes come from `self.stage_workers` and `self.queue_size`;
+        persist always has a single worker because it owns the registry and output files.
+        """
+        workers = self.stage_workers
+        stages = [
+            Stage("dedup", self.dedup_stage, 1, self.queue_size),
+            Stage("fetch", self.fetch_stage, workers.get("fetch", 4), self.queue_size),
+            Stage("score", self.score_stage, workers.get("score", 1), self.queue_size),
+            Stage("persist", self.persist_stage, 1, self.queue_size),
+        ]
+        debug = logger.isEnabledFor(logging.DEBUG)
+        return StagedPipeline(producers, stages, log=logger.info,
+                              monitor_interval=self.queue_monitor_interval if debug else None,
+                              timing_hook=self.metrics.record_stage, error_hook=self.release_paper)
+    
+    def queue_depths(self):
+        """Per-stage queue depths of the running pipeline (empty when idle)"""
+        return self.pipeline.queue_depths() if self.pipeline else {}
+    
+    def consolidated_header(self, query):
+        return (
+            "CONSOLIDATED BIOMARKER RESEARCH PAPERS\n"
+            f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
+            f"Query: {query}\n"
+            + "="*80 + "\n"
+        )
+    
+    def ensure_consolidated_file(self, query):
+        """Create the consolidated file if it doesn't exist, re-exporting every paper already in the corpus"""
+        if not os.path.exists(self.consolidated_file):
+            with self.state_lock:
+                self.corpus.flush()
+                with CorpusReader(self.corpus_dir) as reader:
+                    count = export_consolidated(reader, self.consolidated_file, header=self.consolidated_header(query))
+                self.corpus.set_extra("consolidated_exported", count)
+                self.corpus.flush()
+    
     def run(self, query="inflammation biomarkers", max_results=50):
         """Run the scraper with the given query"""
+        self.ensure_consolidated_file(query)
+        logger.info("Searching PubMed and arXiv and processing papers as they arrive...")
+        # Like the query planner, move the harvest cursors only once the papers are persisted
+        positions = {"pubmed": {}, "arxiv": {}}
+        accepted = self.run_pipeline([
+            self.iter_pubmed(query, max_results // 2, position=positions["pubmed"]),
+            self.iter_arxiv(query, max_results // 2, position=positions["arxiv"]),
+        ])
+        if self.last_run_errors != 0:
+            logger.warning("Harvest cursors not advanced: the pipeline reported errors, so this window is read again next run")
+            return accepted
+        for source, position in positions.items():
+            if position:
+                self.commit_harvest_position(source, query, position["cursor"], position["total"])
+        return accepted
+    
+    def ingest_pdfs(self, pdf_dir, max_workers=None):
+        """Score and store the new or changed PDFs in a local directory; returns the ingestion report"""
+        return PdfIngestor(self, max_workers=max_workers).run(pdf_dir)
+    
+    def run_pipeline(self, producers):
+        """Push the papers from `producers` through the pipeline and return the number accepted"""
+        accepted_before = self.accepted_count
+        self.last_run_errors = None
+        stop_flushing = threading.Event()
+        flusher = threading.Thread(target=self.flush_periodically, args=(stop_flushing,), name="index-flush", daemon=True)
         try:
-            # Create consolidated file if it doesn't exist
-            if not os.path.exists(self.consolidated_file):
-                with open(self.consolidated_file, 'w', encoding='utf-8') as f:
-                    f.write("CONSOLIDATED BIOMARKER RESEARCH PAPERS\n")
-                    f.write(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                    f.write(f"Query: {query}\n")
-                    f.write("="*80 + "\n")
-            
-            # Combine results from multiple sources
-            print("\nSearching PubMed...")
-            pubmed_papers = self.search_pubmed(f"{query}", max_results//2)
-            
-            print("\nSearching arXiv...")
-            arxiv_papers = self.search_arxiv(f"{query}", max_results//2)
-            
-            all_papers = pubmed_papers + arxiv_papers
+            self.pipeline = self.build_pipeline(producers)
+            if self.flush_interval:
+                flusher.start()
+            try:
+                stats = self.pipeline.run()
+            finally:
+                stop_flushing.set()
+                if flusher.is_alive():
+                    flusher.join()
+            self.last_run_errors = stats["producer_errors"] + sum(stage["errors"] for stage in stats["stages"].values())
             
-            if not all_papers:
-                print("No new papers found from either source!")
-                return 0
-                
-            print(f"\nProcessing {len(all_papers)} papers...")
-            processed_count = 0
+            for name, stage_stats in stats["stages"].items():
+                self.debug_print(f"Stage {name}: {stage_stats}")
+            if stats["produced"] == 0:
+                logger.info("No new papers found from either source!")
             
-            for i, paper in enumerate(all_papers):
-                print(f"\nProcessing paper {i+1}/{len(all_papers)}: {paper['title'][:50]}...")
-                
-                # Add random delay to be respectful to servers
-                time.sleep(random.uniform(1, 2))
-                
-                if self.process_paper(paper):
-                    processed_count += 1
-                    print(f"Successfully added paper to consolidated file")
-                    
-                # Save progress periodically
-                if processed_count % 5 == 0:
-                    self.save_results()
-                    self.save_paper_registry()
-                    
-            self.save_results()
-            self.save_paper_registry()
-            print(f"\nScraping complete! Processed {processed_count} relevant papers.")
+            processed_count = self.accepted_count - accepted_before
+            self.save_progress()
+            logger.info(f"Scraping complete! Processed {processed_count} relevant papers.")
             return processed_count
-            
+        
         except Exception as e:
-            print(f"Error during scraping: {e}")
-            self.save_results()  # Save whatever results we have
-            self.save_paper_registry()
+            logger.error(f"Error during scraping: {e}")
+            self.save_progress()  # Save whatever results we have
             return 0
+        finally:
+            self.pipeline = None
+            self.close_extraction_pool()
+            with self.state_lock:
+                self.dedup_index.release()  # claims of papers that never reached persist
+    
+    def save_progress(self):
+        """Flush results, corpus and registry, then bring every index and export up to date"""
+        self.flush_progress()
+        self.flush_indexes(final=True)
+    
+    def flush_progress(self):
+        """Append buffered results to the CSV and flush the corpus and registry (cheap enough for the persist stage)"""
+        with self.state_lock:
+            self.save_results()
+            if self._corpus is not None:
+                self._corpus.flush()
+            self.save_paper_registry()
+    
+    def flush_indexes(self, final=False):
+        """
+        Catch the consolidated file, search and similarity indexes, findings, abstract store
+        and duplicate index up with the corpus. Stores that were never opened have nothing
+        to catch up and are skipped.
+        
+        Only saving the duplicate index takes `state_lock`, so this can run next to the
+        pipeline. Only a `final` flush writes every buffered search document and lets the
+        similarity index refit its vocabulary, which holds its lock for a full corpus pass;
+        the background flush leaves both to the end of the run.
+        """
+        with self.flush_lock:
+            if self._corpus is not None:
+                self._corpus.flush()
+                self.export_consolidated_file()
+                self.extract_findings()
+            if self._search_index is not None:
+                self._search_index.commit(min_docs=1 if final else self.index_commit_size)
+            if self._similarity_index is not None:
+                self._similarity_index.commit(self.corpus_documents if final else None)
+            if self._abstract_store is not None:
+                self._abstract_store.flush()
+        with self.state_lock:
+            self.save_dedup_index()
+    
+    def flush_periodically(self, stop):
+        """Run flush_indexes() every `flush_interval` seconds until `stop` is set"""
+        while not stop.wait(self.flush_interval):
+            try:
+                self.flush_indexes()
+            except Exception as e:
+                logger.error(f"Error flushing indexes: {e}")
     
     def save_results(self):
-        """Save results to CSV file"""
+        """Append buffered results to the CSV file (the first save of a session starts a fresh file)"""
         csv_path = os.path.join(self.output_dir, "scraping_results.csv")
-        self.results_df.to_csv(csv_path, index=False)
-        print(f"Results saved to {csv_path}")
+        if not self.pending_results and self.results_saved:
+            return
+        
+        import pandas as pd
+        self.results_df = pd.DataFrame(self.pending_results, columns=self.results_columns)
+        self.results_df.to_csv(csv_path, index=False, mode='a' if self.results_saved else 'w',
+                               header=not self.results_saved)
+        self.results_saved = True
+        for source in self.results_df['Source']:
+            self.source_counts[source] = self.source_counts.get(source, 0) + 1
+        self.pending_results = []
+        logger.info(f"Results saved to {csv_path}")
         
         # Print a summary of sources
-        if not self.results_df.empty:
-            source_counts = self.results_df['Source'].value_counts()
-            print("\nResults by source:")
-            for source, count in source_counts.items():
-                print(f"- {source}: {count} papers")
+        if self.source_counts:
+            logger.info("Results by source:")
+            for source, count in self.source_counts.items():
+                logger.info(f"- {source}: {count} papers")
 
 def main():
     """Main function to run the scraper"""
     # Define search queries for different combinations - make them more general
-    search_queries = [
+    default_queries = [
         "inflammation biomarker",  # More general query
         "cortisol inflammation", 
         "lactate inflammation",
@@ -505,31 +1260,66 @@ def main():
         "skin inflammation biomarkers"
     ]
     
+    parser = argparse.ArgumentParser(description="Harvest biomarker papers from PubMed and arXiv")
+    parser.add_argument("queries", nargs="*", default=default_queries, help="Search queries (defaults to the built-in set)")
+    parser.add_argument("--output-dir", default="biomarker_research", help="Directory for results, registry and indexes")
+    parser.add_argument("--max-results", type=int, default=10, help="Maximum results per query (split across sources)")
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"])
+    parser.add_argument("--report", help="JSON run report path (default: <output-dir>/run_report.json)")
+    parser.add_argument("--prometheus", help="Also write metrics in Prometheus text format to this path")
+    parser.add_argument("--ingest-pdfs", metavar="DIR", help="Ingest the PDFs in DIR (e.g. ../aws/pdfs) instead of searching")
+    parser.add_argument("--corpus-codec", choices=["gzip", "zstd"], help="Block compression for a new corpus store")
+    parser.add_argument("--workers", type=int, help="Processes used for PDF text extraction and rescoring (default: CPU count)")
+    parser.add_argument("--extract-workers", type=int,
+                        help="Processes parsing landing pages for abstracts; 0 parses on the fetch threads (default: CPUs - 1, up to 4)")
+    parser.add_argument("--save-interval", type=int,
+                        help="Accepted papers between results, corpus and registry saves (default: 5)")
+    parser.add_argument("--flush-interval", type=float,
+                        help="Seconds between background index and findings flushes during a run (default: 60; 0 flushes only at the end)")
+    parser.add_argument("--rescore", action="store_true",
+                        help="Apply the relevance rules to every stored abstract instead of searching")
+    parser.add_argument("--rules", metavar="FILE",
+                        help="Relevance rules JSON for --rescore (default: <output-dir>/relevance_rules.json)")
+    parser.add_argument("--dry-run", action="store_true", help="With --rescore, report the changes without applying them")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=args.log_level, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    
     # Create scraper with a single output directory
-    output_dir = "biomarker_research"
-    scraper = BiomarkerScraper(output_dir=output_dir)
-    
-    # Process each query
-    total_processed = 0
-    for query in search_queries:
-        print(f"\n{'='*50}")
-        print(f"Starting search for: {query}")
-        print(f"{'='*50}")
-        
-        # Run with fewer results per query to avoid rate limiting
-        processed = scraper.run(query=query, max_results=10)
-        total_processed += processed
-        
-        # Add a pause between queries
-        if query != search_queries[-1]:  # If not the last query
-            delay = random.uniform(5, 10)
-            print(f"\nPausing for {delay:.1f} seconds before next query...")
-            time.sleep(delay)
-        
-    print(f"\nScraping completed! Total papers processed: {total_processed}")
-    print(f"All results saved in the '{output_dir}' directory")
-    print(f"Consolidated paper information is available in: {scraper.consolidated_file}")
-    print(f"CSV data is available in: {os.path.join(output_dir, 'scraping_results.csv')}")
+    output_dir = args.output_dir
+    scraper = BiomarkerScraper(output_dir=output_dir, corpus_codec=args.corpus_codec)
+    if args.extract_workers is not None:
+        scraper.extract_workers = args.extract_workers
+    if args.save_interval is not None:
+        scraper.save_interval = max(1, args.save_interval)
+    if args.flush_interval is not None:
+        scraper.flush_interval = args.flush_interval
+    
+    if args.rescore:
+        if args.rules and not os.path.exists(args.rules):
+            parser.error(f"rules file not found: {args.rules}")
+        from relevance import RelevanceRules
+        rules = RelevanceRules.load(args.rules) if args.rules else None
+        report = scraper.rescore(rules, max_workers=args.workers, dry_run=args.dry_run)
+        scraper.write_run_report(args.report, args.prometheus, extra={"rescore": report})
+        return
+    
+    if args.ingest_pdfs:
+        report = scraper.ingest_pdfs(args.ingest_pdfs, max_workers=args.workers)
+        scraper.write_run_report(args.report, args.prometheus, extra={"pdf_ingest": report})
+        logger.info(f"Consolidated paper information is available in: {scraper.consolidated_file}")
+        return
+    
+    # Run all queries as one plan: searches run concurrently within each source's rate
+    # limit and papers returned by several queries are only fetched and scored once
+    planner = QueryPlanner(scraper)
+    report = planner.run(args.queries, max_results_per_query=args.max_results)
+    scraper.write_run_report(args.report, args.prometheus, extra={"query_plan": report})
+    
+    logger.info(f"Scraping completed! Total papers processed: {report['accepted']}")
+    logger.info(f"All results saved in the '{output_dir}' directory")
+    logger.info(f"Consolidated paper information is available in: {scraper.consolidated_file}")
+    logger.info(f"CSV data is available in: {os.path.join(output_dir, 'scraping_results.csv')}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file